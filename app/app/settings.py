@@ -24,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-(!60)0mjh(4c&u50urx(*++wx-tztz*i0ac4u@tm6tr+2-7(45"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = []
 
@@ -51,6 +51,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "games.middleware.QueryBudgetMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
 ]
 
@@ -85,11 +86,34 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
-        "PORT": 5432,
+        "PORT": int(os.environ.get("DB_PORT", 5432)),
+        # Keep connections open between requests (0 closes them after each one)
+        # and check them before reuse, so a restarted database is survived.
+        # Connections are kept per thread, so keep 0 under an ASGI server, which
+        # runs every request in a new thread and would never reuse them
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        # Required behind a connection pooler in transaction pooling mode
+        "DISABLE_SERVER_SIDE_CURSORS": (
+            os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1"
+        ),
     }
 }
 
 
+# Cache
+# Shared by all worker processes when REDIS_URL is set (e.g. the production
+# server), otherwise kept in the memory of each process.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -137,9 +161,27 @@ GRAPHENE = {
     "SCHEMA": "games.schema.schema",
     "MIDDLEWARE": [
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        "games.middleware.QueryCountMiddleware",
     ],
 }
 
+# SQL query budgets of GraphQL root fields, exceeding them is logged
+
+GRAPHQL_QUERY_BUDGET = 10
+
+GRAPHQL_QUERY_BUDGETS = {
+    "challange": 1,  # QUERY_GET_CHALLANGE of the game server
+    "endGame": 8,
+}
+
+GRAPHQL_N_PLUS_ONE_THRESHOLD = 3  # executions of the same SQL in one request
+
+# Persisted queries and parsed GraphQL documents
+
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256  # parsed and validated documents per process
+
+GRAPHQL_PERSISTED_QUERY_TIMEOUT = 60 * 60 * 24 * 7  # seconds in the cache
+
 AUTHENTICATION_BACKENDS = [
     "graphql_jwt.backends.JSONWebTokenBackend",
     "django.contrib.auth.backends.ModelBackend",
@@ -147,3 +189,32 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 ALLOWED_HOSTS = ["app", "localhost"]
+
+# Locks
+# Locks in the cache shared by all worker processes of the application server.
+
+CACHE_LOCK_TIMEOUT = 10  # seconds after which a lock of a crashed worker expires
+
+CACHE_LOCK_WAIT = 5  # seconds to wait for a lock held by another worker
+
+CACHE_LOCK_POLL_INTERVAL = 0.01
+
+# Leaderboard
+# Top of the leaderboard kept in the cache and updated after every game.
+
+LEADERBOARD_SIZE = 100
+
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60
+
+LEADERBOARD_RANK_LIMIT = 10000  # lower ranks are reported as beyond the limit
+
+# Matchmaking
+# Accepted difference of Elo ratings of paired users, widening with waiting time.
+
+MATCHMAKING_BAND_START = 50
+
+MATCHMAKING_BAND_GROWTH = 10  # per second in the queue
+
+MATCHMAKING_BAND_MAX = 400
+
+MATCHMAKING_POLL_TIMEOUT = 10  # seconds without joining again after which users leave
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Challange, Game
+from .models import Challange, Game, RatingHistory
 
 
 # Register your models here.
@@ -15,3 +15,10 @@ class GameAdmin(admin.ModelAdmin):
     """Define admin panel for action model"""
 
     list_display = ["pk", "winner", "loser"]
+
+
+@admin.register(RatingHistory)
+class RatingHistoryAdmin(admin.ModelAdmin):
+    """Define admin panel for rating history model"""
+
+    list_display = ["pk", "user", "elo_rating", "elo_rating_change", "created_at"]
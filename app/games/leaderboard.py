@@ -0,0 +1,220 @@
+"""
+Leaderboard of users ordered by the Elo rating.
+
+The top of the leaderboard is kept in the cache as a sorted list and updated with
+the new ratings of players after every game, so it is built from the database
+only when the cache is cold. Updates and rebuilds of the cached top hold a lock
+shared by all workers, so concurrent games do not overwrite each other's changes.
+Pages beyond the top and ranks of other users are read with keyset queries on the
+(-elo_rating, id) index of users. Counting the users ranked above stops at
+`LEADERBOARD_RANK_LIMIT`, so lower ranks are reported only as beyond the limit.
+Users appear on the cached top as soon as they register.
+"""
+
+import base64
+import logging
+from bisect import bisect_left, insort
+from contextlib import suppress
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from games.locks import cache_lock
+
+CACHE_KEY = "leaderboard"
+
+logger = logging.getLogger(__name__)
+
+
+def sort_key(entry):
+    """
+    Get the position of the entry in the leaderboard, ties are ranked by the id.
+    """
+    return (-entry["elo_rating"], entry["id"])
+
+
+def to_entry(user):
+    """
+    Get the leaderboard entry of the user.
+    """
+    return {"id": user.id, "username": user.username, "elo_rating": user.elo_rating}
+
+
+def ranked_after(elo_rating, user_id):
+    """
+    Get the filter of users ranked below the given rating and id.
+    """
+    return Q(elo_rating__lt=elo_rating) | Q(elo_rating=elo_rating, id__gt=user_id)
+
+
+def ranked_before(elo_rating, user_id):
+    """
+    Get the filter of users ranked above the given rating and id.
+    """
+    return Q(elo_rating__gt=elo_rating) | Q(elo_rating=elo_rating, id__lt=user_id)
+
+
+def fetch_entries(limit, after=None):
+    """
+    Fetch the entries of the leaderboard from the database with a keyset query.
+
+    Args:
+        limit (int): The maximum number of entries.
+        after (dict, optional): The entry after which the entries start.
+
+    Returns:
+        list: Entries of the leaderboard.
+    """
+    users = get_user_model().objects.order_by("-elo_rating", "id")
+    if after is not None:
+        users = users.filter(ranked_after(after["elo_rating"], after["id"]))
+    return list(users.values("id", "username", "elo_rating")[:limit])
+
+
+def get_top():
+    """
+    Get the cached top of the leaderboard, built from the database if missing.
+
+    Returns:
+        list: Entries of the top `LEADERBOARD_SIZE` users.
+    """
+    top = cache.get(CACHE_KEY)
+    if top is None:
+        with cache_lock(CACHE_KEY):
+            top = cache.get(CACHE_KEY)  # built by another worker meanwhile
+            if top is None:
+                top = fetch_entries(settings.LEADERBOARD_SIZE)
+                cache.set(CACHE_KEY, top, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return top
+
+
+def update_leaderboard(users):
+    """
+    Update the cached top of the leaderboard with the new ratings of users.
+
+    Users are moved within the top, enter it or drop out of it. If a user drops
+    out, the freed place is filled with the next user from the database.
+
+    Args:
+        users (list): Users whose ratings have changed.
+    """
+    with cache_lock(CACHE_KEY):
+        top = cache.get(CACHE_KEY)
+        if top is None:
+            return  # the top is built with the current ratings on the next read
+        size = settings.LEADERBOARD_SIZE
+        is_complete = len(top) < size  # the top contains all users
+
+        changed_ids = {user.id for user in users}
+        top = [entry for entry in top if entry["id"] not in changed_ids]
+        keys = [sort_key(entry) for entry in top]
+        for entry in map(to_entry, users):
+            position = bisect_left(keys, sort_key(entry))
+            if position < size and (is_complete or position < len(top)):
+                insort(keys, sort_key(entry))
+                top.insert(position, entry)
+        del top[size:]
+
+        if len(top) < size and not is_complete:
+            # Fill places of users who dropped out of the top
+            top += fetch_entries(size - len(top), after=top[-1] if top else None)
+        cache.set(CACHE_KEY, top, settings.LEADERBOARD_CACHE_TIMEOUT)
+
+
+def refresh_leaderboard(users):
+    """
+    Update the cached top with the new ratings of users, logging any error.
+
+    Meant to run once the ratings are committed, when a failure of the cache must
+    not be reported as a failure to save them. The top which could not be updated
+    is dropped, so it is built with the current ratings on the next read.
+
+    Args:
+        users (list): Users whose ratings have changed.
+    """
+    try:
+        update_leaderboard(users)
+    except Exception:
+        logger.exception("Failed to update the cached leaderboard")
+        with suppress(Exception):  # the cache itself may be unavailable
+            cache.delete(CACHE_KEY)
+
+
+def encode_cursor(entry):
+    """
+    Encode the position of the entry as an opaque cursor.
+    """
+    return base64.b64encode(f"{entry['elo_rating']}:{entry['id']}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode the cursor created by `encode_cursor`.
+    """
+    elo_rating, user_id = base64.b64decode(cursor).decode().split(":")
+    return {"elo_rating": float(elo_rating), "id": int(user_id)}
+
+
+def get_page(first, after=None):
+    """
+    Get a page of the leaderboard.
+
+    Args:
+        first (int): The number of entries of the page.
+        after (str, optional): The cursor of the last entry of the previous page.
+
+    Returns:
+        Tuple: Entries of the page with their ranks and whether there are more.
+    """
+    top = get_top()
+    last = decode_cursor(after) if after else None
+    start = 0
+    if last is not None:
+        start = bisect_left([sort_key(entry) for entry in top], sort_key(last))
+        if start < len(top) and sort_key(top[start]) == sort_key(last):
+            start += 1
+
+    entries = top[start : start + first + 1]
+    if len(entries) <= first and len(top) == settings.LEADERBOARD_SIZE:
+        # The page reaches beyond the cached top
+        if start == len(top) and last is not None:
+            start = get_rank(last)  # None if the rank is beyond the limit
+        entries += fetch_entries(
+            first + 1 - len(entries), after=entries[-1] if entries else last
+        )
+    has_next_page = len(entries) > first
+    return [
+        dict(entry, rank=None if start is None else start + index + 1)
+        for index, entry in enumerate(entries[:first])
+    ], has_next_page
+
+
+def get_rank(entry):
+    """
+    Get the rank of the user with the given rating.
+
+    Users in the cached top are ranked without querying the database. Other users
+    are ranked by counting the users above them on the leaderboard index, up to
+    `LEADERBOARD_RANK_LIMIT` of them.
+
+    Args:
+        entry (dict): The id and the Elo rating of the user.
+
+    Returns:
+        int or None: The rank of the user, starting with 1, None if the user is
+            ranked below `LEADERBOARD_RANK_LIMIT`.
+    """
+    top = get_top()
+    keys = [sort_key(top_entry) for top_entry in top]
+    position = bisect_left(keys, sort_key(entry))
+    if position < len(top) and top[position]["id"] == entry["id"]:
+        return position + 1
+    limit = settings.LEADERBOARD_RANK_LIMIT
+    above = get_user_model().objects.filter(
+        ranked_before(entry["elo_rating"], entry["id"])
+    )
+    # COUNT over a LIMIT subquery reads at most `limit` entries of the index
+    count = above[:limit].count()
+    return count + 1 if count < limit else None
@@ -0,0 +1,40 @@
+"""
+Locks shared by all processes of the application server through the cache.
+
+A lock is a cache key added only if it does not exist yet, which is atomic in the
+Redis cache used in production, so code under the lock runs in one worker at a
+time. The key expires, so a lock of a crashed worker is eventually released.
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+@contextmanager
+def cache_lock(key):
+    """
+    Hold the lock with the given key while the block runs.
+
+    Args:
+        key (str): The cache key of the lock.
+
+    Raises:
+        Exception: If the lock is not acquired within `CACHE_LOCK_WAIT`.
+    """
+    lock_key = f"lock:{key}"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while not cache.add(lock_key, token, settings.CACHE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise Exception(f"Timed out waiting for the lock of {key}")
+        time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        # Keep the lock if it has expired and been acquired by another worker
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
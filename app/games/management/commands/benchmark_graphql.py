@@ -0,0 +1,82 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from games.operations import QUERY_GET_CHALLANGE
+from users.management.commands.create_predefined_challange import (
+    CHALLANGE_ID_PREDEFINED,
+)
+
+
+class Command(BaseCommand):
+    """
+    Load test of the `challange` query asked by the game server for every game.
+
+    Sends the query from concurrent clients to a running server and reports the
+    throughput and latency. Results of the production server are recorded in
+    the README.
+    """
+
+    help = "Measure requests per second of the challange GraphQL query."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://localhost:8000/graphql",
+            help="GraphQL endpoint of the running server.",
+        )
+        parser.add_argument(
+            "--game-id",
+            default=CHALLANGE_ID_PREDEFINED,
+            help="Id of the queried challange.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            dest="total",
+            help="Total number of requests.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Number of clients sending requests at the same time.",
+        )
+
+    def handle(self, *args, url, game_id, total, concurrency, **options):
+        payload = {"query": QUERY_GET_CHALLANGE, "variables": {"gameId": game_id}}
+        clients = threading.local()
+
+        def send(_):
+            # Every client keeps its connection to the server alive
+            if not hasattr(clients, "session"):
+                clients.session = requests.Session()
+            session = clients.session
+            start = time.perf_counter()
+            response = session.post(url, json=payload, timeout=30)
+            latency = time.perf_counter() - start
+            return latency, response.ok and "errors" not in response.json()
+
+        try:
+            send(None)  # warm up connections and caches of the server
+        except Exception as error:
+            raise CommandError(f"Server {url} is not responding: {error}")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(send, range(total)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        failed = sum(not ok for _, ok in results)
+        self.stdout.write(
+            f"{total} requests, concurrency {concurrency}, {failed} failed\n"
+            f"Requests per second: {total / elapsed:.1f}\n"
+            f"Latency (ms): mean {statistics.mean(latencies):.1f}, "
+            f"p50 {latencies[len(latencies) // 2]:.1f}, "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f}"
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from games.models import Game
+from games.positions import index_games
+
+
+class Command(BaseCommand):
+    """
+    Batch job adding positions of finished games to the opening explorer index.
+
+    Games are indexed in batches, each in its own transaction, so the job can be
+    interrupted and run again (e.g. periodically from cron).
+    """
+
+    help = "Add positions of finished games to the opening explorer index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of games indexed in a single transaction.",
+        )
+
+    def handle(self, *args, batch_size, **options):
+        games_total, positions_total = 0, 0
+        pending = (
+            Game.objects.filter(is_indexed=False)
+            .exclude(positions=b"")
+            .only("positions", "moves", "is_draw", "winner_id", "white_id")
+            .order_by("pk")
+        )
+        last_pk = 0
+        while True:
+            games = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not games:
+                break
+            positions_total += index_games(games)
+            games_total += len(games)
+            last_pk = games[-1].pk
+            self.stdout.write(f"Indexed {games_total} games")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {positions_total} positions of {games_total} games."
+            )
+        )
@@ -0,0 +1,163 @@
+"""
+Matchmaking of users looking for a game with an opponent of a similar Elo rating.
+
+Queued users are rows of `QueueEntry` shared by all workers of the application
+server. The nearest opponents are found on the index of ratings of waiting users.
+The accepted difference of ratings (the band) widens with the time a user waits,
+so everyone is eventually paired. Users keep their place by joining again within
+`MATCHMAKING_POLL_TIMEOUT`, otherwise they are removed from the queue.
+
+Rows are locked while users are paired. Rows locked by another worker are
+skipped, so a user is never paired twice and workers do not wait for each other.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from games.models import Challange, QueueEntry
+
+
+class MatchmakingQueue:
+    """
+    Queue of users waiting for an opponent.
+    """
+
+    @staticmethod
+    def get_band(waiting_time):
+        """
+        Get the accepted difference of ratings after waiting for the given time.
+        """
+        band = (
+            settings.MATCHMAKING_BAND_START
+            + settings.MATCHMAKING_BAND_GROWTH * waiting_time
+        )
+        return min(band, settings.MATCHMAKING_BAND_MAX)
+
+    @staticmethod
+    def get_active_since(now):
+        """
+        Get the time of the last poll after which users are still in the queue.
+        """
+        return now - timedelta(seconds=settings.MATCHMAKING_POLL_TIMEOUT)
+
+    def remove_inactive(self, now):
+        """
+        Remove users who have not joined again within the poll timeout.
+
+        Users whose challange has not been picked up are removed as well, the
+        challange waits for them like one created by `CreateChallange`.
+        """
+        inactive = QueueEntry.objects.select_for_update(skip_locked=True).filter(
+            last_seen__lt=self.get_active_since(now)
+        )
+        QueueEntry.objects.filter(
+            pk__in=list(inactive.values_list("pk", flat=True))
+        ).delete()
+
+    def find_opponent(self, entry, now):
+        """
+        Find and lock the nearest waiting opponent accepted by the band of either
+        user.
+
+        Args:
+            entry (QueueEntry): The locked entry of the user.
+            now (datetime): The current time.
+
+        Returns:
+            QueueEntry or None: The entry of the opponent.
+        """
+        waiting = (
+            QueueEntry.objects.select_for_update(skip_locked=True)
+            .filter(challange__isnull=True, last_seen__gte=self.get_active_since(now))
+            .exclude(pk=entry.pk)
+        )
+        band_max = settings.MATCHMAKING_BAND_MAX
+        neighbours = [
+            neighbour
+            for neighbour in (
+                waiting.filter(
+                    elo_rating__gte=entry.elo_rating,
+                    elo_rating__lte=entry.elo_rating + band_max,
+                )
+                .order_by("elo_rating")
+                .first(),
+                waiting.filter(
+                    elo_rating__lt=entry.elo_rating,
+                    elo_rating__gte=entry.elo_rating - band_max,
+                )
+                .order_by("-elo_rating")
+                .first(),
+            )
+            if neighbour is not None
+        ]
+        neighbours.sort(
+            key=lambda neighbour: abs(neighbour.elo_rating - entry.elo_rating)
+        )
+        band = self.get_band((now - entry.joined_at).total_seconds())
+        for neighbour in neighbours:
+            opponent_band = self.get_band((now - neighbour.joined_at).total_seconds())
+            if abs(neighbour.elo_rating - entry.elo_rating) <= max(band, opponent_band):
+                return neighbour
+        return None
+
+    def join(self, user):
+        """
+        Add the user to the queue or pair them with an opponent.
+
+        Joining again while queued retries pairing with the band widened by
+        the time spent in the queue, so clients poll by calling it repeatedly.
+
+        Args:
+            user (User): The user looking for a game.
+
+        Returns:
+            Challange or None: The challange of paired users, None if the user
+                waits in the queue.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            self.remove_inactive(now)
+            entry, created = QueueEntry.objects.select_for_update().get_or_create(
+                user=user,
+                defaults={
+                    "elo_rating": user.elo_rating,
+                    "joined_at": now,
+                    "last_seen": now,
+                },
+            )
+            if entry.challange_id is not None:
+                # An opponent has paired with the user since the last poll
+                challange = entry.challange
+                entry.delete()
+                return challange
+            if not created:
+                entry.last_seen = now
+                entry.save(update_fields=["last_seen"])
+
+            opponent = self.find_opponent(entry, now)
+            if opponent is None:
+                return None
+            challange = Challange.objects.create(
+                from_user_id=opponent.user_id, to_user=user
+            )
+            opponent.challange = challange
+            opponent.save(update_fields=["challange"])
+            entry.delete()
+        return challange
+
+    def leave(self, user):
+        """
+        Remove the user from the queue.
+
+        Returns:
+            bool: True if the user has been waiting in the queue.
+        """
+        deleted, _ = QueueEntry.objects.filter(
+            user=user, challange__isnull=True
+        ).delete()
+        return deleted > 0
+
+
+QUEUE = MatchmakingQueue()
@@ -0,0 +1,169 @@
+"""
+Counting of SQL queries executed by GraphQL operations.
+
+The Django middleware counts queries and their time per request to the GraphQL
+endpoint. The graphene middleware attributes them to the root fields of the
+operation (e.g. `challange` or `endGame`), queries executed before the first
+root field (e.g. authentication) are not attributed to any field. Operations
+exceeding their budget and SQL repeated within an operation, the usual sign of an
+N+1 problem in resolvers, are logged.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.urls import Resolver404, resolve
+from graphene_django.views import GraphQLView
+
+logger = logging.getLogger(__name__)
+
+# Statements of nested transactions, not counted as queries of operations
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryCounter:
+    """
+    Wrapper of database calls counting the executed queries.
+
+    Attributes:
+        queries (Counter): Number of executions of each SQL statement.
+        fields (Counter): Number of queries executed by each root field.
+        duration (float): Total time of the queries in seconds.
+        current_field (str): The root field being resolved.
+    """
+
+    def __init__(self):
+        self.queries = Counter()
+        self.fields = Counter()
+        self.duration = 0.0
+        self.current_field = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(SAVEPOINT_STATEMENTS):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries[sql] += 1
+            if self.current_field is not None:
+                self.fields[self.current_field] += 1
+
+    @property
+    def count(self):
+        """
+        The number of executed queries.
+        """
+        return sum(self.queries.values())
+
+    def repeated_queries(self):
+        """
+        Get SQL statements executed more times than the N+1 threshold.
+
+        Returns:
+            dict: Number of executions by SQL statement.
+        """
+        return {
+            sql: count
+            for sql, count in self.queries.items()
+            if count >= settings.GRAPHQL_N_PLUS_ONE_THRESHOLD
+        }
+
+    def report(self):
+        """
+        Log root fields exceeding their budget and repeated queries.
+        """
+        for field, count in self.fields.items():
+            budget = get_budget(field)
+            if count > budget:
+                logger.warning(
+                    "GraphQL field %s executed %s queries (budget %s) in %.1f ms",
+                    field,
+                    count,
+                    budget,
+                    self.duration * 1000,
+                )
+        for sql, count in self.repeated_queries().items():
+            logger.warning("Possible N+1 problem, executed %s times: %s", count, sql)
+
+
+def get_budget(field):
+    """
+    Get the maximum number of queries allowed for the root field.
+    """
+    return settings.GRAPHQL_QUERY_BUDGETS.get(field, settings.GRAPHQL_QUERY_BUDGET)
+
+
+def is_graphql_request(request):
+    """
+    Check if the request is sent to a GraphQL view.
+    """
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    view_class = getattr(match.func, "view_class", None)
+    return view_class is not None and issubclass(view_class, GraphQLView)
+
+
+class QueryBudgetMiddleware:
+    """
+    Django middleware counting SQL queries of GraphQL requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_graphql_request(request):
+            return self.get_response(request)
+        request.query_counter = QueryCounter()
+        with connection.execute_wrapper(request.query_counter):
+            response = self.get_response(request)
+        request.query_counter.report()
+        return response
+
+
+class QueryCountMiddleware:
+    """
+    Graphene middleware attributing SQL queries to the root fields of operations.
+    """
+
+    def resolve(self, next, root, info, **args):
+        counter = getattr(info.context, "query_counter", None)
+        if counter is not None and info.path.prev is None:
+            counter.current_field = info.field_name
+        return next(root, info, **args)
+
+
+@contextmanager
+def assert_query_budget(field):
+    """
+    Fail if the block executes more queries than the budget of the root field.
+
+    Meant for tests executing an operation, e.g. with `schema.execute`:
+
+        with assert_query_budget("challange"):
+            schema.execute(query)
+
+    Args:
+        field (str): The root field of the operation, e.g. "endGame".
+
+    Raises:
+        AssertionError: If the budget is exceeded or a query is repeated.
+    """
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+    budget = get_budget(field)
+    assert counter.count <= budget, (
+        f"{field} executed {counter.count} queries, expected at most {budget}:\n"
+        + "\n".join(counter.queries)
+    )
+    repeated = counter.repeated_queries()
+    assert not repeated, f"{field} repeated queries (N+1): {repeated}"
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.1 on 2026-10-19 10:46
+
+from django.conf import settings
+from django.db import migrations, models
+import games.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('games', '0011_delete_player'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='black',
+            field=models.ForeignKey(null=True, on_delete=models.SET(games.models.get_or_create_deleted_user_instance), related_name='games_as_black', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='moves',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='white',
+            field=models.ForeignKey(null=True, on_delete=models.SET(games.models.get_or_create_deleted_user_instance), related_name='games_as_white', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.1 on 2026-10-19 10:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_game_moves'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('zobrist', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('games_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='is_indexed',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='positions',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.CreateModel(
+            name='GamePosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ply', models.PositiveSmallIntegerField()),
+                ('next_move', models.PositiveIntegerField(null=True)),
+                ('result', models.SmallIntegerField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_positions', to='games.game')),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_positions', to='games.position')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='gameposition',
+            index=models.Index(fields=['position', 'next_move', 'result'], name='position_next_move_result'),
+        ),
+        migrations.AddConstraint(
+            model_name='gameposition',
+            constraint=models.UniqueConstraint(fields=('game', 'ply'), name='unique_game_ply'),
+        ),
+    ]
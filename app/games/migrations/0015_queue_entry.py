@@ -0,0 +1,55 @@
+# Generated by Django 4.1.1 on 2026-10-19 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_leaderboard"),
+        ("games", "0014_rating_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueueEntry",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="queue_entry",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("elo_rating", models.FloatField()),
+                ("joined_at", models.DateTimeField()),
+                ("last_seen", models.DateTimeField()),
+                (
+                    "challange",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="games.challange",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="queueentry",
+            index=models.Index(
+                condition=models.Q(("challange__isnull", True)),
+                fields=["elo_rating"],
+                name="queue_entry_waiting_rating",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="queueentry",
+            index=models.Index(fields=["last_seen"], name="queue_entry_last_seen"),
+        ),
+    ]
@@ -3,6 +3,7 @@ import uuid
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from games.moves import decode_moves, encode_moves, to_pgn
 
 
 ELO_START_VALUE = 400
@@ -42,6 +43,12 @@ class Game(models.Model):
         is_draw (bool): Indicates if the game ended in a draw.
         winner (User): The User who won the game, or None if the game ended in a draw.
         loser (User): The User who lost the game, or None if the game ended in a draw.
+        white (User): The User who played white pieces.
+        black (User): The User who played black pieces.
+        moves (bytes): Moves of the game packed 2 bytes per move (see games.moves).
+        positions (bytes): Zobrist hashes of the positions after each move, packed
+            8 bytes per position (see games.positions).
+        is_indexed (bool): Indicates if the positions are in the position index.
     """
 
     is_draw = models.BooleanField(default=False)
@@ -57,6 +64,64 @@ class Game(models.Model):
         related_name="loser",
         on_delete=models.SET(get_or_create_deleted_user_instance),
     )
+    white = models.ForeignKey(
+        get_user_model(),
+        null=True,
+        related_name="games_as_white",
+        on_delete=models.SET(get_or_create_deleted_user_instance),
+    )
+    black = models.ForeignKey(
+        get_user_model(),
+        null=True,
+        related_name="games_as_black",
+        on_delete=models.SET(get_or_create_deleted_user_instance),
+    )
+    moves = models.BinaryField(default=b"")
+    positions = models.BinaryField(default=b"")
+    is_indexed = models.BooleanField(default=False, db_index=True)
+
+    def get_moves(self):
+        """
+        Get the moves of the game.
+
+        Returns:
+            list: Moves in coordinate notation, e.g. ["e2e4", "e7e5"].
+        """
+        return decode_moves(self.moves)
+
+    def set_moves(self, moves):
+        """
+        Store the moves of the game in the compact encoding.
+
+        Args:
+            moves (list): Moves in coordinate notation.
+        """
+        self.moves = encode_moves(moves)
+
+    @property
+    def result(self):
+        """
+        The result of the game in PGN notation.
+        """
+        if self.is_draw:
+            return "1/2-1/2"
+        if self.winner_id is None or self.white_id is None:
+            return "*"
+        return "1-0" if self.winner_id == self.white_id else "0-1"
+
+    def to_pgn(self):
+        """
+        Export the game to PGN.
+
+        Returns:
+            str: The game in PGN.
+        """
+        return to_pgn(
+            self.get_moves(),
+            white=self.white.username if self.white else "?",
+            black=self.black.username if self.black else "?",
+            result=self.result,
+        )
 
 
 class Challange(models.Model):
@@ -111,3 +176,125 @@ class Challange(models.Model):
             + math.pow(10, (opponent.elo_rating - player.elo_rating) / ELO_START_VALUE)
         )
         return round(player.elo_rating + ELO_FACTOR_K * (result - probability), 1)
+
+
+class Position(models.Model):
+    """
+    Represents a unique chess position occurring in the played games.
+
+    Attributes:
+        zobrist (int): The 64-bit Zobrist hash of the position computed by the game
+            server, stored as a signed integer.
+        games_count (int): The number of games in which the position occurred.
+    """
+
+    zobrist = models.BigIntegerField(primary_key=True)
+    games_count = models.PositiveIntegerField(default=0)
+
+
+class GamePosition(models.Model):
+    """
+    Represents the occurrence of a position in a game.
+
+    Attributes:
+        game (Game): The game in which the position occurred.
+        ply (int): The number of half-moves made before the position.
+        position (Position): The position.
+        next_move (int): The move played in the position, packed as in games.moves,
+            or None if it is the final position of the game.
+        result (int): The result of the game, 1 for a white win, 0 for a draw and
+            -1 for a black win.
+    """
+
+    game = models.ForeignKey(
+        Game, related_name="game_positions", on_delete=models.CASCADE
+    )
+    ply = models.PositiveSmallIntegerField()
+    position = models.ForeignKey(
+        Position, related_name="game_positions", on_delete=models.CASCADE
+    )
+    next_move = models.PositiveIntegerField(null=True)
+    result = models.SmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "ply"], name="unique_game_ply")
+        ]
+        indexes = [
+            # The explorer aggregates results by the next move from this index only
+            models.Index(
+                fields=["position", "next_move", "result"],
+                name="position_next_move_result",
+            )
+        ]
+
+
+class RatingHistory(models.Model):
+    """
+    Represents a change of the Elo rating of a user after a game.
+
+    Attributes:
+        user (User): The User whose rating has changed.
+        game (Game): The game which changed the rating, None if the rating has
+            been recomputed by the `recompute_elo_ratings` command.
+        elo_rating (float): The Elo rating of the user after the change.
+        elo_rating_change (float): The change of the Elo rating.
+        created_at (datetime): The time of the change.
+    """
+
+    user = models.ForeignKey(
+        get_user_model(), related_name="rating_history", on_delete=models.CASCADE
+    )
+    game = models.ForeignKey(
+        Game, null=True, related_name="rating_history", on_delete=models.SET_NULL
+    )
+    elo_rating = models.FloatField()
+    elo_rating_change = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], name="rating_history_user_created"
+            )
+        ]
+        ordering = ["-created_at", "-id"]
+
+
+class QueueEntry(models.Model):
+    """
+    Represents a user waiting in the matchmaking queue.
+
+    Attributes:
+        user (User): The queued user.
+        elo_rating (float): The Elo rating of the user when joining the queue.
+        joined_at (datetime): The time of joining the queue.
+        last_seen (datetime): The time of the last poll of the user.
+        challange (Challange): The challange created by the opponent who has paired
+            with the user, kept until the user polls again. None while the user
+            waits.
+    """
+
+    user = models.OneToOneField(
+        get_user_model(),
+        primary_key=True,
+        related_name="queue_entry",
+        on_delete=models.CASCADE,
+    )
+    elo_rating = models.FloatField()
+    joined_at = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    challange = models.ForeignKey(
+        Challange, null=True, related_name="+", on_delete=models.CASCADE
+    )
+
+    class Meta:
+        indexes = [
+            # Opponents are looked up by the rating among the waiting users only
+            models.Index(
+                fields=["elo_rating"],
+                name="queue_entry_waiting_rating",
+                condition=models.Q(challange__isnull=True),
+            ),
+            models.Index(fields=["last_seen"], name="queue_entry_last_seen"),
+        ]
@@ -0,0 +1,120 @@
+"""
+Compact binary encoding of the moves of a game and export to PGN.
+
+Every move is packed into 2 bytes (big-endian): 6 bits for the starting square,
+6 bits for the ending square and 4 bits for the promotion piece. Squares are
+numbered from a1 (0) to h8 (63) rank by rank. Moves are exchanged with the game
+server in coordinate notation, e.g. "e2e4" or "e7e8q".
+"""
+
+import struct
+
+PROMOTION_PIECES = ["", "n", "b", "r", "q"]  # index is the promotion code
+MOVE_STRUCT = struct.Struct(">H")
+
+
+def square_to_index(square):
+    """
+    Convert a square in chess notation (e.g. "e4") to its index (0-63).
+    """
+    file_index = ord(square[0]) - ord("a")
+    rank_index = int(square[1]) - 1
+    if not (0 <= file_index < 8 and 0 <= rank_index < 8) or len(square) != 2:
+        raise ValueError(f"Invalid square: {square}")
+    return rank_index * 8 + file_index
+
+
+def index_to_square(index):
+    """
+    Convert the index of a square (0-63) to chess notation.
+    """
+    return chr(ord("a") + index % 8) + str(index // 8 + 1)
+
+
+def encode_move(move):
+    """
+    Pack a move in coordinate notation into a 16-bit integer.
+
+    Args:
+        move (str): The move, e.g. "e2e4" or "e7e8q".
+
+    Returns:
+        int: from square | to square << 6 | promotion << 12.
+    """
+    promotion = move[4:]
+    if promotion not in PROMOTION_PIECES:
+        raise ValueError(f"Invalid promotion piece: {move}")
+    return (
+        square_to_index(move[:2])
+        | square_to_index(move[2:4]) << 6
+        | PROMOTION_PIECES.index(promotion) << 12
+    )
+
+
+def decode_move(code):
+    """
+    Unpack a 16-bit integer into a move in coordinate notation.
+    """
+    return (
+        index_to_square(code & 0x3F)
+        + index_to_square(code >> 6 & 0x3F)
+        + PROMOTION_PIECES[code >> 12]
+    )
+
+
+def encode_moves(moves):
+    """
+    Pack moves in coordinate notation into bytes, 2 bytes per move.
+
+    Args:
+        moves (list): Moves in coordinate notation.
+
+    Returns:
+        bytes: The packed moves.
+    """
+    return b"".join(MOVE_STRUCT.pack(encode_move(move)) for move in moves)
+
+
+def decode_moves(data):
+    """
+    Unpack bytes created by `encode_moves` into moves in coordinate notation.
+    """
+    return [decode_move(code) for (code,) in MOVE_STRUCT.iter_unpack(bytes(data))]
+
+
+def to_pgn(moves, white="?", black="?", result="*", date="????.??.??"):
+    """
+    Export the moves of a game to PGN.
+
+    Note:
+        The movetext uses coordinate notation (e.g. "1. e2e4 e7e5"), since
+        the application server does not know the rules of chess required to
+        write moves in the standard algebraic notation.
+
+    Args:
+        moves (list): Moves in coordinate notation.
+        white (str): Username of the white player.
+        black (str): Username of the black player.
+        result (str): "1-0", "0-1", "1/2-1/2" or "*" if unknown.
+        date (str): Date of the game in the "YYYY.MM.DD" format.
+
+    Returns:
+        str: The game in PGN.
+    """
+    tags = [
+        ("Event", "ChessAPI game"),
+        ("Site", "ChessAPI"),
+        ("Date", date),
+        ("Round", "-"),
+        ("White", white),
+        ("Black", black),
+        ("Result", result),
+    ]
+    header = "\n".join(f'[{name} "{value}"]' for name, value in tags)
+    movetext = []
+    for ply, move in enumerate(moves):
+        if ply % 2 == 0:
+            movetext.append(f"{ply // 2 + 1}.")
+        movetext.append(move)
+    movetext.append(result)
+    return f"{header}\n\n{' '.join(movetext)}\n"
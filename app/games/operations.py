@@ -0,0 +1,17 @@
+"""
+GraphQL operations sent by the game server for every game.
+
+Copies of `QUERY_GET_CHALLANGE` and `MUTATION_END_GAME` of game_server/config.py,
+which runs in a container of its own. Tests check that both copies are equal.
+"""
+
+QUERY_GET_CHALLANGE = (
+    "query GetChallange($gameId: String) {challange(gameId: $gameId) {id "
+    "fromUser {username eloRating} toUser {username eloRating} eloRatingChanges}}"
+)
+MUTATION_END_GAME = (
+    "mutation EndGame($winnerUsername: String, $challangeId: ID, $moves: String, "
+    "$whiteUsername: String, $positions: String) {endGame(winnerUsername: "
+    "$winnerUsername, challangeId: $challangeId, moves: $moves, whiteUsername: "
+    "$whiteUsername, positions: $positions) {challange {id}}}"
+)
@@ -0,0 +1,189 @@
+"""
+Index of the positions occurring in the played games for the opening explorer.
+
+The game server sends the Zobrist hashes of the positions after each move packed
+8 bytes per position. The batch job `index_positions` moves them into the
+Position and GamePosition tables, so the explorer answers queries from the index
+on (position, next_move, result) without replaying games.
+"""
+
+import base64
+import struct
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from games.models import Game, GamePosition, Position
+from games.moves import decode_move, decode_moves, encode_move
+
+HASH_STRUCT = struct.Struct(">Q")
+SIGN_BIT = 1 << 63
+
+
+def to_signed(position_hash):
+    """
+    Convert an unsigned 64-bit hash to the signed integer stored in Postgres.
+    """
+    return position_hash - (1 << 64) if position_hash & SIGN_BIT else position_hash
+
+
+def to_unsigned(zobrist):
+    """
+    Convert a signed integer stored in Postgres to the unsigned 64-bit hash.
+    """
+    return zobrist & ((1 << 64) - 1)
+
+
+def decode_positions(positions):
+    """
+    Decode the hashes of positions sent by the game server.
+
+    Args:
+        positions (str): Hashes packed 8 bytes per position, encoded in base64.
+
+    Returns:
+        bytes: The packed hashes stored in Game.positions.
+    """
+    return base64.b64decode(positions)
+
+
+def unpack_positions(data):
+    """
+    Unpack hashes of positions stored in Game.positions.
+
+    Returns:
+        list: Signed 64-bit hashes of the positions, starting with the initial one.
+    """
+    return [to_signed(value) for (value,) in HASH_STRUCT.iter_unpack(bytes(data))]
+
+
+def get_result(game):
+    """
+    Get the result of the game stored in GamePosition.result.
+
+    Returns:
+        int: 1 for a white win, 0 for a draw and -1 for a black win, None if the
+            result is unknown, e.g. the color of the winner was not recorded.
+    """
+    return {"1-0": 1, "1/2-1/2": 0, "0-1": -1}.get(game.result)
+
+
+def index_games(games):
+    """
+    Add the positions of the games to the position index.
+
+    Every position counts once per game in Position.games_count, even if it was
+    repeated during the game. Games with an unknown result are marked as indexed
+    without adding their positions, so they are not counted as draws.
+
+    Args:
+        games (list): Games which have not been indexed yet.
+
+    Returns:
+        int: The number of indexed positions (plies).
+    """
+    game_positions = []
+    games_counts = Counter()
+    for game in games:
+        result = get_result(game)
+        if result is None:
+            continue
+        positions = unpack_positions(game.positions)
+        moves = [encode_move(move) for move in decode_moves(game.moves)]
+        for ply, zobrist in enumerate(positions):
+            game_positions.append(
+                GamePosition(
+                    game=game,
+                    ply=ply,
+                    position_id=zobrist,
+                    next_move=moves[ply] if ply < len(moves) else None,
+                    result=result,
+                )
+            )
+        games_counts.update(set(positions))
+
+    # Group positions by the increment, so the counts are updated in few queries
+    positions_by_count = defaultdict(list)
+    for zobrist, count in games_counts.items():
+        positions_by_count[count].append(zobrist)
+
+    with transaction.atomic():
+        Position.objects.bulk_create(
+            [Position(zobrist=zobrist) for zobrist in games_counts],
+            ignore_conflicts=True,
+        )
+        for count, zobrists in positions_by_count.items():
+            Position.objects.filter(zobrist__in=zobrists).update(
+                games_count=F("games_count") + count
+            )
+        GamePosition.objects.bulk_create(game_positions)
+        Game.objects.filter(pk__in=[game.pk for game in games]).update(is_indexed=True)
+    return len(game_positions)
+
+
+def find_position(moves):
+    """
+    Find the position reached after the moves from the initial position.
+
+    The position is found by following games from the index in which the moves
+    were played, since the application server does not know the rules of chess.
+
+    Args:
+        moves (list): Moves in coordinate notation.
+
+    Returns:
+        int or None: The signed hash of the position, None if no indexed game
+            reached the position this way.
+    """
+    zobrist = (
+        GamePosition.objects.filter(ply=0).values_list("position_id", flat=True).first()
+    )
+    for move in moves:
+        occurrence = (
+            GamePosition.objects.filter(
+                position_id=zobrist, next_move=encode_move(move)
+            )
+            .values_list("game_id", "ply")
+            .first()
+        )
+        if occurrence is None:
+            return None
+        game_id, ply = occurrence
+        zobrist = (
+            GamePosition.objects.filter(game_id=game_id, ply=ply + 1)
+            .values_list("position_id", flat=True)
+            .first()
+        )
+    return zobrist
+
+
+def explore(zobrist):
+    """
+    Get statistics of the moves played in the position.
+
+    Args:
+        zobrist (int): The signed hash of the position.
+
+    Returns:
+        list: Dictionaries with the move in coordinate notation and the number of
+            games, white wins, draws and black wins, the most popular move first.
+    """
+    rows = (
+        GamePosition.objects.filter(position_id=zobrist, next_move__isnull=False)
+        .values("next_move")
+        .annotate(
+            # Count the indexed column, so the rows are read from the index only
+            games=Count("result"),
+            white_wins=Count("result", filter=Q(result=1)),
+            draws=Count("result", filter=Q(result=0)),
+            black_wins=Count("result", filter=Q(result=-1)),
+        )
+        .order_by("-games", "next_move")
+    )
+    return [
+        {
+            "move": decode_move(row.pop("next_move")),
+            **row,
+        }
+        for row in rows
+    ]
@@ -1,6 +1,17 @@
 import graphene
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from games.models import Challange, Game, StatusChoice
+from games.leaderboard import encode_cursor, get_page, get_rank, to_entry
+from games.matchmaking import QUEUE
+from games.models import Challange, Game, Position, RatingHistory
+from games.positions import (
+    decode_positions,
+    explore,
+    find_position,
+    to_signed,
+    to_unsigned,
+)
+from games.services import end_game
 from graphene.types.json import JSONString
 from graphene_django import DjangoObjectType
 
@@ -21,16 +32,38 @@ class ChallangeType(DjangoObjectType):
 
     Fields:
         user (UserType): The user who sent the challenge.
+        from_user (UserType): The user who sent the challenge.
+        to_user (UserType): The user who received the challenge.
         elo_rating_changes (JSONString): Potential Elo rating updates for each scenario.
+        moves (list): Moves of the finished game in coordinate notation.
+        pgn (str): The finished game exported to PGN.
     """
 
     user = graphene.Field(UserType)
+    # Declared explicitly, so the users joined by select_related are used instead
+    # of fetching each of them again
+    from_user = graphene.Field(UserType, required=True)
+    to_user = graphene.Field(UserType, required=True)
     elo_rating_changes = graphene.Field(JSONString)
+    moves = graphene.List(graphene.String)
+    pgn = graphene.String()
 
     class Meta:
         model = Challange
         fields = "__all__"
 
+    def resolve_from_user(self, info):
+        """
+        Resolve the user who sent the challenge.
+        """
+        return self.from_user
+
+    def resolve_to_user(self, info):
+        """
+        Resolve the user who received the challenge.
+        """
+        return self.to_user
+
     def resolve_elo_rating_changes(self, info):
         """
         Calculate the possible Elo rating that will be assigned to the player after
@@ -53,6 +86,104 @@ class ChallangeType(DjangoObjectType):
         }
         return elo_rating_dict
 
+    def resolve_moves(self, info):
+        """
+        Decode the moves of the game, None if the game has not ended yet.
+        """
+        return self.game.get_moves() if self.game else None
+
+    def resolve_pgn(self, info):
+        """
+        Export the game to PGN, None if the game has not ended yet.
+        """
+        return self.game.to_pgn() if self.game else None
+
+
+class RatingHistoryType(DjangoObjectType):
+    """
+    Represents a change of the Elo rating of a user after a game.
+    """
+
+    class Meta:
+        model = RatingHistory
+        fields = ["id", "elo_rating", "elo_rating_change", "created_at"]
+
+
+class LeaderboardEntryType(graphene.ObjectType):
+    """
+    Represents a user on the leaderboard.
+
+    The rank is None on pages beyond `LEADERBOARD_RANK_LIMIT` users.
+    """
+
+    id = graphene.ID()
+    rank = graphene.Int()
+    username = graphene.String()
+    elo_rating = graphene.Float()
+    cursor = graphene.String()
+
+    def resolve_cursor(self, info):
+        """
+        Encode the position of the user as a cursor of the next page.
+        """
+        return encode_cursor({"elo_rating": self.elo_rating, "id": self.id})
+
+
+class UserRankType(graphene.ObjectType):
+    """
+    Represents the rank of a user on the leaderboard.
+
+    Fields:
+        rank (int): The rank of the user, or `LEADERBOARD_RANK_LIMIT` + 1 if the
+            user is ranked below the limit (displayed as "> N").
+        is_exact (bool): Whether the rank is exact.
+    """
+
+    rank = graphene.Int()
+    is_exact = graphene.Boolean()
+
+
+class LeaderboardType(graphene.ObjectType):
+    """
+    Represents a page of the leaderboard.
+
+    Fields:
+        entries (list): Users on the page ordered by the Elo rating.
+        end_cursor (str): Cursor to pass as `after` to fetch the next page.
+        has_next_page (bool): Whether there are more users.
+    """
+
+    entries = graphene.List(LeaderboardEntryType)
+    end_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
+class ExplorerMoveType(graphene.ObjectType):
+    """
+    Represents statistics of a move played in a position.
+    """
+
+    move = graphene.String()
+    games = graphene.Int()
+    white_wins = graphene.Int()
+    draws = graphene.Int()
+    black_wins = graphene.Int()
+
+
+class ExplorerType(graphene.ObjectType):
+    """
+    Represents a position in the opening explorer.
+
+    Fields:
+        zobrist (str): The Zobrist hash of the position in hexadecimal.
+        games (int): The number of games in which the position occurred.
+        moves (list): Statistics of the moves played in the position.
+    """
+
+    zobrist = graphene.String()
+    games = graphene.Int()
+    moves = graphene.List(ExplorerMoveType)
+
 
 class Query(graphene.ObjectType):
     """
@@ -60,9 +191,25 @@ class Query(graphene.ObjectType):
 
     Fields:
         challange (ChallangeType): Query to fetch a challenge by its game_id.
+        opening_explorer (ExplorerType): Query to fetch statistics of a position.
+        rating_history (list): Query to fetch the latest Elo rating changes of
+            a user.
+        leaderboard (LeaderboardType): Query to fetch a page of the leaderboard.
+        user_rank (UserRankType): Query to fetch the rank of a user on the
+            leaderboard.
     """
 
     challange = graphene.Field(ChallangeType, game_id=graphene.String())
+    opening_explorer = graphene.Field(
+        ExplorerType, moves=graphene.String(), zobrist=graphene.String()
+    )
+    rating_history = graphene.List(
+        RatingHistoryType, username=graphene.String(), first=graphene.Int()
+    )
+    leaderboard = graphene.Field(
+        LeaderboardType, first=graphene.Int(), after=graphene.String()
+    )
+    user_rank = graphene.Field(UserRankType, username=graphene.String())
 
     def resolve_challange(root, info, game_id):
         """
@@ -71,7 +218,81 @@ class Query(graphene.ObjectType):
         Args:
             game_id (str): The unique identifier of the challenge.
         """
-        return Challange.objects.filter(id=game_id).first()
+        return (
+            Challange.objects.select_related(
+                "from_user", "to_user", "game__white", "game__black"
+            )
+            .filter(id=game_id)
+            .first()
+        )
+
+    def resolve_rating_history(root, info, username, first=100):
+        """
+        Resolve the latest Elo rating changes of the user, the newest first.
+
+        Args:
+            username (str): The username of the user.
+            first (int): The maximum number of changes.
+        """
+        return RatingHistory.objects.filter(user__username=username)[:first]
+
+    def resolve_leaderboard(root, info, first=20, after=None):
+        """
+        Resolve a page of the leaderboard.
+
+        Args:
+            first (int): The number of users on the page, at most the size of
+                the cached top.
+            after (str): The cursor of the last user of the previous page.
+        """
+        entries, has_next_page = get_page(
+            min(first, settings.LEADERBOARD_SIZE), after
+        )
+        page = [LeaderboardEntryType(**entry) for entry in entries]
+        return LeaderboardType(
+            entries=page,
+            end_cursor=encode_cursor(entries[-1]) if entries else None,
+            has_next_page=has_next_page,
+        )
+
+    def resolve_user_rank(root, info, username):
+        """
+        Resolve the rank of the user on the leaderboard.
+
+        Args:
+            username (str): The username of the user.
+        """
+        user = get_user_model().objects.filter(username=username).first()
+        if user is None:
+            return None
+        rank = get_rank(to_entry(user))
+        if rank is None:
+            return UserRankType(
+                rank=settings.LEADERBOARD_RANK_LIMIT + 1, is_exact=False
+            )
+        return UserRankType(rank=rank, is_exact=True)
+
+    def resolve_opening_explorer(root, info, moves="", zobrist=None):
+        """
+        Resolve statistics of the position from the position index.
+
+        Args:
+            moves (str): Moves from the initial position in coordinate notation
+                separated by spaces, e.g. "e2e4 e7e5". Used if zobrist is not given.
+            zobrist (str): The Zobrist hash of the position in hexadecimal.
+        """
+        if zobrist:
+            position_id = to_signed(int(zobrist, 16))
+        else:
+            position_id = find_position(moves.split())
+        position = Position.objects.filter(zobrist=position_id).first()
+        if position is None:
+            return None
+        return ExplorerType(
+            zobrist=f"{to_unsigned(position.zobrist):016x}",
+            games=position.games_count,
+            moves=[ExplorerMoveType(**row) for row in explore(position.zobrist)],
+        )
 
 
 class CreateChallange(graphene.Mutation):
@@ -116,6 +337,11 @@ class EndGame(graphene.Mutation):
     Arguments:
         challange_id (ID): The ID of the challenge that corresponds to the game.
         winner_username (str): The username of the winner, or None for a draw.
+        moves (str): Moves of the game in coordinate notation separated by spaces,
+            e.g. "e2e4 e7e5 g1f3".
+        white_username (str): The username of the player with white pieces.
+        positions (str): Zobrist hashes of the positions after each move packed
+            8 bytes per position, encoded in base64.
 
     Fields:
         challange (ChallangeType): The updated challenge instance.
@@ -124,44 +350,80 @@ class EndGame(graphene.Mutation):
     class Arguments:
         challange_id = graphene.ID()
         winner_username = graphene.String()
+        moves = graphene.String()
+        white_username = graphene.String()
+        positions = graphene.String()
 
     challange = graphene.Field(ChallangeType)
 
     @staticmethod
-    def mutate(root, info, challange_id, winner_username):
+    def mutate(
+        root,
+        info,
+        challange_id,
+        winner_username,
+        moves="",
+        white_username="",
+        positions="",
+    ):
         """
         Mutate to end a game and calculate the Elo rating changes for the players.
         """
-        challange = Challange.objects.get(id=challange_id)
-        if winner_username:
-            winner = get_user_model().objects.get(username=winner_username)
-            if challange.from_user == winner:
-                loser = challange.to_user
-            else:
-                loser = challange.from_user
-            game = Game(winner=winner, loser=loser)
-            winner.elo_rating = challange.calculate_elo_rating(winner, loser, 1)
-            loser.elo_rating = challange.calculate_elo_rating(loser, winner, 0)
-            winner.save()
-            loser.save()
-        else:  # If they played a draw
-            game = Game(is_draw=True)
-            challange.from_user.elo_rating = challange.calculate_elo_rating(
-                challange.from_user, challange.to_user, 0.5
-            )
-            challange.to_user.elo_rating = challange.calculate_elo_rating(
-                challange.to_user, challange.from_user, 0.5
-            )
-            challange.from_user.save()
-            challange.to_user.save()
-
-        game.save()
-        challange.game = game
-        challange.status = StatusChoice.DONE
-        challange.save()
+        game = Game(positions=decode_positions(positions))
+        game.set_moves(moves.split())
+        challange = end_game(challange_id, game, winner_username, white_username)
         return CreateChallange(challange=challange)
 
 
+class JoinQueue(graphene.Mutation):
+    """
+    Mutation to look for an opponent with a similar Elo rating.
+
+    The user is paired with the nearest queued opponent or waits in the queue.
+    Queued users call the mutation repeatedly until they get the challange.
+
+    Fields:
+        challange (ChallangeType): The challange with the opponent, None if the
+            user waits in the queue.
+        queued (bool): Whether the user waits in the queue.
+    """
+
+    challange = graphene.Field(ChallangeType)
+    queued = graphene.Boolean()
+
+    @staticmethod
+    def mutate(root, info):
+        """
+        Mutate to pair the user with an opponent or add them to the queue.
+        """
+        user = info.context.user
+        if not user.is_authenticated:
+            raise Exception("You must be logged in to join the queue")
+        challange = QUEUE.join(user)
+        return JoinQueue(challange=challange, queued=challange is None)
+
+
+class LeaveQueue(graphene.Mutation):
+    """
+    Mutation to stop looking for an opponent.
+
+    Fields:
+        ok (bool): Whether the user has been removed from the queue.
+    """
+
+    ok = graphene.Boolean()
+
+    @staticmethod
+    def mutate(root, info):
+        """
+        Mutate to remove the user from the queue.
+        """
+        user = info.context.user
+        if not user.is_authenticated:
+            raise Exception("You must be logged in to leave the queue")
+        return LeaveQueue(ok=QUEUE.leave(user))
+
+
 class Mutation(graphene.ObjectType):
     """
     The root mutation for GraphQL.
@@ -169,6 +431,8 @@ class Mutation(graphene.ObjectType):
 
     create_challange = CreateChallange.Field()
     end_game = EndGame.Field()
+    join_queue = JoinQueue.Field()
+    leave_queue = LeaveQueue.Field()
 
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -0,0 +1,97 @@
+"""
+Services changing the state of several models at once.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from games.leaderboard import refresh_leaderboard
+from games.models import Challange, RatingHistory, StatusChoice
+
+
+def end_game(challange_id, game, winner_username=None, white_username=None):
+    """
+    Save the result of the game and update the Elo ratings of both players.
+
+    The challange and both players are locked for the whole transaction, so
+    concurrent endings of games of the same player do not lose updates and the
+    same game cannot be ended twice. Only the rating column of the players is
+    written and every change is recorded in the rating history.
+
+    Args:
+        challange_id (str): The ID of the challange that corresponds to the game.
+        game (Game): The unsaved game with moves, positions and colors of players.
+        winner_username (str, optional): The username of the winner, None for a
+            draw.
+        white_username (str, optional): The username of the player with white
+            pieces, None if unknown.
+
+    Returns:
+        Challange: The finished challange.
+    """
+    with transaction.atomic():
+        challange = Challange.objects.select_for_update().get(id=challange_id)
+        if challange.status == StatusChoice.DONE:
+            raise Exception("This game has already ended")
+
+        # Lock the players in the order of primary keys to avoid deadlocks
+        players = {
+            user.pk: user
+            for user in get_user_model()
+            .objects.select_for_update()
+            .filter(pk__in=[challange.from_user_id, challange.to_user_id])
+            .order_by("pk")
+        }
+        from_user = players[challange.from_user_id]
+        to_user = players[challange.to_user_id]
+
+        if white_username:
+            if from_user.username == white_username:
+                game.white, game.black = from_user, to_user
+            else:
+                game.white, game.black = to_user, from_user
+
+        if winner_username:
+            if from_user.username == winner_username:
+                winner, loser = from_user, to_user
+            elif to_user.username == winner_username:
+                winner, loser = to_user, from_user
+            else:
+                raise Exception("The winner is not involved into this game")
+            game.winner, game.loser = winner, loser
+            results = [(winner, loser, 1), (loser, winner, 0)]
+        else:  # If they played a draw
+            game.is_draw = True
+            results = [(from_user, to_user, 0.5), (to_user, from_user, 0.5)]
+
+        # Compute both ratings from the locked rows before any of them is changed
+        new_ratings = [
+            (player, challange.calculate_elo_rating(player, opponent, result))
+            for player, opponent, result in results
+        ]
+        game.save()
+
+        history = []
+        for player, elo_rating in new_ratings:
+            elo_rating_change = round(elo_rating - player.elo_rating, 1)
+            # The row is locked, so the rating computed from it is written as is
+            # (an F() increment would accumulate floating point errors)
+            player.elo_rating = elo_rating
+            player.save(update_fields=["elo_rating"])
+            history.append(
+                RatingHistory(
+                    user=player,
+                    game=game,
+                    elo_rating=elo_rating,
+                    elo_rating_change=elo_rating_change,
+                )
+            )
+        RatingHistory.objects.bulk_create(history)
+
+        challange.from_user, challange.to_user = from_user, to_user
+        challange.game = game
+        challange.status = StatusChoice.DONE
+        challange.save(update_fields=["game", "status"])
+
+        # Move players on the cached leaderboard once their ratings are committed
+        transaction.on_commit(lambda: refresh_leaderboard([from_user, to_user]))
+    return challange
@@ -0,0 +1,18 @@
+"""
+Receivers of signals keeping data of the games app in sync with other apps.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from games.leaderboard import refresh_leaderboard
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def add_user_to_leaderboard(sender, instance, created, raw=False, **kwargs):
+    """
+    Put a newly registered user on the cached leaderboard once they are saved.
+    """
+    if created and not raw:
+        transaction.on_commit(lambda: refresh_leaderboard([instance]))
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from games import leaderboard
+from games.schema import schema
+
+QUERY_USER_RANK = (
+    "query UserRank($username: String) {userRank(username: $username) "
+    "{rank isExact}}"
+)
+
+
+@override_settings(LEADERBOARD_SIZE=2, LEADERBOARD_RANK_LIMIT=3)
+class LeaderboardTests(TestCase):
+    """Tests of the cached leaderboard and ranks of users."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users = [
+                get_user_model().objects.create_user(
+                    f"player_{index}", elo_rating=1000 - index * 100
+                )
+                for index in range(6)
+            ]
+
+    def test_new_user_enters_incomplete_top(self):
+        """Test that a registered user appears on the cached top which holds all
+        users."""
+        get_user_model().objects.all().delete()
+        cache.clear()
+        self.assertEqual(leaderboard.get_top(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.create_user("first")
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.create_user("second", elo_rating=500)
+
+        self.assertEqual(
+            [entry["username"] for entry in leaderboard.get_top()],
+            ["second", "first"],
+        )
+
+    def test_rating_change_moves_user_into_top(self):
+        """Test that the cached top is updated with a new rating of a user."""
+        self.assertEqual(
+            [entry["username"] for entry in leaderboard.get_top()],
+            ["player_0", "player_1"],
+        )
+        user = self.users[4]
+        user.elo_rating = 950
+
+        leaderboard.update_leaderboard([user])
+
+        self.assertEqual(
+            [entry["username"] for entry in leaderboard.get_top()],
+            ["player_0", "player_4"],
+        )
+
+    def test_rank_counts_at_most_the_limit(self):
+        """Test that ranks below the limit are not counted over the whole table."""
+        leaderboard.get_top()
+        self.assertEqual(leaderboard.get_rank(leaderboard.to_entry(self.users[1])), 2)
+        self.assertEqual(leaderboard.get_rank(leaderboard.to_entry(self.users[2])), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            rank = leaderboard.get_rank(leaderboard.to_entry(self.users[5]))
+
+        self.assertIsNone(rank)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("LIMIT 3", queries[0]["sql"])
+
+    def test_user_rank_query_reports_rank_beyond_limit(self):
+        """Test that the userRank query reports ranks below the limit as inexact."""
+        result = schema.execute(QUERY_USER_RANK, variables={"username": "player_2"})
+        self.assertEqual(result.data["userRank"], {"rank": 3, "isExact": True})
+
+        result = schema.execute(QUERY_USER_RANK, variables={"username": "player_5"})
+        self.assertEqual(result.data["userRank"], {"rank": 4, "isExact": False})
+
+    def test_pages_are_ranked_until_the_limit(self):
+        """Test that pages beyond the cached top are ranked while the rank is
+        within the limit."""
+        entries, has_next_page = leaderboard.get_page(3)
+        self.assertTrue(has_next_page)
+        self.assertEqual([entry["rank"] for entry in entries], [1, 2, 3])
+
+        cursor = leaderboard.encode_cursor(entries[-1])
+        entries, has_next_page = leaderboard.get_page(2, cursor)
+        self.assertTrue(has_next_page)
+        self.assertEqual([entry["rank"] for entry in entries], [4, 5])
+
+        # The rank of the cursor is beyond the limit
+        cursor = leaderboard.encode_cursor(entries[0])
+        entries, has_next_page = leaderboard.get_page(2, cursor)
+        self.assertFalse(has_next_page)
+        self.assertEqual(
+            [entry["username"] for entry in entries], ["player_4", "player_5"]
+        )
+        self.assertEqual([entry["rank"] for entry in entries], [None, None])
@@ -0,0 +1,121 @@
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from games.matchmaking import QUEUE
+from games.models import Challange, QueueEntry
+
+
+def create_user(username, elo_rating):
+    """Helper function to create a user with the given rating."""
+    return get_user_model().objects.create_user(username, elo_rating=elo_rating)
+
+
+def wait_in_queue(user, seconds):
+    """Helper function moving the time of joining the queue back."""
+    QueueEntry.objects.filter(user=user).update(
+        joined_at=timezone.now() - timedelta(seconds=seconds)
+    )
+
+
+class MatchmakingQueueTests(TestCase):
+    """Tests of pairing users by the Elo rating."""
+
+    def test_users_within_band_are_paired(self):
+        """Test that the second user is paired at once and the first one gets the
+        challange on the next poll."""
+        first = create_user("first", 400)
+        second = create_user("second", 420)
+
+        self.assertIsNone(QUEUE.join(first))
+        challange = QUEUE.join(second)
+
+        self.assertEqual(challange.from_user, first)
+        self.assertEqual(challange.to_user, second)
+        self.assertEqual(QUEUE.join(first), challange)
+        self.assertFalse(QueueEntry.objects.exists())
+        self.assertEqual(Challange.objects.count(), 1)
+
+    def test_band_widens_with_waiting_time(self):
+        """Test that distant ratings are paired only after waiting long enough."""
+        first = create_user("first", 400)
+        second = create_user("second", 600)
+
+        self.assertIsNone(QUEUE.join(first))
+        self.assertIsNone(QUEUE.join(second))
+        wait_in_queue(first, 15)  # band of 50 + 10 * 15 = 200
+
+        challange = QUEUE.join(second)
+        self.assertEqual(challange.from_user, first)
+
+    def test_nearest_opponent_is_chosen(self):
+        """Test that the opponent with the nearest rating is paired."""
+        for username, elo_rating in [("low", 360), ("high", 430), ("far", 900)]:
+            QUEUE.join(create_user(username, elo_rating))
+
+        challange = QUEUE.join(create_user("user", 400))
+
+        self.assertEqual(challange.from_user.username, "high")
+
+    def test_paired_user_is_not_paired_again(self):
+        """Test that a user waiting for the pickup of a challange is skipped."""
+        first = create_user("first", 400)
+        QUEUE.join(first)
+        QUEUE.join(create_user("second", 400))
+
+        self.assertIsNone(QUEUE.join(create_user("third", 400)))
+        self.assertEqual(Challange.objects.filter(from_user=first).count(), 1)
+
+    def test_inactive_user_is_removed_and_not_paired(self):
+        """Test that users who stop polling leave the queue."""
+        absent = create_user("absent", 400)
+        QUEUE.join(absent)
+        QueueEntry.objects.filter(user=absent).update(
+            last_seen=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertIsNone(QUEUE.join(create_user("present", 400)))
+        self.assertFalse(QueueEntry.objects.filter(user=absent).exists())
+        self.assertFalse(Challange.objects.exists())
+
+    def test_leave(self):
+        """Test that a user who leaves the queue is not paired."""
+        user = create_user("user", 400)
+        QUEUE.join(user)
+
+        self.assertTrue(QUEUE.leave(user))
+        self.assertFalse(QUEUE.leave(user))
+        self.assertIsNone(QUEUE.join(create_user("other", 400)))
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class ConcurrentMatchmakingTests(TransactionTestCase):
+    """Tests of pairing users while other workers hold their rows."""
+
+    def test_user_locked_by_another_worker_is_skipped(self):
+        """Test that a user being paired by another worker is not paired again."""
+        locked = create_user("locked", 400)
+        QUEUE.join(locked)
+        is_locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    QueueEntry.objects.select_for_update().get(user=locked)
+                    is_locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        try:
+            self.assertTrue(is_locked.wait(5))
+            self.assertIsNone(QUEUE.join(create_user("other", 400)))
+        finally:
+            release.set()
+            worker.join()
+        self.assertFalse(Challange.objects.exists())
@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from games.models import Game, Position
+from games.positions import HASH_STRUCT, explore
+
+
+def create_game(moves, **fields):
+    """Helper function creating a finished game with a position after each move."""
+    game = Game(
+        positions=b"".join(HASH_STRUCT.pack(ply + 1) for ply in range(len(moves) + 1)),
+        **fields,
+    )
+    game.set_moves(moves)
+    game.save()
+    return game
+
+
+class IndexPositionsTests(TestCase):
+    """Tests of indexing the positions of finished games for the opening explorer."""
+
+    def test_game_with_unknown_result_is_not_counted(self):
+        """Test that a game with a winner but no recorded colors is not counted as
+        a draw."""
+        white = get_user_model().objects.create_user("white")
+        black = get_user_model().objects.create_user("black")
+        create_game(["e2e4"], winner=white, loser=black, white=white, black=black)
+        create_game(["e2e4"], winner=white, loser=black)
+
+        call_command("index_positions", stdout=StringIO())
+
+        self.assertEqual(
+            explore(1),
+            [
+                {
+                    "move": "e2e4",
+                    "games": 1,
+                    "white_wins": 1,
+                    "draws": 0,
+                    "black_wins": 0,
+                }
+            ],
+        )
+        self.assertEqual(Position.objects.get(zobrist=1).games_count, 1)
+        self.assertFalse(Game.objects.filter(is_indexed=False).exists())
@@ -0,0 +1,92 @@
+import ast
+import json
+from pathlib import Path
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from games.middleware import assert_query_budget
+from games.models import Challange
+from games.operations import MUTATION_END_GAME, QUERY_GET_CHALLANGE
+from games.schema import schema
+
+GAME_SERVER_CONFIG = Path(settings.BASE_DIR).parent / "game_server" / "config.py"
+
+
+class QueryBudgetTests(TestCase):
+    """Tests of the number of SQL queries executed by GraphQL operations."""
+
+    def setUp(self):
+        cache.clear()
+        self.white = get_user_model().objects.create_user("white")
+        self.black = get_user_model().objects.create_user("black")
+        self.challange = Challange.objects.create(
+            from_user=self.white, to_user=self.black
+        )
+
+    def test_challange_query_within_budget(self):
+        """Test that the challange query of the game server fits its budget."""
+        with assert_query_budget("challange"):
+            result = schema.execute(
+                QUERY_GET_CHALLANGE, variables={"gameId": str(self.challange.id)}
+            )
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(
+            result.data["challange"]["fromUser"]["username"], self.white.username
+        )
+
+    def test_end_game_mutation_within_budget(self):
+        """Test that the endGame mutation of the game server fits its budget."""
+        variables = {
+            "winnerUsername": "white",
+            "challangeId": str(self.challange.id),
+            "moves": "e2e4 e7e5",
+            "whiteUsername": "white",
+            "positions": "",
+        }
+        with assert_query_budget("endGame"):
+            result = schema.execute(MUTATION_END_GAME, variables=variables)
+
+        self.assertIsNone(result.errors)
+
+    @override_settings(GRAPHQL_QUERY_BUDGETS={"challange": 0})
+    def test_operation_over_budget_is_logged(self):
+        """Test that the middlewares log a GraphQL field exceeding its budget."""
+        payload = {
+            "query": QUERY_GET_CHALLANGE,
+            "variables": {"gameId": str(self.challange.id)},
+        }
+        with self.assertLogs("games.middleware", "WARNING") as logs:
+            self.client.post(
+                "/graphql", json.dumps(payload), content_type="application/json"
+            )
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("GraphQL field challange executed 1 queries", logs.output[0])
+
+    def test_other_requests_are_not_counted(self):
+        """Test that requests to views other than GraphQL are not counted."""
+        response = self.client.get("/admin/login/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, "query_counter"))
+
+    @skipUnless(GAME_SERVER_CONFIG.exists(), "The game server is not available")
+    def test_operations_match_game_server(self):
+        """Test that the tested operations are the ones sent by the game server."""
+        operations = {
+            node.targets[0].id: ast.literal_eval(node.value)
+            for node in ast.parse(GAME_SERVER_CONFIG.read_text()).body
+            if isinstance(node, ast.Assign)
+            and node.targets[0].id in ("QUERY_GET_CHALLANGE", "MUTATION_END_GAME")
+        }
+        self.assertEqual(
+            operations,
+            {
+                "QUERY_GET_CHALLANGE": QUERY_GET_CHALLANGE,
+                "MUTATION_END_GAME": MUTATION_END_GAME,
+            },
+        )
@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from games.models import Challange, Game, RatingHistory, StatusChoice
+from games.services import end_game
+
+
+class EndGameTests(TestCase):
+    """Tests of saving the result of a game and updating the Elo ratings."""
+
+    def setUp(self):
+        cache.clear()
+        self.white = get_user_model().objects.create_user("white", elo_rating=500)
+        self.black = get_user_model().objects.create_user("black", elo_rating=400)
+        self.challange = Challange.objects.create(
+            from_user=self.white, to_user=self.black
+        )
+
+    def end_game(self, winner_username="white"):
+        """Helper function ending the challange of both users."""
+        game = Game()
+        game.set_moves(["e2e4", "e7e5"])
+        return end_game(self.challange.id, game, winner_username, "white")
+
+    def test_win_updates_ratings_and_records_history(self):
+        """Test that the ratings of both players change by the Elo formula and every
+        change is recorded in the rating history."""
+        expected = {
+            "white": self.challange.calculate_elo_rating(self.white, self.black, 1),
+            "black": self.challange.calculate_elo_rating(self.black, self.white, 0),
+        }
+
+        challange = self.end_game()
+
+        self.assertEqual(challange.status, StatusChoice.DONE)
+        self.assertEqual(challange.game.winner, self.white)
+        self.assertEqual(challange.game.loser, self.black)
+        self.assertEqual(challange.game.white, self.white)
+        self.assertEqual(challange.game.get_moves(), ["e2e4", "e7e5"])
+        for user in get_user_model().objects.filter(username__in=expected):
+            self.assertEqual(user.elo_rating, expected[user.username])
+            history = RatingHistory.objects.get(user=user)
+            self.assertEqual(history.game, challange.game)
+            self.assertEqual(history.elo_rating, expected[user.username])
+        self.assertEqual(
+            RatingHistory.objects.get(user=self.white).elo_rating_change,
+            round(expected["white"] - 500, 1),
+        )
+
+    def test_draw(self):
+        """Test that a draw moves the ratings of the players towards each other."""
+        challange = self.end_game(winner_username=None)
+
+        self.assertTrue(challange.game.is_draw)
+        self.white.refresh_from_db()
+        self.black.refresh_from_db()
+        self.assertLess(self.white.elo_rating, 500)
+        self.assertGreater(self.black.elo_rating, 400)
+
+    def test_ending_game_twice_is_rejected(self):
+        """Test that the second ending of the same game changes nothing."""
+        self.end_game()
+        self.white.refresh_from_db()
+        elo_rating = self.white.elo_rating
+
+        with self.assertRaisesMessage(Exception, "This game has already ended"):
+            self.end_game(winner_username="black")
+        self.white.refresh_from_db()
+        self.assertEqual(self.white.elo_rating, elo_rating)
+        self.assertEqual(RatingHistory.objects.count(), 2)
+        self.assertEqual(Game.objects.count(), 1)
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_challange_and_players_are_locked(self):
+        """Test that the challange and both players are locked in the order of
+        primary keys before they are changed."""
+        with CaptureQueriesContext(connection) as queries:
+            self.end_game()
+
+        locking = [
+            query["sql"] for query in queries if query["sql"].endswith("FOR UPDATE")
+        ]
+        self.assertEqual(len(locking), 2)
+        self.assertIn('FROM "games_challange"', locking[0])
+        self.assertIn('FROM "users_user"', locking[1])
+        self.assertIn('ORDER BY "users_user"."id" ASC', locking[1])
+
+    def test_leaderboard_failure_does_not_fail_saved_result(self):
+        """Test that an error of the leaderboard after the commit is logged and the
+        saved result is returned."""
+        with patch(
+            "games.leaderboard.update_leaderboard", side_effect=Exception("timeout")
+        ):
+            with self.assertLogs("games.leaderboard", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    challange = self.end_game()
+
+        self.assertEqual(challange.status, StatusChoice.DONE)
+        self.white.refresh_from_db()
+        self.assertGreater(self.white.elo_rating, 500)
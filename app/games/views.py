@@ -0,0 +1,188 @@
+"""
+GraphQL endpoint with persisted queries and a cache of parsed documents.
+
+Clients may send the SHA-256 hash of the query in
+`extensions.persistedQuery.sha256Hash` (Automatic Persisted Queries protocol)
+instead of the query text. Unknown hashes are answered with the
+`PersistedQueryNotFound` error, after which the client sends the query with its
+hash once. Parsed and validated documents are kept in an LRU cache, so repeated
+queries are only executed.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    validate,
+)
+from graphql.pyutils import is_awaitable
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_HASH_MISMATCH = "provided sha does not match query"
+
+
+class DocumentCache:
+    """
+    LRU cache of parsed and validated GraphQL documents by the query text.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.documents = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, schema, query):
+        """
+        Get the parsed document of the query and its validation errors.
+
+        Raises:
+            GraphQLError: If the query cannot be parsed.
+        """
+        with self.lock:
+            if query in self.documents:
+                self.documents.move_to_end(query)
+                return self.documents[query]
+        document = parse(query)
+        entry = (document, validate(schema, document))
+        with self.lock:
+            self.documents[query] = entry
+            if len(self.documents) > self.size:
+                self.documents.popitem(last=False)
+        return entry
+
+
+DOCUMENT_CACHE = DocumentCache(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def get_persisted_query_hash(request, data):
+    """
+    Get the hash of the persisted query sent by the client, None if not sent.
+    """
+    extensions = request.GET.get("extensions") or data.get("extensions") or {}
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+    return extensions.get("persistedQuery", {}).get("sha256Hash")
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    GraphQL view resolving persisted queries and reusing parsed documents.
+    """
+
+    def get_query(self, request, data, query):
+        """
+        Get the query text from the request or the persisted queries.
+
+        Raises:
+            GraphQLError: If the hash is unknown or does not match the query.
+        """
+        query_hash = get_persisted_query_hash(request, data)
+        if not query_hash:
+            return query
+        cache_key = f"persisted-query:{query_hash}"
+        if not query:
+            query = cache.get(cache_key)
+            if query is None:
+                raise GraphQLError(PERSISTED_QUERY_NOT_FOUND)
+            return query
+        if hashlib.sha256(query.encode()).hexdigest() != query_hash:
+            raise GraphQLError(PERSISTED_QUERY_HASH_MISMATCH)
+        cache.set(cache_key, query, settings.GRAPHQL_PERSISTED_QUERY_TIMEOUT)
+        return query
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Execute the query like GraphQLView does, but with the persisted query
+        resolved and the document parsed and validated only once.
+        """
+        try:
+            query = self.get_query(request, data, query)
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+        if not query:
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+
+        try:
+            document, validation_errors = DOCUMENT_CACHE.get(
+                self.schema.graphql_schema, query
+            )
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if request.method.lower() == "get":
+            if operation_ast and operation_ast.operation != OperationType.QUERY:
+                if show_graphiql:
+                    return None
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["POST"],
+                        "Can only perform a {} operation from a POST request.".format(
+                            operation_ast.operation.value
+                        ),
+                    )
+                )
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        options = {
+            "schema": self.schema.graphql_schema,
+            "document": document,
+            "root_value": self.get_root_value(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "context_value": self.get_context(request),
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            options["execution_context_class"] = self.execution_context_class
+
+        try:
+            if (
+                operation_ast
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = self.execute_document(options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+            return self.execute_document(options)
+        except Exception as error:
+            return ExecutionResult(errors=[error])
+
+    @staticmethod
+    def execute_document(options):
+        """
+        Execute the parsed document synchronously.
+        """
+        result = execute(**options)
+        if is_awaitable(result):
+            raise GraphQLError("GraphQL execution failed to complete synchronously.")
+        return result
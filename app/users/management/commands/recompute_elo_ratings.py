@@ -0,0 +1,140 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from games import leaderboard
+from games.models import (
+    ELO_FACTOR_K,
+    ELO_START_VALUE,
+    Challange,
+    RatingHistory,
+    StatusChoice,
+)
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    """Django command to recompute Elo ratings of all users from finished games.
+
+    Games are streamed in the order they were played and split into rounds in
+    which no user plays twice. Ratings of all games of a round are computed at once
+    on arrays indexed by user id, with the same formula as
+    `Challange.calculate_elo_rating`.
+
+    Every changed rating is recorded in `RatingHistory` without a game, so the
+    latest change of a user matches the recomputed rating. The cached top of the
+    leaderboard is dropped once the ratings are committed.
+    """
+
+    help = "Recompute Elo ratings of all users from the history of games."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of rows fetched and updated in a single query.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Compute ratings without saving them.",
+        )
+
+    def handle(self, *args, chunk_size, dry_run, **options):
+        """Entrypoint for command."""
+        max_user_id = get_user_model().objects.aggregate(Max("id"))["id__max"] or 0
+        ratings = np.full(max_user_id + 1, ELO_START_VALUE, dtype=np.float64)
+
+        games = (
+            Challange.objects.filter(status=StatusChoice.DONE, game__isnull=False)
+            .order_by("game_id")
+            .values_list("from_user_id", "to_user_id", "game__winner_id")
+            .iterator(chunk_size=chunk_size)
+        )
+        games_count = 0
+        round_games, round_players = [], set()
+        for from_user_id, to_user_id, winner_id in games:
+            if from_user_id in round_players or to_user_id in round_players:
+                self.play_round(ratings, round_games)
+                round_games, round_players = [], set()
+            score = 0.5 if winner_id is None else float(winner_id == from_user_id)
+            round_games.append((from_user_id, to_user_id, score))
+            round_players.update((from_user_id, to_user_id))
+            games_count += 1
+        self.play_round(ratings, round_games)
+
+        updated = 0 if dry_run else self.save_ratings(ratings, chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed ratings from {games_count} games, "
+                f"updated {updated} users."
+            )
+        )
+
+    @staticmethod
+    def play_round(ratings, round_games):
+        """Update ratings after a round of games in which every user plays once.
+
+        Args:
+            ratings (numpy.ndarray): Ratings indexed by user id, updated in place.
+            round_games (list): Tuples of both user ids and the score of the first
+                user (1.0-win, 0.5-draw, 0.0-loss).
+        """
+        if not round_games:
+            return
+        players, opponents, scores = (np.array(column) for column in zip(*round_games))
+        player_ratings, opponent_ratings = ratings[players], ratings[opponents]
+        probability = 1 / (
+            1 + np.power(10, (opponent_ratings - player_ratings) / ELO_START_VALUE)
+        )
+        # The probabilities of both players sum up to 1
+        ratings[players] = np.round(
+            player_ratings + ELO_FACTOR_K * (scores - probability), 1
+        )
+        ratings[opponents] = np.round(
+            opponent_ratings + ELO_FACTOR_K * (probability - scores), 1
+        )
+
+    @staticmethod
+    def save_ratings(ratings, chunk_size):
+        """Save the changed ratings of users in chunks and record the changes in
+        the rating history.
+
+        Returns:
+            int: The number of updated users.
+        """
+        updated = 0
+        changed, history = [], []
+        with transaction.atomic():
+            users = (
+                get_user_model()
+                .objects.only("id", "elo_rating")
+                .order_by("id")
+                .iterator(chunk_size=chunk_size)
+            )
+            for user in users:
+                elo_rating = float(ratings[user.id])
+                if user.elo_rating != elo_rating:
+                    history.append(
+                        RatingHistory(
+                            user_id=user.id,
+                            elo_rating=elo_rating,
+                            elo_rating_change=round(elo_rating - user.elo_rating, 1),
+                        )
+                    )
+                    user.elo_rating = elo_rating
+                    changed.append(user)
+                if len(changed) == chunk_size:
+                    get_user_model().objects.bulk_update(changed, ["elo_rating"])
+                    RatingHistory.objects.bulk_create(history)
+                    updated += len(changed)
+                    changed, history = [], []
+            get_user_model().objects.bulk_update(changed, ["elo_rating"])
+            RatingHistory.objects.bulk_create(history)
+            # The top is built with the recomputed ratings on the next read
+            transaction.on_commit(lambda: cache.delete(leaderboard.CACHE_KEY))
+        return updated + len(changed)
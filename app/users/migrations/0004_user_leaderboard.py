@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_elo_rating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-elo_rating', 'id'], name='user_leaderboard'),
+        ),
+    ]
@@ -45,3 +45,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     REQUIRED_FIELDS = []
     USERNAME_FIELD = "username"
+
+    class Meta:
+        indexes = [
+            # Order of the leaderboard, ties are ranked by the id of the user
+            models.Index(fields=["-elo_rating", "id"], name="user_leaderboard"),
+        ]
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from games import leaderboard
+from games.models import Challange, Game, RatingHistory, StatusChoice
+
+
+class RecomputeEloRatingsTests(TestCase):
+    """Tests of recomputing the Elo ratings of all users from finished games."""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            get_user_model().objects.create_user(f"player_{index}")
+            for index in range(3)
+        ]
+
+    def play(self, from_user, to_user, winner):
+        """Helper function saving a finished game of the users."""
+        game = Game.objects.create(winner=winner, is_draw=winner is None)
+        Challange.objects.create(
+            from_user=from_user, to_user=to_user, game=game, status=StatusChoice.DONE
+        )
+
+    def test_ratings_match_elo_formula_history_and_leaderboard(self):
+        """Test that the recomputed ratings follow the games in order, are recorded
+        in the rating history and the cached leaderboard is dropped."""
+        first, second, third = self.users
+        self.play(first, second, winner=first)
+        self.play(second, third, winner=None)
+        self.play(first, third, winner=third)
+
+        # Replay the games one by one with the formula of the live updates
+        expected = {user.id: user for user in self.users}
+        for from_user, to_user, score in [
+            (first, second, 1),
+            (second, third, 0.5),
+            (first, third, 0),
+        ]:
+            new_from = Challange().calculate_elo_rating(from_user, to_user, score)
+            new_to = Challange().calculate_elo_rating(to_user, from_user, 1 - score)
+            from_user.elo_rating, to_user.elo_rating = new_from, new_to
+        leaderboard.get_top()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("recompute_elo_ratings", stdout=StringIO())
+
+        self.assertIsNone(cache.get(leaderboard.CACHE_KEY))
+        for user in get_user_model().objects.filter(id__in=expected):
+            self.assertAlmostEqual(user.elo_rating, expected[user.id].elo_rating)
+            latest = RatingHistory.objects.filter(user=user).first()
+            self.assertIsNone(latest.game)
+            self.assertEqual(latest.elo_rating, user.elo_rating)
+            self.assertEqual(latest.elo_rating_change, round(user.elo_rating - 400, 1))
+
+    def test_dry_run_changes_nothing(self):
+        """Test that a dry run neither saves ratings nor records history."""
+        self.play(*self.users[:2], winner=self.users[0])
+
+        call_command("recompute_elo_ratings", "--dry-run", stdout=StringIO())
+
+        self.assertFalse(RatingHistory.objects.exists())
+        self.assertEqual(
+            set(get_user_model().objects.values_list("elo_rating", flat=True)), {400}
+        )
@@ -0,0 +1,50 @@
+"""Microbenchmark of creating and copying chess boards.
+
+Run from the game_server directory:
+
+    python -m benchmarks.board [--number 2000]
+"""
+
+import argparse
+import copy
+import timeit
+
+from chess import Board, Game
+
+
+def set_up_board():
+    """Set up a board from scratch, as boards were created before templates."""
+    board = object.__new__(Board)
+    board.set_initial_position()
+    return board
+
+
+def played_board():
+    """Get a board after a few opening moves."""
+    board = Board()
+    for start_field, end_field in [("e2", "e4"), ("e7", "e5"), ("g1", "f3")]:
+        board.make_move(start_field, end_field)
+    return board
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    board = played_board()
+    cases = {
+        "Board() from the template": Board,
+        "Board set up from scratch": set_up_board,
+        "Game(id)": lambda: Game("benchmark"),
+        "Board.copy()": board.copy,
+        "copy.deepcopy(board)": lambda: copy.deepcopy(board),
+        "Board.simulate_move()": lambda: board.simulate_move("d7", "d5"),
+    }
+    for name, function in cases.items():
+        seconds = min(timeit.repeat(function, number=args.number, repeat=5))
+        print(f"{name:<28}{seconds / args.number * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
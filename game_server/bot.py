@@ -0,0 +1,380 @@
+"""Computer opponent playing one side of a game.
+
+Moves are found by iterative deepening alpha-beta search in worker processes, so
+searches of bots never block the event loop serving the games of humans.
+"""
+
+import asyncio
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from chess import Board, Color, Game, opposite_color
+from codec import DEFAULT_CODEC
+from movegen import in_check
+from zobrist import compute_hash
+
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+MATE_SCORE = 100000
+
+# CENTRALITY[x][y] is 0 on the edge and grows to 3 on the four central squares
+CENTRALITY = [[min(x, 7 - x, y, 7 - y) for y in range(8)] for x in range(8)]
+CENTRALITY_WEIGHTS = {"P": 5, "N": 10, "B": 5, "R": 0, "Q": 3, "K": 0}
+PAWN_ADVANCE_WEIGHT = 5
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+TableEntry = namedtuple("TableEntry", "key depth score bound move generation")
+
+
+class SearchTimeout(Exception):
+    """Raised when the time budget of the search is spent."""
+
+
+class TranspositionTable:
+    """Bounded table of search results keyed by Zobrist hashes of positions.
+
+    The table has a fixed number of slots indexed by the hash. A slot keeps the
+    result of a previous search only while it is deeper than the new result, so
+    deep results of the current search are not lost, while results of the
+    previous searches are always replaced.
+    """
+
+    def __init__(self, size=config.BOT_TABLE_SIZE):
+        self.slots = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        """Mark the results stored so far as coming from previous searches."""
+        self.generation += 1
+
+    def get(self, key):
+        """Get the entry of the position or None if it is not stored."""
+        entry = self.slots[key % len(self.slots)]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def put(self, key, depth, score, bound, move):
+        """Store the result of the search of the position.
+
+        Args:
+            key (int): The Zobrist hash of the position.
+            depth (int): The remaining depth the position was searched to.
+            score (int): The score from the point of view of the player to move.
+            bound (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+            move (tuple): The best move found, e.g. ("e2", "e4").
+        """
+        index = key % len(self.slots)
+        entry = self.slots[index]
+        if (
+            entry is None
+            or entry.generation != self.generation
+            or entry.key == key
+            or depth >= entry.depth
+        ):
+            self.slots[index] = TableEntry(
+                key, depth, score, bound, move, self.generation
+            )
+
+
+def evaluate(board, color):
+    """Evaluate the position from the point of view of the player.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the player.
+
+    Returns:
+        int: Material and placement of the pieces of the player minus the ones of
+            the opponent, in centipawns.
+    """
+    score = 0
+    for y, row in enumerate(board.gameboard):
+        for x, piece in enumerate(row):
+            if not piece:
+                continue
+            symbol = piece.symbol
+            value = PIECE_VALUES[symbol] + CENTRALITY_WEIGHTS[symbol] * CENTRALITY[x][y]
+            if symbol == "P":
+                advance = y - 1 if piece.color == Color.WHITE else 6 - y
+                value += PAWN_ADVANCE_WEIGHT * advance
+            score += value if piece.color == color else -value
+    return score
+
+
+def score_to_table(score, ply):
+    """Make a mate score relative to the position stored in the table."""
+    if score > MATE_SCORE - 1000:
+        return score + ply
+    if score < -MATE_SCORE + 1000:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Make a mate score of the table relative to the root of the search."""
+    if score > MATE_SCORE - 1000:
+        return score - ply
+    if score < -MATE_SCORE + 1000:
+        return score + ply
+    return score
+
+
+class Search:
+    """Alpha-beta search of the best move within a time budget.
+
+    Moves are ordered by the move stored in the transposition table, captures
+    (most valuable victim first), killer moves which caused a cutoff at the same
+    ply and the history of cutoffs of quiet moves.
+    """
+
+    def __init__(self, table, deadline):
+        self.table = table
+        self.deadline = deadline
+        self.killers = {}
+        self.history = {}
+        self.nodes = 0
+
+    def check_time(self):
+        """Stop the search if the deadline has passed.
+
+        Raises:
+            SearchTimeout: If the time budget is spent.
+        """
+        if time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def ordered_moves(self, board, moves, ply, table_move):
+        """Get the moves in the order they are searched in."""
+        killers = self.killers.get(ply, ())
+        scored_moves = []
+        for start_field, targets in moves.items():
+            attacker = PIECE_VALUES[board[start_field].symbol]
+            for end_field in targets:
+                move = (start_field, end_field)
+                victim = board[end_field]
+                if move == table_move:
+                    order = 3_000_000
+                elif victim:
+                    order = 2_000_000 + 10 * PIECE_VALUES[victim.symbol] - attacker
+                elif move in killers:
+                    order = 1_000_000
+                else:
+                    order = self.history.get(move, 0)
+                scored_moves.append((order, move))
+        scored_moves.sort(key=lambda scored_move: scored_move[0], reverse=True)
+        return [move for _, move in scored_moves]
+
+    def play(self, board, move):
+        """Get a copy of the board with the move made."""
+        child = board.copy()
+        child.make_move(*move)
+        return child
+
+    def quiescence(self, board, color, alpha, beta, moves, ply):
+        """Search captures until the position is quiet to avoid horizon effects.
+
+        Returns:
+            int: The score of the position from the point of view of the player.
+        """
+        self.check_time()
+        self.nodes += 1
+        stand_pat = evaluate(board, color)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        for move in self.ordered_moves(board, moves, ply, None):
+            if not board[move[1]]:
+                break  # captures are ordered first
+            child = self.play(board, move)
+            opponent = opposite_color(color)
+            child_moves = child.legal_moves(opponent)
+            if not child_moves:
+                score = MATE_SCORE - ply - 1 if in_check(child, opponent) else 0
+            else:
+                score = -self.quiescence(
+                    child, opponent, -beta, -alpha, child_moves, ply + 1
+                )
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(self, board, color, depth, alpha, beta, ply):
+        """Search the position to the depth.
+
+        Args:
+            board (Board): The chessboard.
+            color (Color): The color of the player to move.
+            depth (int): The remaining depth in plies.
+            alpha (int): The score the player is already assured of.
+            beta (int): The score the opponent is already assured of.
+            ply (int): The distance from the root of the search.
+
+        Returns:
+            Tuple: The score from the point of view of the player and the best move.
+
+        Raises:
+            SearchTimeout: If the time budget is spent.
+        """
+        self.check_time()
+        self.nodes += 1
+        moves = board.legal_moves(color)
+        if not moves:
+            return (-MATE_SCORE + ply if in_check(board, color) else 0), None
+        if ply > 0 and board.fifty_move_count >= 50:
+            return 0, None
+        if depth <= 0:
+            return self.quiescence(board, color, alpha, beta, moves, ply), None
+
+        key = compute_hash(board, color)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            table_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                score = score_from_table(entry.score, ply)
+                if (
+                    entry.bound == EXACT
+                    or (entry.bound == LOWER_BOUND and score >= beta)
+                    or (entry.bound == UPPER_BOUND and score <= alpha)
+                ):
+                    return score, entry.move
+
+        original_alpha = alpha
+        best_score, best_move = -MATE_SCORE - 1, None
+        for move in self.ordered_moves(board, moves, ply, table_move):
+            child = self.play(board, move)
+            score, _ = self.negamax(
+                child, opposite_color(color), depth - 1, -beta, -alpha, ply + 1
+            )
+            score = -score
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                if not board[move[1]]:
+                    killers = self.killers.setdefault(ply, [])
+                    if move not in killers:
+                        killers.insert(0, move)
+                        del killers[2:]
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.table.put(key, depth, score_to_table(best_score, ply), bound, best_move)
+        return best_score, best_move
+
+
+# Results of searches kept by every worker process between the moves
+TABLE = TranspositionTable()
+
+
+def find_move(fen, time_budget=config.BOT_MOVE_TIME, max_depth=config.BOT_MAX_DEPTH):
+    """Find the best move in the position within the time budget.
+
+    The position is searched one ply deeper at a time, so the move of the deepest
+    completed search is returned when the time budget is spent.
+
+    Args:
+        fen (str): The position in FEN.
+        time_budget (float, optional): Seconds the search may take.
+        max_depth (int, optional): Depth in plies at which the search stops.
+
+    Returns:
+        Tuple: The start and end squares of the move, e.g. ("e2", "e4"), or None
+            if the player has no legal move.
+    """
+    board, color = Board.from_fen(fen)
+    search = Search(TABLE, time.perf_counter() + time_budget)
+    TABLE.new_search()
+    moves = board.legal_moves(color)
+    if not moves:
+        return None
+    best_move = search.ordered_moves(board, moves, 0, None)[0]
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move = search.negamax(
+                board, color, depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0
+            )
+        except SearchTimeout:
+            break
+        best_move = move
+        if abs(score) > MATE_SCORE - 1000:
+            break  # the mate found is the shortest one
+    return best_move
+
+
+_executor = None
+
+
+def get_executor():
+    """Get the pool of processes searching the moves of all bots."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(config.BOT_WORKERS)
+    return _executor
+
+
+class BotPlayer:
+    """Computer opponent connected to a game in place of the websocket of a player.
+
+    The server sends it messages like to any player and iterates over the moves
+    it makes. It searches a move whenever a message leaves the game on its turn.
+    """
+
+    def __init__(self, game_id, time_budget=config.BOT_MOVE_TIME):
+        self.game_id = game_id
+        self.time_budget = time_budget
+        self.notified = asyncio.Event()
+
+    async def send(self, message):
+        """Receive a message of the server, which may have changed the game."""
+        self.notified.set()
+
+    async def close(self):
+        """Stop playing once the game is over."""
+        self.notified.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Wait for the turn of the bot and search the move.
+
+        Returns:
+            str: The move message encoded with the default codec.
+
+        Raises:
+            StopAsyncIteration: If the game is over.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.notified.wait()
+            self.notified.clear()
+            game = Game.get(self.game_id)
+            if game is None or game.is_over:
+                raise StopAsyncIteration
+            if game.player_1 is None:
+                continue  # the players are not placed yet
+            color = Color.WHITE if game.player_1.websocket is self else Color.BLACK
+            if game.current_turn_color != color:
+                continue
+            move = await loop.run_in_executor(
+                get_executor(),
+                find_move,
+                game.board.to_fen(color),
+                self.time_budget,
+            )
+            if move is not None and not game.is_over:
+                start_field, end_field = move
+                return DEFAULT_CODEC.dumps(
+                    {"type": "move", "from": start_field, "to": end_field}
+                )
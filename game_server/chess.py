@@ -1,9 +1,16 @@
-import copy
+import asyncio
+import logging
 from abc import ABC, abstractmethod
 from enum import Enum
 
 import config
+from clock import Clock
 from graph import send_result_to_app_server
+from metrics import MOVE_PHASE_SECONDS
+from movegen import generate_legal_moves, in_check
+from zobrist import compute_hash
+
+logger = logging.getLogger(__name__)
 
 
 class Color(Enum):
@@ -53,6 +60,7 @@ class Piece(ABC):
     """Abstract base class for chess pieces.
 
     Attributes:
+        symbol (str): Letter of the piece used in FEN, e.g. "N" for a Knight.
         color (Color): The color of the piece (white or black).
         position (tuple): The position of the piece on the board (x, y coordinates).
         position_code (str): The chess notation for the position of the piece.
@@ -69,6 +77,7 @@ class Piece(ABC):
         if abs(x_step) != abs(y_step)
     ]
     pawn_steps = {Color.BLACK: -1, Color.WHITE: 1}
+    symbol = None
 
     def __init__(self, color, position, position_code=None):
         """Initializes a new Piece object."""
@@ -87,6 +96,14 @@ class Piece(ABC):
         King."""
         return f"{self.__class__.__name__[0]}-{self.color.value[0]}"
 
+    @property
+    def fen_symbol(self):
+        """Returns the FEN letter of the piece, uppercase for white and lowercase for
+        black, e.g. "n" for a black Knight."""
+        if self.color == Color.WHITE:
+            return self.symbol
+        return self.symbol.lower()
+
     @abstractmethod
     def available_moves(self):
         """Abstract method that should be implemented by each concrete chess piece
@@ -159,7 +176,7 @@ class Piece(ABC):
             potential_board = board.simulate_move(self.position_code, move)
             if not potential_board.is_check(on_color=self.color):
                 moves.append(move)
-            return moves
+        return moves
 
 
 class Pawn(Piece):
@@ -171,6 +188,8 @@ class Pawn(Piece):
         - Pawns can be promoted to another piece if they reach the last rank.
     """
 
+    symbol = "P"
+
     def pawn_moves(self, steps, board):
         """Get possible moves for the Pawn, considering only forward movements.
 
@@ -229,12 +248,14 @@ class Pawn(Piece):
                     (
                         self.color == Color.WHITE
                         and y == 4
-                        and board.last_move_black[1] == alongside_position_code
+                        and board.last_move_black
+                        == (f"{alongside_position_code[0]}7", alongside_position_code)
                     )
                     or (
                         self.color == Color.BLACK
                         and y == 3
-                        and board.last_move_white[1] == alongside_position_code
+                        and board.last_move_white
+                        == (f"{alongside_position_code[0]}2", alongside_position_code)
                     )
                 )
             ):
@@ -272,6 +293,8 @@ class Knight(Piece):
         - Knights cannot be blocked by other pieces.
     """
 
+    symbol = "N"
+
     def __repr__(self):
         """Returns a string representation of the piece, e.g., "N-w" for a white
         Knight."""
@@ -308,6 +331,8 @@ class Rook(Piece):
         - Rooks can participate in castling if they have not moved before.
     """
 
+    symbol = "R"
+
     def available_moves(self, board, check=False):
         """Get the available moves for the Rook on the chessboard.
 
@@ -328,6 +353,8 @@ class Rook(Piece):
 class Bishop(Piece):
     """Represents a Bishop piece in the chess game."""
 
+    symbol = "B"
+
     def available_moves(self, board, check=False):
         """Get available moves for the Bishop on the chessboard.
 
@@ -348,6 +375,8 @@ class Bishop(Piece):
 class Queen(Piece):
     """Represents a Queen piece in the chess game."""
 
+    symbol = "Q"
+
     def available_moves(self, board, check=False):
         """Get available moves for the Queen on the chessboard.
 
@@ -373,6 +402,8 @@ class King(Piece):
         - The King can perform castling under certain conditions.
     """
 
+    symbol = "K"
+
     def available_moves(self, board, check=False):
         """Get available moves for the King on the chessboard.
 
@@ -393,25 +424,31 @@ class King(Piece):
                 possible_moves.remove(move)
 
         # check if castling is available and add to list of moves
-        if all(
-            [
-                not self.last_move,
-                not board.rook_a[self.color].last_move,
-                board.is_blank(f"b{self.position_code[1]}"),
-                board.is_blank(f"c{self.position_code[1]}"),
-                board.is_blank(f"d{self.position_code[1]}"),
-            ]
-        ):
-            possible_moves.append(f"c{self.position_code[1]}")
-        if all(
-            [
-                not self.last_move,
-                not board.rook_h[self.color].last_move,
-                board.is_blank(f"g{self.position_code[1]}"),
-                board.is_blank(f"f{self.position_code[1]}"),
-            ]
+        row = "1" if self.color == Color.WHITE else "8"
+        if (
+            self.last_move
+            or self.position_code != f"e{row}"
+            or board.is_check(on_color=self.color)
         ):
-            possible_moves.append(f"g{self.position_code[1]}")
+            return possible_moves
+        for rook, rook_file, empty_files, king_path in [
+            (board.rook_a[self.color], "a", "bcd", "dc"),
+            (board.rook_h[self.color], "h", "fg", "fg"),
+        ]:
+            if (
+                rook.last_move
+                or board[f"{rook_file}{row}"] is not rook
+                or not all(board.is_blank(f"{file}{row}") for file in empty_files)
+            ):
+                continue
+            # The king must not pass through or land on an attacked square
+            if not any(
+                board.simulate_move(self.position_code, f"{file}{row}").is_check(
+                    on_color=self.color
+                )
+                for file in king_path
+            ):
+                possible_moves.append(f"{king_path[-1]}{row}")
 
         return possible_moves
 
@@ -441,27 +478,57 @@ class Board:
         king (dict): The king piece for each color.
         rook_a (dict): The rook piece for each color on the 'a' file.
         rook_h (dict): The rook piece for each color on the 'h' file.
-        record_of_moves (dict): Record of all moves played in the game.
+        record_of_moves (dict): Record of all moves played in the game by the
+            full move number, built from the move log when read.
+        move_log (list): Moves in the order they were made as tuples of the full
+            move number, the start and end fields, the piece and the actions.
+        move_number (int): The full move number of the last recorded move.
         record_of_gameboard (dict): Records of gameboard states for three-fold
             repetition check.
         fifty_move_count (int): Moves without capture or pawn moves counter.
+        position_hashes (list): Zobrist hashes of the positions after each move,
+            starting with the initial position.
+        legal_moves_cache (dict): Legal moves of the current position by color,
+            cleared when the position changes.
+        views (dict): The nested and the flat encoding of the gameboard from the
+            point of view of each color, updated with every changed square once
+            built by `get_view`.
     """
 
+    _initial_board = None
+
     def __init__(self):
-        """Initializes a new Board object."""
+        """Initializes a new Board object with the initial position.
+
+        The position is copied from a board set up once per process, which is
+        never modified itself.
+        """
+        if Board._initial_board is None:
+            initial_board = object.__new__(Board)
+            initial_board.set_initial_position()
+            Board._initial_board = initial_board
+        Board._initial_board.copy_into(self)
+
+    def set_initial_position(self):
+        """Set up pieces and records of the board for the start of a game."""
         self.EMPTY = EmptySquare()
+        self.views = None
+        self.legal_moves_cache = {}
         self.gameboard = [8 * [self.EMPTY] for _ in range(8)]
         self.all_pieces = {Color.BLACK: set(), Color.WHITE: set()}
         self.generate_pieces_on_board()
         self.king = {Color.WHITE: self["e1"], Color.BLACK: self["e8"]}
         self.rook_a = {Color.WHITE: self["a1"], Color.BLACK: self["a8"]}
         self.rook_h = {Color.WHITE: self["h1"], Color.BLACK: self["h8"]}
+        self.move_log = []
+        self.move_number = 0
         self.record_of_moves = {}
         self.last_move_black = (None, None)
         self.last_move_white = (None, None)
         self.record_of_gameboard = {"one_rep": [], "two_rep": [], "three_rep": []}
         self.save_gameboard(self.gameboard)
         self.fifty_move_count = 0
+        self.position_hashes = [compute_hash(self, Color.WHITE)]
 
     def __getitem__(self, notation):
         """Get a chess piece on the board using chess notation.
@@ -489,6 +556,156 @@ class Board:
             piece.position_code = notation
             piece.position = (x_idx, y_idx)
         self.gameboard[y_idx][x_idx] = piece
+        if self.legal_moves_cache:
+            self.legal_moves_cache.clear()
+        if self.views is not None:
+            self.update_views(x_idx, y_idx, piece)
+
+    def get_view(self, color, encoding):
+        """Get the gameboard from the point of view of the player of the color.
+
+        Args:
+            color (Color): The color of the player.
+            encoding (str): `config.BOARD_ENCODING_NESTED` or
+                `config.BOARD_ENCODING_FLAT`.
+
+        Returns:
+            list or str: 8x8 list of pieces (e.g. "K-w") or None for empty squares,
+                or the string of 64 FEN piece letters ("." for empty squares). The
+                nested list is shared with later calls and must not be modified.
+        """
+        if self.views is None:
+            oriented_rows = {
+                Color.WHITE: self.gameboard[::-1],
+                Color.BLACK: [row[::-1] for row in self.gameboard],
+            }
+            self.views = {
+                view_color: (
+                    [[str(piece) if piece else None for piece in row] for row in rows],
+                    bytearray(
+                        "".join(
+                            piece.fen_symbol if piece else "."
+                            for row in rows
+                            for piece in row
+                        ),
+                        "ascii",
+                    ),
+                )
+                for view_color, rows in oriented_rows.items()
+            }
+        nested, flat = self.views[color]
+        if encoding == config.BOARD_ENCODING_FLAT:
+            return flat.decode()
+        return nested
+
+    def update_views(self, x_idx, y_idx, piece):
+        """Update the square of the gameboard views.
+
+        Args:
+            x_idx (int): The file index of the square.
+            y_idx (int): The rank index of the square.
+            piece (Piece or EmptySquare): The piece on the square.
+        """
+        name, symbol = (str(piece), ord(piece.fen_symbol)) if piece else (None, 46)
+        nested, flat = self.views[Color.WHITE]
+        nested[7 - y_idx][x_idx] = name
+        flat[(7 - y_idx) * 8 + x_idx] = symbol
+        nested, flat = self.views[Color.BLACK]
+        nested[y_idx][7 - x_idx] = name
+        flat[y_idx * 8 + 7 - x_idx] = symbol
+
+    @property
+    def record_of_moves(self):
+        """dict: Record of moves in the form {full move number: [white, black]}.
+
+        The record is cached and only the moves logged since the last read are
+        added to it, so it is not rebuilt for every message sent to players.
+        """
+        if self._record_of_moves is None:
+            self._record_of_moves = {num_move: [] for num_move in self._record_keys}
+            self._recorded_plies = 0
+        record = self._record_of_moves
+        new_moves = self.move_log[self._recorded_plies:]
+        for num_move, start_field, end_field, piece, actions in new_moves:
+            record.setdefault(num_move, []).append(
+                {
+                    "from": start_field,
+                    "to": end_field,
+                    "piece": piece,
+                    "actions": list(actions),
+                }
+            )
+        self._recorded_plies = len(self.move_log)
+        return record
+
+    @record_of_moves.setter
+    def record_of_moves(self, record):
+        self._record_keys = tuple(record)
+        self._record_of_moves = None
+        self.move_log = [
+            (
+                num_move,
+                move["from"],
+                move["to"],
+                move["piece"],
+                tuple(move["actions"]),
+            )
+            for num_move in sorted(record)
+            for move in record[num_move]
+        ]
+        self.move_number = max(record, default=0)
+
+    def copy(self):
+        """Get an independent copy of the board.
+
+        Returns:
+            Board: The board with copies of all pieces in the same state.
+        """
+        board = object.__new__(type(self))
+        self.copy_into(board)
+        return board
+
+    def copy_into(self, board):
+        """Copy the state of the board into another board object.
+
+        It is a much faster equivalent of `copy.deepcopy`, which copies only
+        pieces and mutable records. Records of past moves and gameboards are
+        shared, since they are only appended to.
+
+        Args:
+            board (Board): The board object to overwrite.
+        """
+        copies = {}
+
+        def copy_piece(piece):
+            if piece in copies:
+                return copies[piece]
+            piece_copy = object.__new__(piece.__class__)
+            piece_copy.__dict__.update(piece.__dict__)
+            copies[piece] = piece_copy
+            return piece_copy
+
+        board.__dict__.update(self.__dict__)
+        board.all_pieces = {
+            color: set(map(copy_piece, pieces))
+            for color, pieces in self.all_pieces.items()
+        }
+        board.gameboard = [
+            [square if square is self.EMPTY else copy_piece(square) for square in row]
+            for row in self.gameboard
+        ]
+        board.king = {color: copy_piece(king) for color, king in self.king.items()}
+        board.rook_a = {color: copy_piece(rook) for color, rook in self.rook_a.items()}
+        board.rook_h = {color: copy_piece(rook) for color, rook in self.rook_h.items()}
+        board.move_log = list(self.move_log)
+        board._record_of_moves = None
+        board.record_of_gameboard = {
+            key: list(gameboards)
+            for key, gameboards in self.record_of_gameboard.items()
+        }
+        board.position_hashes = list(self.position_hashes)
+        board.views = None
+        board.legal_moves_cache = {}
 
     def generate_pieces_on_board(self):
         """Generate and place all pieces on the initial chessboard."""
@@ -511,20 +728,193 @@ class Board:
             self[f"{y_idx}2"] = white_pawn
             self[f"{y_idx}1"] = white_piece
 
-    def is_no_legal_move(self, on_color, check=False):
+    def fen_placement(self):
+        """Get the piece placement field of FEN (Forsyth-Edwards Notation).
+
+        Returns:
+            str: Ranks from 8 to 1 separated by "/", e.g. "8/8/8/8/8/8/8/K6k".
+        """
+        ranks = []
+        for row in reversed(self.gameboard):
+            rank, empty = "", 0
+            for piece in row:
+                if piece:
+                    rank += f"{empty or ''}{piece.fen_symbol}"
+                    empty = 0
+                else:
+                    empty += 1
+            ranks.append(f"{rank}{empty or ''}")
+        return "/".join(ranks)
+
+    def castling_rights(self):
+        """Get the castling availability field of FEN, e.g. "KQkq" or "-".
+
+        Returns:
+            str: Castling rights of both players.
+        """
+        rights = ""
+        for color, row in [(Color.WHITE, "1"), (Color.BLACK, "8")]:
+            king = self.king[color]
+            if not king or king.last_move or king.position_code != f"e{row}":
+                continue
+            for rook, file, letter in [
+                (self.rook_h[color], "h", "K"),
+                (self.rook_a[color], "a", "Q"),
+            ]:
+                if (
+                    rook in self.all_pieces[color]
+                    and not rook.last_move
+                    and rook.position_code == f"{file}{row}"
+                ):
+                    rights += letter if color == Color.WHITE else letter.lower()
+        return rights or "-"
+
+    def en_passant_target(self, turn_color):
+        """Get the en passant target square field of FEN, e.g. "e3" or "-".
+
+        Args:
+            turn_color (Color): The color of the player to move.
+
+        Returns:
+            str: The square passed over by the pawn which has just moved two squares.
+        """
+        if turn_color == Color.WHITE:
+            start_field, end_field = self.last_move_black
+        else:
+            start_field, end_field = self.last_move_white
+        if (
+            end_field
+            and isinstance(self[end_field], Pawn)
+            and abs(int(start_field[1]) - int(end_field[1])) == 2
+        ):
+            return f"{end_field[0]}{(int(start_field[1]) + int(end_field[1])) // 2}"
+        return "-"
+
+    def to_fen(self, turn_color):
+        """Get the position in FEN (Forsyth-Edwards Notation).
+
+        Args:
+            turn_color (Color): The color of the player to move.
+
+        Returns:
+            str: The position, e.g. the initial one is
+                "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1".
+
+        Note:
+            The halfmove clock is the counter of the 50-move rule.
+        """
+        full_move = self.move_number
+        if turn_color == Color.WHITE:
+            full_move += 1
+        return " ".join(
+            [
+                self.fen_placement(),
+                turn_color.value[0],
+                self.castling_rights(),
+                self.en_passant_target(turn_color),
+                str(self.fifty_move_count),
+                str(max(full_move, 1)),
+            ]
+        )
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Create a board with the position given in FEN.
+
+        Args:
+            fen (str): The position in FEN (Forsyth-Edwards Notation).
+
+        Returns:
+            Tuple: The board and the color of the player to move.
+
+        Note:
+            The record of moves starts at the full move number of the position and
+            the record of gameboards used for the three-fold repetition starts with
+            the given position.
+        """
+        placement, turn, castling, en_passant, half_move, full_move = fen.split()
+        board = cls()
+        board.gameboard = [8 * [board.EMPTY] for _ in range(8)]
+        board.all_pieces = {Color.BLACK: set(), Color.WHITE: set()}
+
+        for y_idx, rank in enumerate(reversed(placement.split("/"))):
+            x_idx = 0
+            for letter in rank:
+                if letter.isdigit():
+                    x_idx += int(letter)
+                    continue
+                color = Color.WHITE if letter.isupper() else Color.BLACK
+                piece = PIECE_CLASSES[letter.upper()](color, (x_idx, y_idx))
+                board.all_pieces[color].add(piece)
+                board[to_chess_notation((x_idx, y_idx))] = piece
+                x_idx += 1
+
+        # Pieces without castling rights are marked as already moved
+        for color, row in [(Color.WHITE, "1"), (Color.BLACK, "8")]:
+            king = next(
+                piece for piece in board.all_pieces[color] if isinstance(piece, King)
+            )
+            board.king[color] = king
+            rights = castling if color == Color.WHITE else castling.swapcase()
+            if "K" not in rights and "Q" not in rights:
+                king.last_move = 1
+            for attribute, file, letter in [
+                ("rook_a", "a", "Q"),
+                ("rook_h", "h", "K"),
+            ]:
+                rook = board[f"{file}{row}"]
+                if not (isinstance(rook, Rook) and rook.color == color):
+                    rook = Rook(color, None)
+                if letter not in rights:
+                    rook.last_move = 1
+                getattr(board, attribute)[color] = rook
+
+        if en_passant != "-":
+            file, row = en_passant
+            if row == "3":
+                board.last_move_white = (f"{file}2", f"{file}4")
+            else:
+                board.last_move_black = (f"{file}7", f"{file}5")
+
+        turn_color = Color.WHITE if turn == "w" else Color.BLACK
+        board.fifty_move_count = int(half_move)
+        full_move = int(full_move)
+        if turn_color == Color.BLACK:
+            board.record_of_moves = {full_move: []}
+        elif full_move > 1:
+            board.record_of_moves = {full_move - 1: []}
+        board.record_of_gameboard = {"one_rep": [], "two_rep": [], "three_rep": []}
+        board.save_gameboard(board.gameboard)
+        board.position_hashes = [compute_hash(board, turn_color)]
+        return board, turn_color
+
+    def legal_moves(self, color):
+        """Get the legal moves of the player of the specified color.
+
+        Moves are generated by `movegen.generate_legal_moves` once per position and
+        cached until the position changes.
+
+        Args:
+            color (Color): The color of the player.
+
+        Returns:
+            dict: Target squares in chess notation by the start square of every
+                piece that can move, e.g. {"e2": ["e3", "e4"]}.
+        """
+        if color not in self.legal_moves_cache:
+            self.legal_moves_cache[color] = generate_legal_moves(self, color)
+        return self.legal_moves_cache[color]
+
+    def is_no_legal_move(self, on_color):
         """Check if the player of the specified color has no legal move.
 
         Args:
             on_color (Color): Color of the player to check for stalemate.
-            check (bool, optional): If checking stalemate in a check situation.
 
         Returns:
             bool: True if no legal move, False otherwise.
         """
-        for piece in self.all_pieces[on_color]:
-            if piece.available_moves(self, check):
-                return False
-        return True
+        return not self.legal_moves(on_color)
 
     def is_check(self, on_color):
         """Check if the player of the specified color is in check.
@@ -536,14 +926,36 @@ class Board:
             bool: True if the player of the specified color is in check, False otherwise
         """
         king = self.king[on_color]
+        opponent_king = self.king[opposite_color(on_color)]
+        # Kings never attack each other, but cannot stand next to each other
+        if opponent_king is not None and max(
+            abs(ord(king.position_code[0]) - ord(opponent_king.position_code[0])),
+            abs(int(king.position_code[1]) - int(opponent_king.position_code[1])),
+        ) == 1:
+            return True
         attackers = self.all_pieces[opposite_color(on_color)]
-        attackers = attackers.difference({self.king[opposite_color(on_color)]})
+        attackers = attackers.difference({opponent_king})
         for piece in attackers:
             for target in piece.available_moves(self):
                 if target == king.position_code:
                     return True
         return False
 
+    def has_mating_material(self, color):
+        """Check if the player has enough pieces left to checkmate.
+
+        Args:
+            color (Color): The color of the player.
+
+        Returns:
+            bool: False if only the king is left, alone or with a single knight or
+                bishop, True otherwise.
+        """
+        pieces = [piece for piece in self.all_pieces[color] if piece.symbol != "K"]
+        if not pieces:
+            return False
+        return len(pieces) > 1 or pieces[0].symbol not in ("N", "B")
+
     def is_blank(self, position):
         """Check if a given position on the board is empty.
 
@@ -571,30 +983,36 @@ class Board:
         return -1 < position[1] < 8 and -1 < position[0] < 8
 
     def save_move(self, start_field, end_field, piece, actions):
-        """Save the move to record_of_moves made by a piece.
+        """Save the move made by a piece to the move log.
 
         Args:
             start_field (str): Starting position of the move in chess notation.
             end_field (str): Ending position of the move in chess notation.
             piece (Piece): The chess piece making the move.
+            actions (list): Actions which took place, e.g. "capturing".
         """
-        if self.record_of_moves:
-            num_move = max(self.record_of_moves.keys())
-        else:
-            num_move = 0
-        piece.last_move = num_move
-        move_data = {
-            "from": start_field,
-            "to": end_field,
-            "piece": str(piece),
-            "actions": actions,
-        }
+        self.legal_moves_cache.clear()  # castling and en passant rights changed
+        piece.last_move = self.move_number
         if piece.color == Color.WHITE:
-            self.record_of_moves[num_move + 1] = [move_data]
+            self.move_number += 1
             self.last_move_white = (start_field, end_field)
         else:
-            self.record_of_moves[num_move].append(move_data)
             self.last_move_black = (start_field, end_field)
+        self.move_log.append(
+            (self.move_number, start_field, end_field, str(piece), tuple(actions))
+        )
+
+    def uci_moves(self):
+        """Get the moves played on the board in coordinate notation.
+
+        Returns:
+            list: Moves in the order they were made, e.g. ["e2e4", "e7e8q"]. Pawns
+                are always promoted to a queen.
+        """
+        return [
+            start_field + end_field + ("q" if "promotion" in actions else "")
+            for _, start_field, end_field, _, actions in self.move_log
+        ]
 
     def save_gameboard(self, gameboard):
         """Save the current state of the gameboard for repetition check.
@@ -660,7 +1078,9 @@ class Board:
                 end_field[1] == "1" and piece.color == Color.BLACK
             ):
                 actions.append("promotion")
-                piece = Queen(piece.color)  # pawn promotion
+                board.all_pieces[piece.color].discard(piece)
+                piece = Queen(piece.color, piece.position)  # pawn promotion
+                board.all_pieces[piece.color].add(piece)
 
         # Check if en passant was made and involved it
         if (
@@ -705,6 +1125,9 @@ class Board:
             self.save_move(start_field, end_field, piece, actions)
             self.save_gameboard(self.gameboard)
             self.fifty_move_count += 1
+            self.position_hashes.append(
+                compute_hash(self, opposite_color(piece.color))
+            )
 
     def simulate_move(self, start_pos, end_pos):
         """Simulate a move on the chessboard without modifying the original board.
@@ -716,7 +1139,7 @@ class Board:
         Returns:
             Board: A new board representing the state after the simulated move.
         """
-        board_copy = copy.deepcopy(self)
+        board_copy = self.copy()
         self.make_move(start_pos, end_pos, board_copy)
         return board_copy
 
@@ -733,19 +1156,17 @@ class Board:
             Exception: If the move is not legal.
         """
         piece = self[start_field]
-        check = self.is_check(on_color=current_player.color)
         if piece == self.EMPTY:
             raise Exception(config.EMPTY_START_FIELD)
         if piece.color != current_player.color:
             raise Exception(config.NOT_YOUR_PIECE)
-        if end_field not in piece.available_moves(self, check=check):
-            raise Exception(
-                config.ILLEGAL_MOVE.format(piece.available_moves(self, check=check))
-            )
-
-        potential_board = self.simulate_move(start_field, end_field)
-        if potential_board.is_check(on_color=current_player.color):
+        legal_moves = self.legal_moves(current_player.color).get(start_field, [])
+        if end_field in legal_moves:
+            return
+        # Tell apart moves the piece cannot make from moves exposing the king
+        if end_field in piece.available_moves(self):
             raise Exception(config.ILLEGAL_MOVE_CHECK_WARNING)
+        raise Exception(config.ILLEGAL_MOVE.format(legal_moves))
 
     def check_if_checkmate(self, current_player):
         """Check if the current player is in checkmate.
@@ -756,13 +1177,8 @@ class Board:
         Returns:
             bool: True if the current player is in checkmate, False otherwise.
         """
-        if self.is_check(
-            on_color=opposite_color(current_player.color)
-        ) and self.is_no_legal_move(
-            on_color=opposite_color(current_player.color), check=True
-        ):
-            return True
-        return False
+        opponent_color = opposite_color(current_player.color)
+        return in_check(self, opponent_color) and self.is_no_legal_move(opponent_color)
 
     def check_if_stalemate(self, current_player):
         """Check if the current player is in stalemate.
@@ -774,7 +1190,8 @@ class Board:
             str or None: A string describing the type of stalemate, or None if not
                 in stalemate.
         """
-        if self.is_no_legal_move(on_color=opposite_color(current_player.color)):
+        opponent_color = opposite_color(current_player.color)
+        if not in_check(self, opponent_color) and self.is_no_legal_move(opponent_color):
             return "Stalemate! No legal move"
         elif self.record_of_gameboard["three_rep"]:
             return "Draw! by the 3-fold repetition"
@@ -782,6 +1199,13 @@ class Board:
             return "Draw! by the 50-move rule"
 
 
+# Mapping of the FEN letter to the piece class, e.g. "N" => Knight
+PIECE_CLASSES = {
+    piece_class.symbol: piece_class
+    for piece_class in [Pawn, Knight, Bishop, Rook, Queen, King]
+}
+
+
 class Player:
     """Represents a player participating in a chess game.
 
@@ -812,11 +1236,19 @@ class Game:
         is_over (bool): True if the game has ended, False otherwise.
         result_description (str): Description of the game result.
         id (int): The unique identifier of the game.
+        expected_usernames (dict): Usernames of the players by color if the game
+            has been restored after a restart of the server, None otherwise.
+        is_rated (bool): False if the result is not reported to the app server.
+        clock (Clock): The clock of the players.
+        premoves (dict): Moves (start field, end field) queued by the players
+            during the turn of the opponent, by color.
     """
 
     instances = []  # List to store all created game instances.
 
-    def __init__(self, id):
+    def __init__(
+        self, id, base_time=config.CLOCK_BASE_TIME, increment=config.CLOCK_INCREMENT
+    ):
         self.board = Board()
         self.player_1 = None
         self.player_2 = None
@@ -825,6 +1257,10 @@ class Game:
         self.is_over = False
         self.result_description = ""
         self.id = id
+        self.expected_usernames = None
+        self.is_rated = True  # games against bots are not reported
+        self.clock = Clock(base_time, increment)
+        self.premoves = {}
 
         # Add this game instance to the list of instances after it's created.
         Game.instances.append(self)
@@ -847,9 +1283,19 @@ class Game:
         Args:
             player_1 (dict): Information about the first player.
             player_2 (dict): Information about the second player.
+
+        Note:
+            In a restored game the players keep the colors they had before the
+            restart, regardless of the order in which they have reconnected.
         """
+        if (
+            self.expected_usernames
+            and player_1["username"] == self.expected_usernames[Color.BLACK]
+        ):
+            player_1, player_2 = player_2, player_1
         self.player_1 = Player(player_1["websocket"], player_1["username"], Color.WHITE)
         self.player_2 = Player(player_2["websocket"], player_2["username"], Color.BLACK)
+        self.clock.start(self.current_turn_color)
 
     def handle_move(self, start_field, end_field, websocket):
         """Handle a move made by a player.
@@ -880,20 +1326,142 @@ class Game:
         if current_player.color != self.current_turn_color:
             raise Exception(config.NOT_YOUR_TURN)
 
+        # The move is too late if the flag has fallen before it was received
+        if self.check_flag():
+            raise Exception(config.OUT_OF_TIME)
+
         # Check if the move is legal and update the game board accordingly
-        self.board.check_if_legal_move(start_field, end_field, current_player)
-        self.board.make_move(start_field, end_field)
+        with MOVE_PHASE_SECONDS.labels("legality").time():
+            self.board.check_if_legal_move(start_field, end_field, current_player)
+        with MOVE_PHASE_SECONDS.labels("make_move").time():
+            self.board.make_move(start_field, end_field)
+        self.clock.press(current_player.color)
 
         # Switch the turn of the player making move
         self.current_turn_color = opposite_color(self.current_turn_color)
 
+        # Detect the end of the game before reporting it, so the timing of this
+        # phase does not include the call to the app server
+        with MOVE_PHASE_SECONDS.labels("terminal").time():
+            is_checkmate = self.board.check_if_checkmate(current_player)
+            draw_description = self.board.check_if_stalemate(current_player)
+
         # Check if the move results in checkmate
-        if self.board.check_if_checkmate(current_player):
+        if is_checkmate:
             result_description = f"Check-Mate! {current_player.username} won!"
             self.end_with_win(current_player, result_description)
         # Check if the move results in stalemate
-        if result_description := self.board.check_if_stalemate(current_player):
-            self.end_with_draw(result_description)
+        if draw_description:
+            self.end_with_draw(draw_description)
+
+    def set_premove(self, start_field, end_field, websocket):
+        """Queue the move of the player to be made right after the opponent's move.
+
+        The premove replaces the one queued before. Its legality is checked only
+        when it is made.
+
+        Args:
+            start_field (str): The starting position of the piece to be moved.
+            end_field (str): The ending position of the piece after the move.
+            websocket (WebSocketServerProtocol): WebSocket connection of the player.
+
+        Returns:
+            bool: True if the move is queued, False if it is already the turn of
+                the player, so the move is to be made at once.
+
+        Raises:
+            Exception: If the player does not take part in the game or the start
+                field is not occupied by their piece.
+        """
+        if self.player_1.websocket == websocket:
+            player = self.player_1
+        elif self.player_2.websocket == websocket:
+            player = self.player_2
+        else:
+            raise Exception(config.INVALID_PARTICIPANT)
+        if player.color == self.current_turn_color:
+            return False
+        piece = self.board[start_field]
+        if piece == self.board.EMPTY:
+            raise Exception(config.EMPTY_START_FIELD)
+        if piece.color != player.color:
+            raise Exception(config.NOT_YOUR_PIECE)
+        self.premoves[player.color] = (start_field, end_field)
+        return True
+
+    def cancel_premove(self, websocket):
+        """Remove the move queued by the player.
+
+        Returns:
+            tuple: The removed move (start field, end field), None if no move was
+                queued.
+        """
+        color = Color.WHITE if self.player_1.websocket == websocket else Color.BLACK
+        return self.premoves.pop(color, None)
+
+    def cancel_premoves(self):
+        """Remove the moves queued by both players, e.g. when the game is over.
+
+        Returns:
+            dict: The removed moves (start field, end field) by color.
+        """
+        premoves, self.premoves = self.premoves, {}
+        return premoves
+
+    def play_premove(self):
+        """Make the move queued by the player on turn.
+
+        Returns:
+            Tuple: The start field, the end field and the reason the move was not
+                made (None if it was made), or None if no move was queued or the
+                game is over, in which case the move stays queued.
+        """
+        if self.is_over:
+            return None
+        if self.current_turn_color == Color.WHITE:
+            player = self.player_1
+        else:
+            player = self.player_2
+        premove = self.premoves.pop(player.color, None)
+        if premove is None:
+            return None
+        start_field, end_field = premove
+        try:
+            self.handle_move(start_field, end_field, player.websocket)
+        except Exception as error:
+            return start_field, end_field, str(error)
+        return start_field, end_field, None
+
+    def check_flag(self):
+        """End the game if the player on turn has run out of time.
+
+        The opponent wins, unless they cannot checkmate with the pieces left, in
+        which case the game is drawn.
+
+        Returns:
+            bool: True if the game has ended on time, False otherwise.
+        """
+        if self.is_over or not self.clock.is_flagged(self.current_turn_color):
+            return False
+        if self.current_turn_color == Color.WHITE:
+            loser, winner = self.player_1, self.player_2
+        else:
+            loser, winner = self.player_2, self.player_1
+        if self.board.has_mating_material(winner.color):
+            self.end_with_win(winner, f"Game end! {loser.username} ran out of time!")
+        else:
+            self.end_with_draw(
+                f"Draw! {loser.username} ran out of time, but {winner.username} "
+                "cannot checkmate."
+            )
+        return True
+
+    def get_clock(self):
+        """Get the seconds left to the players, e.g. {"white": 59.5, "black": 60}."""
+        return {
+            color.value: round(max(self.clock.get_remaining(color), 0), 3)
+            for color in Color
+        }
 
     def end_with_win(self, current_player, result_description):
         """End the game with a win for the specified player.
@@ -905,7 +1473,7 @@ class Game:
         self.winner = current_player
         self.result_description = result_description
         self.is_over = True
-        return send_result_to_app_server(self.winner.username, self.id)
+        return self.report_result()
 
     def end_with_draw(self, result_description):
         """End the game with a draw (stalemate).
@@ -915,24 +1483,87 @@ class Game:
         """
         self.result_description = result_description
         self.is_over = True
-        return send_result_to_app_server("", self.id)
+        return self.report_result()
+
+    def report_result(self):
+        """Send the result and the moves of the finished game to the app server.
+
+        On the event loop of the server the request is sent in a thread, so a slow
+        app server does not block other games, and failures are logged. Without a
+        running event loop (e.g. in scripts) it is sent at once.
+
+        Returns:
+            Future or dict: The future of the response on the event loop, the
+                response otherwise, None if the game is not rated.
+        """
+        if not self.is_rated:
+            return None
+        result = (
+            self.winner.username if self.winner else "",
+            self.id,
+            self.board.uci_moves(),
+            self.player_1.username,
+            list(self.board.position_hashes),
+        )
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return send_result_to_app_server(*result)
+        future = loop.run_in_executor(None, send_result_to_app_server, *result)
+        future.add_done_callback(self.log_report_failure)
+        return future
+
+    def log_report_failure(self, future):
+        """Log the error of sending the result to the app server, if any."""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                "Reporting the result of game %s failed",
+                self.id,
+                exc_info=future.exception(),
+            )
+
+    def get_legal_moves(self, websocket):
+        """Get the legal moves of the player if the game is on their turn.
 
-    def get_chessboard(self, websocket):
-        """Get the current chessboard as a string representation for the specified
-        player.
+        Moves are taken from the cache of the board, so clients check their moves
+        without the moves being generated again.
 
         Args:
             websocket (WebSocketServerProtocol): The WebSocket connection of the player.
 
         Returns:
-            str: Object representation of the chessboard.
+            dict: Target squares joined into one string by the start square, e.g.
+                {"e2": "e3e4", "g1": "h3f3"}, empty if the opponent is to move or
+                the game is over.
         """
-        board_strings = [
-            [str(piece) if piece else None for piece in row]
-            for row in self.board.gameboard
-        ]
-
         if self.player_1.websocket == websocket:
-            return board_strings[::-1]
+            color = self.player_1.color
         else:
-            return [row[::-1] for row in board_strings]
+            color = self.player_2.color
+        if self.is_over or color != self.current_turn_color:
+            return {}
+        return {
+            start_field: "".join(targets)
+            for start_field, targets in self.board.legal_moves(color).items()
+        }
+
+    def get_chessboard(self, websocket, encoding=config.BOARD_ENCODING_NESTED):
+        """Get the current chessboard representation for the specified player.
+
+        Args:
+            websocket (WebSocketServerProtocol): The WebSocket connection of the player.
+            encoding (str, optional): One of `config.BOARD_ENCODINGS`:
+                - nested: 8x8 list of pieces (e.g. "K-w") or None for empty squares,
+                    ordered from the player's point of view.
+                - flat: string of 64 FEN piece letters ("." for empty squares) in
+                    the same order as the nested list.
+                - fen: piece placement field of FEN, independent of the player.
+
+        Returns:
+            list or str: Representation of the chessboard.
+        """
+        if encoding == config.BOARD_ENCODING_FEN:
+            return self.board.fen_placement()
+        if self.player_1.websocket == websocket:
+            return self.board.get_view(Color.WHITE, encoding)
+        return self.board.get_view(Color.BLACK, encoding)
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """Chess clock of a game with the base time and an increment per move.
+
+    The time of the player on turn runs from the moment the clock was started or
+    the opponent has moved. Players are identified by values of `chess.Color`.
+
+    Attributes:
+        remaining (dict): Seconds left to each player when their time started.
+        increment (float): Seconds added to the time of a player after the move.
+        running (str): The color of the player whose time runs, None if stopped.
+        started_at (float): Monotonic time at which the time of the player started.
+    """
+
+    def __init__(
+        self, base_time=config.CLOCK_BASE_TIME, increment=config.CLOCK_INCREMENT
+    ):
+        self.remaining = {"white": base_time, "black": base_time}
+        self.increment = increment
+        self.running = None
+        self.started_at = None
+
+    def start(self, color, now=None):
+        """Start the time of the player unless the clock is already running.
+
+        Args:
+            color (Color): The color of the player on turn.
+            now (float, optional): The current monotonic time.
+        """
+        if self.running is None:
+            self.running = color.value
+            self.started_at = time.monotonic() if now is None else now
+
+    def press(self, color, now=None):
+        """Charge the player for the move and start the time of the opponent.
+
+        Args:
+            color (Color): The color of the player who has moved.
+            now (float, optional): The current monotonic time.
+        """
+        now = time.monotonic() if now is None else now
+        if self.running == color.value:
+            self.remaining[color.value] -= now - self.started_at
+        self.remaining[color.value] += self.increment
+        self.running = "black" if color.value == "white" else "white"
+        self.started_at = now
+
+    def get_remaining(self, color, now=None):
+        """Get the seconds left to the player, negative once the flag has fallen.
+
+        Args:
+            color (Color): The color of the player.
+            now (float, optional): The current monotonic time.
+        """
+        remaining = self.remaining[color.value]
+        if self.running == color.value:
+            now = time.monotonic() if now is None else now
+            remaining -= now - self.started_at
+        return remaining
+
+    def get_deadline(self):
+        """Get the monotonic time at which the flag falls, None if stopped."""
+        if self.running is None:
+            return None
+        return self.started_at + self.remaining[self.running]
+
+    def is_flagged(self, color, now=None):
+        """Check if the player has run out of time."""
+        if self.running != color.value:
+            return False
+        now = time.monotonic() if now is None else now
+        return now >= self.get_deadline()
+
+
+class FlagTimer:
+    """Single timer ending the games of all players who run out of time.
+
+    Deadlines of the clocks are kept in a heap and one task sleeps until the
+    earliest of them. A game is scheduled again after every move, so entries whose
+    clock has been pressed since are dropped when they are due.
+
+    Attributes:
+        on_flag (coroutine function): Called with the game ended on time.
+        heap (list): Entries (deadline, sequence number, game).
+    """
+
+    def __init__(self, on_flag):
+        self.on_flag = on_flag
+        self.heap = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, game):
+        """Schedule the check of the flag of the player on turn in the game.
+
+        Args:
+            game (Game): The game whose clock has been started or pressed.
+        """
+        deadline = game.clock.get_deadline()
+        if deadline is None or game.is_over:
+            return
+        if not self.heap or deadline < self.heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self.heap, (deadline, next(self._counter), game))
+
+    async def run(self):
+        """Wait for the earliest deadline and end the game if the flag has fallen."""
+        while True:
+            timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            deadline, _, game = heapq.heappop(self.heap)
+            if game.is_over or game.clock.get_deadline() != deadline:
+                continue
+            try:
+                if game.check_flag():
+                    await self.on_flag(game)
+            except Exception:
+                logger.exception("Failed to end game %s on time", game.id)
@@ -0,0 +1,109 @@
+import json
+
+import config
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency
+    orjson = None
+
+
+class StdlibJsonBackend:
+    """JSON backend based on the standard library `json` module."""
+
+    name = "json"
+
+    @staticmethod
+    def dumps(obj):
+        """Serialize the object to a compact JSON string."""
+        return json.dumps(obj, separators=(",", ":"))
+
+    @staticmethod
+    def loads(data):
+        """Deserialize the JSON string or bytes."""
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    """JSON backend based on `orjson`, which is several times faster than `json`.
+
+    Note:
+        Integer keys (e.g. move numbers in the record of moves) are serialized as
+        strings, the same as the standard library does.
+    """
+
+    name = "orjson"
+
+    @staticmethod
+    def dumps(obj):
+        """Serialize the object to a compact JSON string."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(data):
+        """Deserialize the JSON string or bytes."""
+        return orjson.loads(data)
+
+
+def get_json_backend(name=config.JSON_BACKEND):
+    """Get the JSON backend by name.
+
+    Args:
+        name (str, optional): "orjson", "json" or "auto" to use orjson when it is
+            installed and fall back to the standard library otherwise.
+
+    Returns:
+        JSON backend providing `dumps` and `loads` functions.
+    """
+    if name == "json" or (name == "auto" and orjson is None):
+        return StdlibJsonBackend
+    if orjson is None:
+        raise ImportError("orjson backend requested but orjson is not installed")
+    return OrjsonBackend
+
+
+class Codec:
+    """Encoding of the messages exchanged with a single client.
+
+    Attributes:
+        json_backend: Backend used to serialize and deserialize messages.
+        board_encoding (str): Encoding of the board in the game state messages,
+            one of `config.BOARD_ENCODINGS`.
+    """
+
+    def __init__(self, json_backend, board_encoding=config.BOARD_ENCODING_NESTED):
+        self.json_backend = json_backend
+        self.board_encoding = board_encoding
+
+    def dumps(self, message):
+        """Serialize a message sent to the client."""
+        return self.json_backend.dumps(message)
+
+    def loads(self, message):
+        """Deserialize a message received from the client."""
+        return self.json_backend.loads(message)
+
+
+JSON_BACKEND = get_json_backend()
+DEFAULT_CODEC = Codec(JSON_BACKEND)
+
+
+def negotiate_codec(login_data):
+    """Choose the codec for the client based on its login message.
+
+    The client may ask for a compact board encoding by providing `boardEncoding` in
+    the login message. Unknown encodings fall back to the nested list of squares
+    understood by every client.
+
+    Args:
+        login_data (dict): The decoded login message of the client.
+
+    Returns:
+        Codec: The codec used for the messages exchanged with the client.
+    """
+    board_encoding = login_data.get("boardEncoding", config.BOARD_ENCODING_NESTED)
+    if board_encoding not in config.BOARD_ENCODINGS:
+        board_encoding = config.BOARD_ENCODING_NESTED
+    if board_encoding == DEFAULT_CODEC.board_encoding:
+        return DEFAULT_CODEC
+    return Codec(JSON_BACKEND, board_encoding)
@@ -1,14 +1,73 @@
 # network connection parameters
 PORT_WEBSOCKET = 5050
 QUERY_GET_CHALLANGE = (
-    'query {{challange (gameId: "{}"){{id fromUser {{username eloRating}} '
-    'toUser {{username eloRating}} eloRatingChanges }} }}'
+    "query GetChallange($gameId: String) {challange(gameId: $gameId) {id "
+    "fromUser {username eloRating} toUser {username eloRating} eloRatingChanges}}"
 )
 MUTATION_END_GAME = (
-    'mutation {{endGame(winnerUsername: "{}", challangeId:"{}"){{challange {{id}} }} }}'
+    "mutation EndGame($winnerUsername: String, $challangeId: ID, $moves: String, "
+    "$whiteUsername: String, $positions: String) {endGame(winnerUsername: "
+    "$winnerUsername, challangeId: $challangeId, moves: $moves, whiteUsername: "
+    "$whiteUsername, positions: $positions) {challange {id}}}"
 )
 URL_APP = "http://app:8000/graphql"
 URL_WEBSOCKET = f"ws://localhost:{PORT_WEBSOCKET}"
+APP_SERVER_TIMEOUT = 5  # seconds to wait for a response of the app server
+
+# websocket transport parameters
+WEBSOCKET_COMPRESSION = True  # accept permessage-deflate offered by clients
+WEBSOCKET_COMPRESSION_LEVEL = 6  # zlib compression level (1-9)
+WEBSOCKET_COMPRESSION_MEM_LEVEL = 5  # zlib memory level (1-9)
+WEBSOCKET_COMPRESSION_MAX_WINDOW_BITS = 12  # 4 KiB compression window per direction
+WEBSOCKET_MAX_SIZE = 2**16  # max size of incoming message in bytes
+WEBSOCKET_MAX_QUEUE = 8  # max number of incoming messages buffered per connection
+WEBSOCKET_READ_LIMIT = 2**14  # high-water mark of the read buffer in bytes
+WEBSOCKET_WRITE_LIMIT = 2**15  # high-water mark of the write buffer in bytes
+WEBSOCKET_PING_INTERVAL = 20  # seconds between keepalive pings
+WEBSOCKET_PING_TIMEOUT = 20  # seconds to wait for pong before closing connection
+WEBSOCKET_CLOSE_TIMEOUT = 5  # seconds to wait for the closing handshake
+LOGIN_TIMEOUT = 30  # seconds to send the login message after connecting
+
+# instrumentation parameters
+PORT_METRICS = 5051
+EVENT_LOOP_LAG_INTERVAL = 0.5  # seconds between event loop lag measurements
+WATCHDOG_THRESHOLD = 0.1  # seconds of event loop lag reported as blocking
+PROFILING_ENABLED = False  # profile all games from the start of the server
+PROFILING_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILING_DUMP_PATH = "profile.folded"
+PROFILING_GAMES_PATH = "profile.games"  # IDs of games profiled on SIGUSR1 (or all)
+
+# message encoding parameters
+JSON_BACKEND = "auto"  # "orjson", "json" or "auto" (orjson if installed)
+BOARD_ENCODING_NESTED = "nested"  # 8x8 list of pieces, e.g. "K-w", None if empty
+BOARD_ENCODING_FLAT = "flat"  # 64 FEN piece letters in order of the nested list
+BOARD_ENCODING_FEN = "fen"  # piece placement field of FEN
+BOARD_ENCODINGS = (BOARD_ENCODING_NESTED, BOARD_ENCODING_FLAT, BOARD_ENCODING_FEN)
+
+# game state persistence parameters
+STORE_DIRECTORY = "state"  # directory of the journal and snapshots of live games
+STORE_FLUSH_INTERVAL = 0.2  # seconds between writes of the journal of moves
+STORE_SNAPSHOT_INTERVAL = 30  # seconds between snapshots of all live games
+
+# headless simulator parameters
+SIMULATOR_MAX_PLIES = 400  # random games longer than this are left unfinished
+SIMULATOR_BATCH_SIZE = 25  # games played by a worker process at once
+
+# move generator fuzzing parameters
+FUZZ_MAX_PLIES = 200  # random games are stopped after this many plies
+
+# computer opponent parameters
+BOT_OPPONENT = "bot"  # value of "opponent" in the login message to play a bot
+BOT_USERNAME = "bot"
+BOT_MOVE_TIME = 1.0  # seconds a bot searches a move
+BOT_MAX_DEPTH = 8  # plies at which the search of a move stops
+BOT_TABLE_SIZE = 2**16  # entries of the transposition table of a worker process
+BOT_WORKERS = 2  # processes searching the moves of all bots
+BOT_FAILED = "Game end! The computer opponent has failed."
+
+# time control parameters
+CLOCK_BASE_TIME = 600  # seconds on the clock of each player at the start
+CLOCK_INCREMENT = 5  # seconds added to the clock of a player after every move
 
 # commands available to use by user during the game
 COMMAND_DRAW_OFFER = "draw"
@@ -33,4 +92,7 @@ NOT_YOUR_TURN = "It is not your turn!"
 ILLEGAL_MOVE = "Invalid move! Possibilities of this piece: {}"
 ILLEGAL_MOVE_CHECK_WARNING = "Illegal move due to attack on your king"
 INVALID_PARTICIPANT = "You are not a participant of game"
+OUT_OF_TIME = "Your time is over!"
+PREMOVE_CANCELLED = "Premove cancelled"
+PREMOVE_GAME_OVER = "Premove cancelled, the game is over"
 WRONG_COLOR = "Invalid color"
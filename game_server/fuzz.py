@@ -0,0 +1,294 @@
+"""Differential fuzzing of the legal move generator against the reference rules.
+
+Random games are played and at every ply the legal moves, the check and the
+terminal state given by `Board.legal_moves` (used by the game) are compared with
+the ones of the reference implementation, which simulates every move returned by
+`Piece.available_moves` and tests the king with `Board.is_check`. A divergence is
+minimized to a position in FEN and the moves leading from it to the divergence:
+
+    python fuzz.py --games 200 --seed 0
+    python fuzz.py --fen "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+"""
+
+import argparse
+import random
+
+import config
+from chess import Board, Color, Piece, Player, opposite_color
+from movegen import in_check
+
+INITIAL_FEN = Board().to_fen(Color.WHITE)
+
+
+def reference_legal_moves(board, color):
+    """Get the legal moves of the player by simulating every available move.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the player.
+
+    Returns:
+        dict: Sorted target squares by the start square of every piece that can
+            move.
+    """
+    moves = {}
+    for row in board.gameboard:
+        for piece in row:
+            if isinstance(piece, Piece) and piece.color == color:
+                targets = [
+                    target
+                    for target in piece.available_moves(board)
+                    if not board.simulate_move(piece.position_code, target).is_check(
+                        on_color=color
+                    )
+                ]
+                if targets:
+                    moves[piece.position_code] = sorted(targets)
+    return moves
+
+
+def reference_state(board, color):
+    """Get the legal moves, the check and the terminal state by the reference rules.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the player to move.
+
+    Returns:
+        dict: The "moves", "check" and "terminal" state, or the "error" raised.
+    """
+    try:
+        moves = reference_legal_moves(board, color)
+        check = board.is_check(on_color=color)
+    except Exception as exc:
+        return {"error": repr(exc)}
+    terminal = None
+    if not moves:
+        terminal = "checkmate" if check else "stalemate"
+    return {"moves": moves, "check": check, "terminal": terminal}
+
+
+def optimized_state(board, color):
+    """Get the legal moves, the check and the terminal state used by the game.
+
+    The terminal state is detected the way `Game.handle_move` does it, after the
+    move of the opponent.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the player to move.
+
+    Returns:
+        dict: The "moves", "check" and "terminal" state, or the "error" raised.
+    """
+    try:
+        moves = {
+            start_field: sorted(targets)
+            for start_field, targets in board.legal_moves(color).items()
+        }
+        check = in_check(board, color)
+        opponent = Player(None, "", opposite_color(color))
+        terminal = None
+        if board.check_if_checkmate(opponent):
+            terminal = "checkmate"
+        elif board.check_if_stalemate(opponent) == "Stalemate! No legal move":
+            terminal = "stalemate"
+    except Exception as exc:
+        return {"error": repr(exc)}
+    return {"moves": moves, "check": check, "terminal": terminal}
+
+
+def diverges(reference, optimized):
+    """Check if the states differ or the rules raised an exception."""
+    return reference != optimized or "error" in reference
+
+
+def find_divergence(fen, uci_moves):
+    """Replay the moves from the position and compare the states at every ply.
+
+    Args:
+        fen (str): The starting position in FEN.
+        uci_moves (list): Moves in coordinate notation, e.g. ["e2e4", "e7e5"].
+
+    Returns:
+        dict or None: The "ply" of the first divergence with the "reference" and
+            "optimized" states, None if the states agree at every ply or a move
+            is not legal in the replayed game.
+    """
+    board, color = Board.from_fen(fen)
+    for ply in range(len(uci_moves) + 1):
+        reference = reference_state(board, color)
+        optimized = optimized_state(board, color)
+        if diverges(reference, optimized):
+            return {"ply": ply, "reference": reference, "optimized": optimized}
+        if ply == len(uci_moves):
+            return None
+        start_field, end_field = uci_moves[ply][:2], uci_moves[ply][2:4]
+        if end_field not in reference["moves"].get(start_field, []):
+            return None
+        board.make_move(start_field, end_field)
+        color = opposite_color(color)
+
+
+def fen_after(fen, uci_moves):
+    """Get the position in FEN after the moves were made from the position."""
+    board, color = Board.from_fen(fen)
+    for move in uci_moves:
+        board.make_move(move[:2], move[2:4])
+        color = opposite_color(color)
+    return board.to_fen(color)
+
+
+def remove_piece(fen, square):
+    """Get the position in FEN without the piece standing on the square."""
+    board, color = Board.from_fen(fen)
+    piece = board[square]
+    board.all_pieces[piece.color].discard(piece)
+    board[square] = board.EMPTY
+    return board.to_fen(color)
+
+
+def minimize(fen, uci_moves):
+    """Shrink a diverging game to a short one from a position with few pieces.
+
+    The game is started from the latest position from which its remaining moves
+    still diverge, then pieces other than kings are removed one by one as long
+    as the divergence is reproduced.
+
+    Args:
+        fen (str): The starting position in FEN.
+        uci_moves (list): Moves in coordinate notation leading to the divergence.
+
+    Returns:
+        Tuple: The position in FEN and the moves, e.g. ("7k/...", ["e1g1"]).
+    """
+    divergence = find_divergence(fen, uci_moves)
+    uci_moves = uci_moves[: divergence["ply"]]
+    for start in range(len(uci_moves), 0, -1):
+        start_fen = fen_after(fen, uci_moves[:start])
+        remaining_moves = uci_moves[start:]
+        if find_divergence(start_fen, remaining_moves):
+            fen, uci_moves = start_fen, remaining_moves
+            break
+
+    removed = True
+    while removed:
+        removed = False
+        board, _ = Board.from_fen(fen)
+        for row in board.gameboard:
+            for piece in row:
+                if not isinstance(piece, Piece) or piece.symbol == "K":
+                    continue
+                if any(piece.position_code in move for move in uci_moves):
+                    continue
+                smaller_fen = remove_piece(fen, piece.position_code)
+                if find_divergence(smaller_fen, uci_moves):
+                    fen, removed = smaller_fen, True
+                    break
+            if removed:
+                break
+    return fen, uci_moves
+
+
+def fuzz_game(rng, fen=INITIAL_FEN, max_plies=config.FUZZ_MAX_PLIES):
+    """Play a game of random legal moves comparing the states at every ply.
+
+    Args:
+        rng (random.Random): Source of the moves.
+        fen (str, optional): The starting position in FEN.
+        max_plies (int, optional): Number of plies after which the game is stopped.
+
+    Returns:
+        Tuple: The moves played and the first divergence (see `find_divergence`),
+            or None if the states agree at every ply.
+    """
+    board, color = Board.from_fen(fen)
+    uci_moves = []
+    for _ in range(max_plies + 1):
+        reference = reference_state(board, color)
+        optimized = optimized_state(board, color)
+        if diverges(reference, optimized):
+            divergence = {
+                "ply": len(uci_moves),
+                "reference": reference,
+                "optimized": optimized,
+            }
+            return uci_moves, divergence
+        if reference["terminal"] or len(uci_moves) == max_plies:
+            break
+        start_field, end_field = rng.choice(
+            [
+                (start_field, end_field)
+                for start_field, targets in reference["moves"].items()
+                for end_field in targets
+            ]
+        )
+        board.make_move(start_field, end_field)
+        uci_moves.append(board.uci_moves()[-1])
+        color = opposite_color(color)
+    return uci_moves, None
+
+
+def fuzz(games, seed=0, fen=INITIAL_FEN, max_plies=config.FUZZ_MAX_PLIES):
+    """Fuzz the move generator with random games until the first divergence.
+
+    Args:
+        games (int): Number of random games.
+        seed (int, optional): Seed of the random games.
+        fen (str, optional): The starting position of the games in FEN.
+        max_plies (int, optional): Maximum length of the games.
+
+    Returns:
+        dict or None: The minimized "fen" and "moves" reproducing the divergence
+            with the "reference" and "optimized" states, None if no divergence
+            was found.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        uci_moves, divergence = fuzz_game(rng, fen, max_plies)
+        if divergence is None:
+            continue
+        minimized_fen, minimized_moves = minimize(fen, uci_moves)
+        divergence = find_divergence(minimized_fen, minimized_moves)
+        return {
+            "fen": minimized_fen,
+            "moves": minimized_moves,
+            "reference": divergence["reference"],
+            "optimized": divergence["optimized"],
+        }
+    return None
+
+
+def format_divergence(divergence):
+    """Format a divergence returned by `fuzz` as a report."""
+    lines = [
+        f"FEN:   {divergence['fen']}",
+        f"Moves: {' '.join(divergence['moves']) or '-'}",
+    ]
+    for side in ("reference", "optimized"):
+        state = divergence[side]
+        lines.append(f"{side.capitalize()}:")
+        for key in ("error", "check", "terminal", "moves"):
+            if key in state:
+                lines.append(f"  {key}: {state[key]}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100, help="random games")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fen", default=INITIAL_FEN, help="starting position")
+    parser.add_argument("--max-plies", type=int, default=config.FUZZ_MAX_PLIES)
+    args = parser.parse_args()
+
+    divergence = fuzz(args.games, args.seed, args.fen, args.max_plies)
+    if divergence is None:
+        print(f"No divergence in {args.games} games")
+        return
+    print(format_divergence(divergence))
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
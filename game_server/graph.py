@@ -1,16 +1,79 @@
-def send_result_to_app_server(winner_username, challange_id):
+import hashlib
+
+import config
+import requests
+from metrics import track_app_server_call
+from zobrist import pack_hashes
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+
+def execute_graphql(query, variables):
+    """Execute the GraphQL operation on the application server.
+
+    The operation is sent as a persisted query, i.e. only the hash of the query
+    with variables, so the app server neither receives nor parses the query text
+    again. The full query is sent only when the app server does not know the hash
+    yet.
+
+    Args:
+        query (str): The GraphQL operation using variables.
+        variables (dict): Values of the variables.
+
+    Returns:
+        dict: A dictionary containing the response data received from the server.
+    """
+    payload = {
+        "variables": variables,
+        "extensions": {
+            "persistedQuery": {
+                "version": 1,
+                "sha256Hash": hashlib.sha256(query.encode()).hexdigest(),
+            }
+        },
+    }
+    response = requests.post(
+        config.URL_APP, json=payload, timeout=config.APP_SERVER_TIMEOUT
+    ).json()
+    errors = response.get("errors") or []
+    if any(error.get("message") == PERSISTED_QUERY_NOT_FOUND for error in errors):
+        payload["query"] = query
+        response = requests.post(
+            config.URL_APP, json=payload, timeout=config.APP_SERVER_TIMEOUT
+        ).json()
+    return response
+
+
+@track_app_server_call("end_game")
+def send_result_to_app_server(
+    winner_username, challange_id, moves, white_username, position_hashes
+):
     """Send the game result to the application server.
 
     Args:
         winner_username (str): The username of the winner of the game.
         challange_id (str): The ID of the game challenge.
+        moves (list): Moves of the game in coordinate notation, e.g. ["e2e4"].
+        white_username (str): The username of the player with white pieces.
+        position_hashes (list): Zobrist hashes of the positions after each move,
+            sent packed with `zobrist.pack_hashes`.
 
     Returns:
         dict: A dictionary containing the response data received from the server.
     """
-    pass
+    return execute_graphql(
+        config.MUTATION_END_GAME,
+        {
+            "winnerUsername": winner_username,
+            "challangeId": challange_id,
+            "moves": " ".join(moves),
+            "whiteUsername": white_username,
+            "positions": pack_hashes(position_hashes),
+        },
+    )
 
 
+@track_app_server_call("get_challange")
 def get_challanges_from_app_server(game_id):
     """Get challenge data from the application server.
 
@@ -20,4 +83,4 @@ def get_challanges_from_app_server(game_id):
     Returns:
         dict: A dictionary containing the response data received from the server.
     """
-    pass
+    return execute_graphql(config.QUERY_GET_CHALLANGE, {"gameId": game_id})
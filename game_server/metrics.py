@@ -0,0 +1,98 @@
+from functools import wraps
+
+import config
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server
+
+# Metrics exposed by the game server
+ACTIVE_GAMES = Gauge("chess_active_games", "Number of games which are not over.")
+WAITING_PLAYERS = Gauge(
+    "chess_waiting_players", "Number of players waiting for an opponent."
+)
+CONNECTED_SOCKETS = Gauge(
+    "chess_connected_sockets", "Number of open client WebSocket connections."
+)
+MOVE_PHASE_SECONDS = Histogram(
+    "chess_move_phase_seconds",
+    "Time spent handling a move, split by phase.",
+    labelnames=("phase",),
+)
+OUTBOUND_MESSAGES = Counter(
+    "chess_outbound_messages", "Number of messages sent to clients."
+)
+OUTBOUND_MESSAGE_BYTES = Counter(
+    "chess_outbound_message_bytes", "Size of messages sent to clients in bytes."
+)
+APP_SERVER_CALL_SECONDS = Histogram(
+    "chess_app_server_call_seconds",
+    "Latency of calls to the application server.",
+    labelnames=("operation",),
+)
+APP_SERVER_CALL_ERRORS = Counter(
+    "chess_app_server_call_errors",
+    "Number of failed calls to the application server.",
+    labelnames=("operation",),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "chess_event_loop_lag_seconds",
+    "Delay between the scheduled and the actual wake-up of the event loop.",
+)
+MESSAGE_LATENCY_SECONDS = Histogram(
+    "chess_message_latency_seconds",
+    "End-to-end time of handling a client message including sending the responses, "
+    "split by message type.",
+    labelnames=("message_type",),
+)
+SLOW_HANDLERS = Counter(
+    "chess_slow_handlers",
+    "Number of times handling a client message blocked the event loop longer than "
+    "the watchdog threshold.",
+    labelnames=("message_type",),
+)
+
+
+def track_app_server_call(operation):
+    """Decorator measuring latency and errors of calls to the application server.
+
+    Args:
+        operation (str): Name of the operation used as the metric label.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with APP_SERVER_CALL_SECONDS.labels(operation).time():
+                with APP_SERVER_CALL_ERRORS.labels(operation).count_exceptions():
+                    return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_sample_value(name, labels=None):
+    """Get the current value of a sample of the default registry.
+
+    Args:
+        name (str): Name of the sample, e.g. `chess_move_phase_seconds_count`.
+        labels (dict, optional): Labels of the sample.
+
+    Returns:
+        float: The value of the sample, 0 if it has not been recorded yet.
+    """
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def start_metrics_server(host="0.0.0.0", port=config.PORT_METRICS):
+    """Start the HTTP server exposing the metrics endpoint in a daemon thread.
+
+    The server only renders the metrics, so gauges computed by functions are
+    called from its thread.
+
+    Args:
+        host (str, optional): Interface to listen on.
+        port (int, optional): Port to listen on.
+
+    Returns:
+        Tuple: The running server and its thread.
+    """
+    return start_http_server(port, host)
@@ -0,0 +1,347 @@
+ROOK_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_JUMPS = ((1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1))
+SLIDER_DIRECTIONS = {
+    "R": ROOK_DIRECTIONS,
+    "B": BISHOP_DIRECTIONS,
+    "Q": QUEEN_DIRECTIONS,
+}
+
+# NOTATION[x][y] is the chess notation of the square, e.g. NOTATION[0][0] == "a1"
+NOTATION = [[f"{chr(x + 97)}{y + 1}" for y in range(8)] for x in range(8)]
+
+
+def slides_along(symbol, direction):
+    """Check if a piece of the symbol moves any distance in the direction."""
+    if symbol == "Q":
+        return True
+    if symbol == "R":
+        return direction[0] == 0 or direction[1] == 0
+    if symbol == "B":
+        return direction[0] != 0 and direction[1] != 0
+    return False
+
+
+def is_attacked(board, x, y, color, removed=(), added=None):
+    """Check if the square is attacked by a piece of the opponent of the color.
+
+    Args:
+        board (Board): The chessboard.
+        x (int): The file index of the square.
+        y (int): The rank index of the square.
+        color (Color): The color of the defending player.
+        removed (tuple, optional): Squares (x, y) treated as empty.
+        added (tuple, optional): A square (x, y) and the piece treated as standing
+            on it.
+
+    Returns:
+        bool: True if an opponent's piece attacks the square.
+    """
+    gameboard = board.gameboard
+
+    def piece_at(square_x, square_y):
+        if added is not None and added[0] == (square_x, square_y):
+            return added[1]
+        if (square_x, square_y) in removed:
+            return None
+        return gameboard[square_y][square_x]
+
+    for dx, dy in KNIGHT_JUMPS:
+        square_x, square_y = x + dx, y + dy
+        if 0 <= square_x < 8 and 0 <= square_y < 8:
+            piece = piece_at(square_x, square_y)
+            if piece and piece.color != color and piece.symbol == "N":
+                return True
+
+    for dx, dy in QUEEN_DIRECTIONS:
+        square_x, square_y = x + dx, y + dy
+        distance = 1
+        while 0 <= square_x < 8 and 0 <= square_y < 8:
+            piece = piece_at(square_x, square_y)
+            if piece:
+                if piece.color != color:
+                    if distance == 1 and piece.symbol == "K":
+                        return True
+                    if slides_along(piece.symbol, (dx, dy)):
+                        return True
+                    # Pawns attack diagonally forward in their direction
+                    if (
+                        distance == 1
+                        and piece.symbol == "P"
+                        and dx != 0
+                        and dy == -piece.pawn_steps[piece.color]
+                    ):
+                        return True
+                break
+            square_x, square_y = square_x + dx, square_y + dy
+            distance += 1
+    return False
+
+
+def find_checks_and_pins(board, color, king_x, king_y):
+    """Find the pieces checking the king and the pieces pinned to it.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the king.
+        king_x (int): The file index of the king.
+        king_y (int): The rank index of the king.
+
+    Returns:
+        Tuple: The list of checks, each a set of squares (x, y) on which a piece
+            stops it (the checking piece and squares between it and the king), and
+            the squares the pinned pieces may move to by their squares.
+    """
+    gameboard = board.gameboard
+    checks = []
+    pins = {}
+
+    for dx, dy in KNIGHT_JUMPS:
+        x, y = king_x + dx, king_y + dy
+        if 0 <= x < 8 and 0 <= y < 8:
+            piece = gameboard[y][x]
+            if piece and piece.color != color and piece.symbol == "N":
+                checks.append({(x, y)})
+
+    for dx, dy in QUEEN_DIRECTIONS:
+        x, y = king_x + dx, king_y + dy
+        ray = []
+        pinned = None
+        while 0 <= x < 8 and 0 <= y < 8:
+            ray.append((x, y))
+            piece = gameboard[y][x]
+            if piece:
+                if piece.color == color:
+                    if pinned is not None:
+                        break
+                    pinned = (x, y)
+                else:
+                    if slides_along(piece.symbol, (dx, dy)):
+                        if pinned is None:
+                            checks.append(set(ray))
+                        else:
+                            pins[pinned] = set(ray)
+                    elif (
+                        pinned is None
+                        and len(ray) == 1
+                        and piece.symbol == "P"
+                        and dx != 0
+                        and dy == -piece.pawn_steps[piece.color]
+                    ):
+                        checks.append({(x, y)})
+                    break
+            x, y = x + dx, y + dy
+    return checks, pins
+
+
+def piece_targets(board, piece, x, y):
+    """Get the squares the piece moves to, ignoring checks of its own king.
+
+    Castling and en passant are not included.
+
+    Args:
+        board (Board): The chessboard.
+        piece (Piece): The piece standing on the square.
+        x (int): The file index of the square.
+        y (int): The rank index of the square.
+
+    Returns:
+        list: Squares (x, y) which are empty or occupied by an opponent's piece.
+    """
+    gameboard = board.gameboard
+    color = piece.color
+    symbol = piece.symbol
+    targets = []
+    if symbol == "P":
+        direction = piece.pawn_steps[color]
+        forward = y + direction
+        if 0 <= forward < 8:
+            if not gameboard[forward][x]:
+                targets.append((x, forward))
+                start_rank = 1 if direction == 1 else 6
+                if y == start_rank and not gameboard[forward + direction][x]:
+                    targets.append((x, forward + direction))
+            for target_x in (x - 1, x + 1):
+                if 0 <= target_x < 8:
+                    target = gameboard[forward][target_x]
+                    if target and target.color != color:
+                        targets.append((target_x, forward))
+    elif symbol in SLIDER_DIRECTIONS:
+        for dx, dy in SLIDER_DIRECTIONS[symbol]:
+            target_x, target_y = x + dx, y + dy
+            while 0 <= target_x < 8 and 0 <= target_y < 8:
+                target = gameboard[target_y][target_x]
+                if target:
+                    if target.color != color:
+                        targets.append((target_x, target_y))
+                    break
+                targets.append((target_x, target_y))
+                target_x, target_y = target_x + dx, target_y + dy
+    else:
+        steps = KNIGHT_JUMPS if symbol == "N" else QUEEN_DIRECTIONS
+        for dx, dy in steps:
+            target_x, target_y = x + dx, y + dy
+            if 0 <= target_x < 8 and 0 <= target_y < 8:
+                target = gameboard[target_y][target_x]
+                if not target or target.color != color:
+                    targets.append((target_x, target_y))
+    return targets
+
+
+def en_passant_moves(board, color, king):
+    """Get legal en passant captures of the player.
+
+    A pawn captures en passant right after the opponent's pawn moved two squares
+    past it. Since two pawns leave the rank, the king is checked for discovered
+    attacks on the resulting position.
+
+    Returns:
+        list: Tuples of the start square (x, y) and the target square (x, y).
+    """
+    direction = 1 if color.value == "white" else -1
+    start_field, end_field = (
+        board.last_move_black if direction == 1 else board.last_move_white
+    )
+    if not end_field or abs(int(start_field[1]) - int(end_field[1])) != 2:
+        return []
+    x, y = ord(end_field[0]) - 97, int(end_field[1]) - 1
+    passed_pawn = board.gameboard[y][x]
+    if not passed_pawn or passed_pawn.symbol != "P" or passed_pawn.color == color:
+        return []
+    moves = []
+    for start_x in (x - 1, x + 1):
+        if not 0 <= start_x < 8:
+            continue
+        pawn = board.gameboard[y][start_x]
+        if not pawn or pawn.symbol != "P" or pawn.color != color:
+            continue
+        target = (x, y + direction)
+        if king is not None and is_attacked(
+            board,
+            *king.position,
+            color,
+            removed=((start_x, y), (x, y)),
+            added=(target, pawn),
+        ):
+            continue
+        moves.append(((start_x, y), target))
+    return moves
+
+
+def castling_moves(board, color, king):
+    """Get legal castling moves of the king.
+
+    The king and the rook must not have moved, the squares between them must be
+    empty and the king must not be in check or pass through or land on an
+    attacked square.
+
+    Returns:
+        list: Target squares (x, y) of the king.
+    """
+    if king is None or king.last_move:
+        return []
+    x, y = king.position
+    home_y = 0 if color.value == "white" else 7
+    if (x, y) != (4, home_y) or is_attacked(board, x, y, color):
+        return []
+    gameboard = board.gameboard
+    moves = []
+    for rook, rook_x, empty_files, king_path in [
+        (board.rook_a[color], 0, (1, 2, 3), (3, 2)),
+        (board.rook_h[color], 7, (5, 6), (5, 6)),
+    ]:
+        if (
+            rook.last_move
+            or gameboard[y][rook_x] is not rook
+            or any(gameboard[y][file] for file in empty_files)
+        ):
+            continue
+        if any(
+            is_attacked(board, file, y, color, removed=((x, y),))
+            for file in king_path
+        ):
+            continue
+        moves.append((king_path[-1], y))
+    return moves
+
+
+def generate_legal_moves(board, color):
+    """Generate all legal moves of the player.
+
+    Checks and pins are found once for the position. Moves of pinned pieces are
+    limited to the line of the pin and, in check, moves of other pieces to the
+    squares stopping the check, so no move has to be simulated.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the player.
+
+    Returns:
+        dict: Target squares in chess notation by the start square of every piece
+            that can move, e.g. {"e2": ["e3", "e4"]}.
+    """
+    king = board.king.get(color)
+    if king is not None and (
+        king.position is None
+        or board.gameboard[king.position[1]][king.position[0]] is not king
+    ):
+        king = None
+    if king is not None:
+        king_x, king_y = king.position
+        checks, pins = find_checks_and_pins(board, color, king_x, king_y)
+    else:
+        checks, pins = [], {}
+
+    allowed = None  # squares stopping the check, None if not in check
+    if len(checks) == 1:
+        allowed = checks[0]
+
+    moves = {}
+    for y, row in enumerate(board.gameboard):
+        for x, piece in enumerate(row):
+            if not piece or piece.color != color:
+                continue
+            if piece is king:
+                targets = [
+                    target
+                    for target in piece_targets(board, piece, x, y)
+                    if not is_attacked(board, *target, color, removed=((x, y),))
+                ]
+                targets += castling_moves(board, color, king)
+            elif len(checks) > 1:
+                continue  # only the king moves out of a double check
+            else:
+                targets = piece_targets(board, piece, x, y)
+                if (x, y) in pins:
+                    targets = [target for target in targets if target in pins[x, y]]
+                if allowed is not None:
+                    targets = [target for target in targets if target in allowed]
+            if targets:
+                moves[NOTATION[x][y]] = [
+                    NOTATION[target_x][target_y] for target_x, target_y in targets
+                ]
+
+    for (start_x, start_y), (target_x, target_y) in en_passant_moves(
+        board, color, king
+    ):
+        moves.setdefault(NOTATION[start_x][start_y], []).append(
+            NOTATION[target_x][target_y]
+        )
+    return moves
+
+
+def in_check(board, color):
+    """Check if the king of the color is attacked.
+
+    Args:
+        board (Board): The chessboard.
+        color (Color): The color of the king.
+
+    Returns:
+        bool: True if the king is in check.
+    """
+    king = board.king.get(color)
+    if king is None or king.position is None:
+        return False
+    return is_attacked(board, *king.position, color)
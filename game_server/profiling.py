@@ -0,0 +1,290 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+import chess
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class FunctionStats:
+    """Call statistics of a single profiled function.
+
+    Attributes:
+        calls (int): Number of recorded calls.
+        cumulative_time (float): Total time spent in the function (including
+            nested calls) in seconds.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.cumulative_time = 0.0
+
+
+class Profiler:
+    """Opt-in profiler of the hot paths of the chess engine.
+
+    Profiled methods are wrapped only while profiling is enabled, so the engine runs
+    without any overhead otherwise. Profiling can be enabled for the whole server or
+    for selected games. The game in progress is recognised by wrapping
+    `Game.handle_move`.
+
+    Attributes:
+        all_games (bool): True if every game is profiled.
+        games (set): IDs of the games profiled individually.
+        stats (dict): Mapping of function name to its FunctionStats.
+        stacks (Counter): Sampled stacks in the folded format mapped to the number
+            of samples.
+        current_game (str): ID of the game whose move is being handled.
+    """
+
+    targets = [
+        (chess.Board, "legal_moves"),
+        (chess.Board, "simulate_move"),
+        (chess.Board, "is_check"),
+        (chess.Board, "save_gameboard"),
+        (chess.Board, "make_move"),
+        *[
+            (piece_class, "available_moves")
+            for piece_class in chess.Piece.__subclasses__()
+            if "available_moves" in vars(piece_class)
+        ],
+    ]
+
+    def __init__(self, sample_interval=config.PROFILING_SAMPLE_INTERVAL):
+        self.all_games = False
+        self.games = set()
+        self.stats = {}
+        self.stacks = Counter()
+        self.current_game = None
+        self.sample_interval = sample_interval
+        self._depth = 0
+        self._originals = {}
+        self._sampler = None
+        self._thread_id = None
+
+    @property
+    def is_enabled(self):
+        """Check if profiling is enabled for any game."""
+        return self.all_games or bool(self.games)
+
+    def is_recording(self):
+        """Check if calls made at the moment should be recorded."""
+        return self.all_games or self.current_game in self.games
+
+    def enable(self, game_id=None):
+        """Enable profiling for the whole server or for a single game.
+
+        Args:
+            game_id (str, optional): ID of the game to profile, every game is
+                profiled if not provided.
+        """
+        if game_id is None:
+            self.all_games = True
+        else:
+            self.games.add(game_id)
+        self._install()
+
+    def disable(self, game_id=None):
+        """Disable profiling for the whole server or for a single game.
+
+        Args:
+            game_id (str, optional): ID of the game to stop profiling, profiling
+                is disabled entirely if not provided.
+        """
+        if game_id is None:
+            self.all_games = False
+            self.games.clear()
+        else:
+            self.games.discard(game_id)
+        if not self.is_enabled:
+            self._uninstall()
+
+    def reset(self):
+        """Clear collected statistics and sampled stacks."""
+        self.stats.clear()
+        self.stacks.clear()
+
+    def _install(self):
+        """Wrap the profiled methods and start the stack sampler."""
+        if self._originals:
+            return
+        for cls, name in [*self.targets, (chess.Game, "handle_move")]:
+            original = vars(cls)[name]
+            self._originals[(cls, name)] = original
+            if name == "handle_move":
+                setattr(cls, name, self._game_scope(original))
+            else:
+                qualname = f"{cls.__name__}.{name}"
+                setattr(cls, name, self._timed(original, qualname))
+
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def _uninstall(self):
+        """Restore the original methods and stop the stack sampler."""
+        for (cls, name), original in self._originals.items():
+            setattr(cls, name, original)
+        self._originals.clear()
+        if self._sampler is not None:
+            sampler, self._sampler = self._sampler, None
+            sampler.join()
+
+    def _game_scope(self, function):
+        """Wrap `Game.handle_move` to remember the game whose move is handled."""
+
+        @wraps(function)
+        def wrapper(game, *args, **kwargs):
+            previous, self.current_game = self.current_game, game.id
+            try:
+                return function(game, *args, **kwargs)
+            finally:
+                self.current_game = previous
+
+        return wrapper
+
+    def _timed(self, function, qualname):
+        """Wrap a method to count its calls and cumulative time."""
+        stats = self.stats
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not self.is_recording():
+                return function(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._depth -= 1
+                function_stats = stats.get(qualname)
+                if function_stats is None:
+                    function_stats = stats[qualname] = FunctionStats()
+                function_stats.calls += 1
+                function_stats.cumulative_time += elapsed
+
+        return wrapper
+
+    def _sample(self):
+        """Periodically sample the stack of the profiled thread.
+
+        Samples are taken only while a profiled function is running and are stored
+        in the folded format (frames from the outermost one separated by `;`).
+        """
+        while self._sampler is threading.current_thread():
+            time.sleep(self.sample_interval)
+            if not self._depth:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_name != "wrapper":  # skip frames of profiling wrappers
+                    filename = os.path.basename(code.co_filename)
+                    frames.append(f"{filename}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def report(self):
+        """Get collected statistics as a text table sorted by cumulative time.
+
+        Returns:
+            str: Calls and cumulative time of each profiled function.
+        """
+        lines = [
+            f"{'function':<32}{'calls':>12}{'cumulative_s':>16}{'per_call_us':>14}"
+        ]
+        for name, stats in sorted(
+            self.stats.items(), key=lambda item: -item[1].cumulative_time
+        ):
+            per_call = stats.cumulative_time / stats.calls * 1e6
+            lines.append(
+                f"{name:<32}{stats.calls:>12}"
+                f"{stats.cumulative_time:>16.6f}{per_call:>14.1f}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def dump_stacks(self, path=config.PROFILING_DUMP_PATH):
+        """Write sampled stacks to a file in the folded format used by flamegraph.pl
+        and speedscope.
+
+        Args:
+            path (str, optional): Path of the output file.
+
+        Returns:
+            int: Number of distinct stacks written.
+        """
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return len(self.stacks)
+
+
+PROFILER = Profiler()
+
+
+def read_profiled_games(path):
+    """Read IDs of the games to profile, one per line.
+
+    Args:
+        path (str): Path of the file with the game IDs.
+
+    Returns:
+        list: IDs of the games, empty if the file does not exist.
+    """
+    try:
+        with open(path) as file:
+            return [line.strip() for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def toggle_profiling():
+    """Enable profiling if it is disabled, disable it otherwise.
+
+    Profiling is enabled for the games listed in `config.PROFILING_GAMES_PATH` or
+    for all games if the file does not exist.
+    """
+    if PROFILER.is_enabled:
+        PROFILER.disable()
+        logger.info("Profiling disabled")
+        return
+    game_ids = read_profiled_games(config.PROFILING_GAMES_PATH)
+    for game_id in game_ids or [None]:
+        PROFILER.enable(game_id)
+    logger.info("Profiling enabled for %s", ", ".join(game_ids) or "all games")
+
+
+def dump_profiling():
+    """Log statistics of the profiled functions and write sampled stacks to the
+    configured dump file."""
+    logger.info("Profiling statistics\n%s", PROFILER.report())
+    count = PROFILER.dump_stacks()
+    logger.info("%s stacks written to %s", count, config.PROFILING_DUMP_PATH)
+
+
+# Profiling is controlled with signals sent to the server process, e.g.
+# `kill -USR1 <pid>`, so it cannot be switched on through any open port
+SIGNAL_HANDLERS = {
+    signal.SIGUSR1: toggle_profiling,
+    signal.SIGUSR2: dump_profiling,
+}
+
+
+def add_signal_handlers(loop):
+    """Control profiling with signals handled on the event loop.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The event loop of the server.
+    """
+    for signum, handler in SIGNAL_HANDLERS.items():
+        loop.add_signal_handler(signum, handler)
@@ -1,16 +1,99 @@
 import asyncio
+import functools
 import json
+import logging
 
 import config
+import metrics
+import profiling
+import transport
 import websockets
-from chess import Game
+from bot import BotPlayer
+from chess import Color, Game
+from clock import FlagTimer
+from codec import DEFAULT_CODEC, negotiate_codec
 from graph import get_challanges_from_app_server
+from store import GameStore
+from watchdog import LoopWatchdog
+
+logger = logging.getLogger(__name__)
 
 
 class ChessServer:
     def __init__(self) -> None:
         """Initialize the ChessServer object."""
         self.connected_users = {}
+        self.codecs = {}
+        self.watchdog = LoopWatchdog()
+        self.store = GameStore()
+        self.bot_tasks = {}
+        self.background_tasks = {}
+        self.flag_timer = FlagTimer(self.close_game)
+
+    def start_background_task(self, name, coroutine):
+        """Run a service of the server, e.g. the store, in a task kept by the server.
+
+        The event loop keeps only weak references to tasks, so the tasks are stored
+        to keep them alive. The services run as long as the server, so the end of
+        any of them is logged.
+
+        Args:
+            name (str): The name of the task.
+            coroutine (coroutine): The service to run.
+        """
+        task = asyncio.create_task(coroutine, name=name)
+        self.background_tasks[name] = task
+        task.add_done_callback(self.log_background_task_end)
+
+    def log_background_task_end(self, task):
+        """Log the end of a background task with the error which stopped it.
+
+        Args:
+            task (asyncio.Task): The finished task.
+        """
+        if task.cancelled():
+            logger.warning("Background task %s cancelled", task.get_name())
+        elif task.exception() is not None:
+            logger.error(
+                "Background task %s failed",
+                task.get_name(),
+                exc_info=task.exception(),
+            )
+        else:
+            logger.error("Background task %s ended", task.get_name())
+
+    def get_codec(self, websocket):
+        """Get the codec negotiated with the client at login.
+
+        Args:
+            websocket (WebSocketServerProtocol): The WebSocket connection of the client.
+
+        Returns:
+            Codec: The codec of the client or the default one.
+        """
+        return self.codecs.get(websocket, DEFAULT_CODEC)
+
+    async def send(self, websocket, message):
+        """Send a message to the websocket and record its size in the metrics.
+
+        Args:
+            websocket (WebSocketServerProtocol): Receiver of the message.
+            message (str or dict): Message to send, dictionaries are serialized with
+                the codec of the receiver.
+        """
+        if not isinstance(message, str):
+            message = self.get_codec(websocket).dumps(message)
+        metrics.OUTBOUND_MESSAGES.inc()
+        metrics.OUTBOUND_MESSAGE_BYTES.inc(len(message.encode()))
+        await websocket.send(message)
+
+    def count_waiting_players(self):
+        """Count players who joined a game and still wait for their opponent.
+
+        Called from the thread of the metrics server, so the games are copied before
+        the dictionary can change size during the iteration.
+        """
+        return sum(1 for users in list(self.connected_users.values()) if len(users) < 2)
 
     def get_opponent_websocket(self, websocket, game):
         for user in self.connected_users[game.id]:
@@ -23,11 +106,11 @@ class ChessServer:
         Args:
             websocket (WebSocketServerProtocol): Current player's websocket.
             game (Game): Instance of the game.
-            message (str): Message to send to the opponent.
+            message (str or dict): Message to send to the opponent.
         """
         for user in self.connected_users[game.id]:
             if user["websocket"] != websocket:
-                await user["websocket"].send(message)
+                await self.send(user["websocket"], message)
 
     async def log_in_to_game(self, websocket):
         """Handle the initial authentication and login process for the user joining the
@@ -49,7 +132,7 @@ class ChessServer:
                 # Check if challange exists
                 if not json_data["data"]["challange"]:
                     raise Exception("Game with this id doesn't exists")
-                await websocket.send(config.MESSAGE_CORRECT_ID)
+                await self.send(websocket, config.MESSAGE_CORRECT_ID)
 
                 # Check if received username matches with json data
                 username = await websocket.recv()
@@ -58,10 +141,10 @@ class ChessServer:
                     and json_data["data"]["challange"]["toUser"]["username"] != username
                 ):
                     raise Exception("You are not involved into this game")
-                await websocket.send(config.MESSAGE_CORRECT_USERNAME)
+                await self.send(websocket, config.MESSAGE_CORRECT_USERNAME)
                 break
             except Exception as e:
-                await websocket.send(str(e))
+                await self.send(websocket, str(e))
                 continue
 
         # Collect data about user
@@ -93,7 +176,8 @@ class ChessServer:
             user (dict): User data (username, elo_rating) and assigned websocket
 
         Returns:
-            game (Game): The instance of the game.
+            game (Game): The instance of the game, None if the game has ended before
+                the opponent joined, e.g. because the bot failed.
         """
 
         # Create instance of the game
@@ -107,12 +191,14 @@ class ChessServer:
         if game.id not in self.connected_users:
             self.connected_users[game.id] = [user]
             # Notify user that the server is waiting for an opponent to join the game.
-            await websocket.send(json.dumps({"type": "waiting_for_opponent"}))
+            await self.send(websocket, {"type": "waiting_for_opponent"})
             while len(self.connected_users[game.id]) < 2:
+                if game.is_over:
+                    return None
                 await asyncio.sleep(0.5)
         else:
             opponent = self.connected_users[game.id][0]
-            await opponent["websocket"].send(json.dumps({"type": "opp_login_success"}))
+            await self.send(opponent["websocket"], {"type": "opp_login_success"})
             self.connected_users[game.id].append(user)
 
         # Assign websockets to the game
@@ -121,6 +207,13 @@ class ChessServer:
             self.connected_users[game.id][1],
         )
         game.place_players(player_1, player_2)
+        self.store.record_start(game)
+        self.flag_timer.schedule(game)
+
+        # Restored games keep the colors of players, so take the white player from
+        # the game instead of the order of connecting
+        if game.player_1.websocket != player_1["websocket"]:
+            player_1, player_2 = player_2, player_1
 
         # Collect full info about players and send to client
         user_info = user.copy()
@@ -133,11 +226,124 @@ class ChessServer:
             user_info["opponent_username"] = player_1["username"]
             user_info["opponent_elo_rating"] = player_1["elo_rating"]
 
-        user_info_json = json.dumps({"type": "game_info", "data": user_info})
-        await websocket.send(user_info_json)
+        await self.send(websocket, {"type": "game_info", "data": user_info})
 
         return game
 
+    def get_game_state(self, websocket, game, record_of_moves):
+        """Build the message with the current game state for the player.
+
+        The message includes the legal moves of the player to move, so the client
+        rejects illegal moves without sending them.
+
+        Args:
+            websocket (WebSocketServerProtocol): The WebSocket connection of the player.
+            game (Game): The instance of the game.
+            record_of_moves (dict or list): Record of moves played so far.
+
+        Returns:
+            dict: The game state message with the board in the encoding negotiated
+                by the player.
+        """
+        return {
+            "type": "game_state",
+            "board": game.get_chessboard(
+                websocket, self.get_codec(websocket).board_encoding
+            ),
+            "record_of_moves": record_of_moves,
+            "clock": game.get_clock(),
+            "legal_moves": game.get_legal_moves(websocket),
+        }
+
+    def get_game_result(self, game):
+        """Build the message with the result of the finished game.
+
+        Args:
+            game (Game): The instance of the game.
+
+        Returns:
+            dict: The game ended message with the result description and the winner.
+        """
+        return {
+            "type": "game_ended",
+            "description": game.result_description,
+            "winner": None if not game.winner else game.winner.username,
+        }
+
+    async def close_game(self, game):
+        """Notify the players of the game ended outside of their moves, e.g. on time,
+        and close their connections.
+
+        Args:
+            game (Game): The game which has ended.
+        """
+        self.store.record_end(game)
+        await self.cancel_premoves(game)
+        game_result = self.get_game_result(game)
+        for user in self.connected_users.get(game.id, []):
+            await self.send(user["websocket"], game_result)
+            await user["websocket"].close()
+
+    def start_bot(self, game_id):
+        """Join a computer opponent to the game.
+
+        The bot plays in a task of its own like a connected player and its games
+        are not reported to the app server. A game has one bot at most, e.g. the
+        player reconnecting to a restored game finds the bot restarted with it.
+
+        Args:
+            game_id (str): The ID of the game the bot joins.
+        """
+        if game_id in self.bot_tasks:
+            return
+        # The game is not rated from the start, so it is journaled as such
+        game = Game.get(game_id) or Game(game_id)
+        game.is_rated = False
+        bot = BotPlayer(game_id)
+        user = {
+            "username": config.BOT_USERNAME,
+            "elo_rating": 0,
+            "elo_rating_changes": 0,
+            "websocket": bot,
+        }
+        task = asyncio.create_task(self.play_bot(bot, game_id, user))
+        self.bot_tasks[game_id] = task
+        task.add_done_callback(functools.partial(self.log_bot_task_end, game_id))
+
+    async def play_bot(self, bot, game_id, user):
+        """Play the game as the bot until it is over.
+
+        Args:
+            bot (BotPlayer): The bot in place of the websocket of a player.
+            game_id (str): The ID of the game.
+            user (dict): User data of the bot.
+        """
+        try:
+            game = await self.create_game(bot, game_id, user)
+            await self.main(bot, game)
+        except Exception:
+            logger.exception("Bot of game %s failed", game_id)
+            # End the game, so the player does not wait for the move of the bot
+            game = Game.get(game_id)
+            if game is not None and not game.is_over:
+                game.end_with_draw(config.BOT_FAILED)
+                await self.close_game(game)
+
+    def log_bot_task_end(self, game_id, task):
+        """Forget the finished task of a bot and log the error which stopped it.
+
+        Args:
+            game_id (str): The ID of the game of the bot.
+            task (asyncio.Task): The finished task.
+        """
+        self.bot_tasks.pop(game_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Task of the bot of game %s failed",
+                game_id,
+                exc_info=task.exception(),
+            )
+
     async def main(self, websocket, game):
         """This function handles the main game loop for processing player moves and
         updating the game state accordingly.
@@ -149,119 +355,181 @@ class ChessServer:
 
         # Loop to receive commands from the client's WebSocket connection
         # and send response message to them
-        json_message = json.dumps(
-            {
-                "type": "game_state",
-                "board": game.get_chessboard(websocket),
-                "record_of_moves": []
-            }
-        )
-        await websocket.send(json_message)
-
-        json_message_opponent = json.dumps(
-            {
-                "type": "game_state",
-                "board": game.get_chessboard(
-                    self.get_opponent_websocket(websocket, game)
-                ),
-                "record_of_moves": []
-            }
+        await self.send(websocket, self.get_game_state(websocket, game, []))
+
+        opponent_websocket = self.get_opponent_websocket(websocket, game)
+        await self.send_to_opponent(
+            websocket, game, self.get_game_state(opponent_websocket, game, [])
         )
-        await self.send_to_opponent(websocket, game, json_message_opponent)
 
+        codec = self.get_codec(websocket)
         async for message in websocket:
 
-            message = json.loads(message)
-            if message["type"] == "move":
-                await websocket.send(json.dumps({"type": "move_confirmed"}))
-                try:
-                    start_field, end_field = message["from"], message["to"]
-                    game.handle_move(start_field, end_field, websocket)
-
-                    # If game is not over send messages containing current game state
-                    if not game.is_over:
-                        json_message = json.dumps(
-                            {
-                                "type": "game_state",
-                                "board": game.get_chessboard(websocket),
-                                "record_of_moves": game.board.record_of_moves,
-                            }
-                        )
-                        await websocket.send(json_message)
-
-                        json_message_opponent = json.dumps(
-                            {
-                                "type": "game_state",
-                                "board": game.get_chessboard(
-                                    self.get_opponent_websocket(websocket, game)
-                                ),
-                                "record_of_moves": game.board.record_of_moves,
-                            }
-                        )
-                        await self.send_to_opponent(
-                            websocket, game, json_message_opponent
-                        )
-                    # If game is over
-                    else:
-                        await self.send_to_opponent(
-                            websocket, game, config.MESSAGE_END_GAME
-                        )
-                        await websocket.send(config.MESSAGE_END_GAME)
-
-                # If provided move is inccorect send error to client and repeat loop
-                except Exception as error:
-                    json_message = json.dumps(
-                        {
-                            "type": "error",
-                            "content": str(error),
-                        }
-                    )
-                    await websocket.send(json_message)
-                    continue
+            message = codec.loads(message)
+            with self.watchdog.track(game.id, message["type"]):
+                is_game_finished = await self.handle_message(websocket, game, message)
+            if is_game_finished:
+                return
 
-            elif message["type"] == "offer_draw":
-                await self.send_to_opponent(
-                    websocket, game, json.dumps({"type": "draw_offer_received"})
-                )
+    def play_premove(self, game):
+        """Make the move queued by the player on turn and journal it.
 
-            elif message["type"] == "accept_draw":
-                # Notify both players that the draw has been accepted
-                accept_draw_message = json.dumps({"type": "draw_accepted"})
-                await websocket.send(accept_draw_message)
-                await self.send_to_opponent(websocket, game, accept_draw_message)
-                game.end_with_draw("Draw! The players have agreed by mutual consent.")
-
-            elif message["type"] == "reject_draw":
-                # Notify the opponent that the draw offer has been rejected
-                await self.send_to_opponent(
-                    websocket, game, json.dumps({"type": "draw_rejected"})
-                )
+        Args:
+            game (Game): The game in which the opponent has just moved.
+
+        Returns:
+            dict or None: The premove applied or cancelled message for the player
+                who queued the move, None if no move was queued.
+        """
+        premove = game.play_premove()
+        if premove is None:
+            return None
+        start_field, end_field, error = premove
+        if error is not None:
+            return {
+                "type": "premove_cancelled",
+                "from": start_field,
+                "to": end_field,
+                "content": error,
+            }
+        self.store.record_move(game, start_field, end_field)
+        return {"type": "premove_applied", "from": start_field, "to": end_field}
+
+    async def cancel_premoves(self, game):
+        """Cancel the moves queued by the players of the ended game and notify them.
+
+        Args:
+            game (Game): The game which has ended.
+        """
+        for color, (start_field, end_field) in game.cancel_premoves().items():
+            player = game.player_1 if color == Color.WHITE else game.player_2
+            await self.send(
+                player.websocket,
+                {
+                    "type": "premove_cancelled",
+                    "from": start_field,
+                    "to": end_field,
+                    "content": config.PREMOVE_GAME_OVER,
+                },
+            )
+
+    async def handle_message(self, websocket, game, message):
+        """Handle a single message received from the player during the game.
 
-            elif message["type"] == "resign":
+        Args:
+            websocket (WebSocketServerProtocol): The WebSocket connection for the user.
+            game(Game): The instance of the game.
+            message (dict): The decoded message received from the player.
 
-                # Notify both players that the game has been resigned
-                accept_draw_message = json.dumps({"type": "game_resigned"})
-                await websocket.send(accept_draw_message)
-                await self.send_to_opponent(websocket, game, accept_draw_message)
+        Returns:
+            bool: True if the game has ended, False otherwise.
+        """
+        if message["type"] == "premove":
+            try:
+                is_queued = game.set_premove(message["from"], message["to"], websocket)
+            except Exception as error:
+                await self.send(websocket, {"type": "error", "content": str(error)})
+                return False
+            if is_queued:
+                return False
+            # The opponent has already moved, so the premove is made at once
+            message = dict(message, type="move")
+
+        if message["type"] == "move":
+            await self.send(websocket, {"type": "move_confirmed"})
+            try:
+                start_field, end_field = message["from"], message["to"]
+                game.handle_move(start_field, end_field, websocket)
+                self.store.record_move(game, start_field, end_field)
+                # The premove of the opponent is made before anything is sent, so
+                # no other message of the game is handled in between
+                premove_message = self.play_premove(game)
+                self.flag_timer.schedule(game)
+                if premove_message:
+                    opponent_websocket = self.get_opponent_websocket(websocket, game)
+                    await self.send(opponent_websocket, premove_message)
+
+                # If game is not over send messages containing current game state
+                if not game.is_over:
+                    record_of_moves = game.board.record_of_moves
+                    await self.send(
+                        websocket, self.get_game_state(websocket, game, record_of_moves)
+                    )
 
-                winner, loser = (
-                    (game.player_2, game.player_1)
-                    if websocket == game.player_1.websocket
-                    else (game.player_1, game.player_2)
+                    opponent_websocket = self.get_opponent_websocket(websocket, game)
+                    await self.send_to_opponent(
+                        websocket,
+                        game,
+                        self.get_game_state(opponent_websocket, game, record_of_moves),
+                    )
+                # If game is over
+                else:
+                    await self.send_to_opponent(
+                        websocket, game, config.MESSAGE_END_GAME
+                    )
+                    await self.send(websocket, config.MESSAGE_END_GAME)
+
+            # If provided move is inccorect send error to client
+            except Exception as error:
+                await self.send(websocket, {"type": "error", "content": str(error)})
+                # Unless the player has run out of time
+                if not game.is_over:
+                    return False
+
+        elif message["type"] == "cancel_premove":
+            premove = game.cancel_premove(websocket)
+            if premove:
+                start_field, end_field = premove
+                await self.send(
+                    websocket,
+                    {
+                        "type": "premove_cancelled",
+                        "from": start_field,
+                        "to": end_field,
+                        "content": config.PREMOVE_CANCELLED,
+                    },
                 )
-                result_description = f"Game end! {loser.username} resigned!"
-                game.end_with_win(winner, result_description)
-
-            # If game is over send result description and winner username to players
-            if game.is_over:
-                game_result = {
-                    "type": "game_ended",
-                    "description": game.result_description,
-                    "winner": None if not game.winner else game.winner.username,
-                }
-                await websocket.send(json.dumps(game_result))
-                await self.send_to_opponent(websocket, game, json.dumps(game_result))
-                return
+
+        elif message["type"] == "offer_draw":
+            await self.send_to_opponent(
+                websocket, game, {"type": "draw_offer_received"}
+            )
+
+        elif message["type"] == "accept_draw":
+            # Notify both players that the draw has been accepted
+            accept_draw_message = {"type": "draw_accepted"}
+            await self.send(websocket, accept_draw_message)
+            await self.send_to_opponent(websocket, game, accept_draw_message)
+            game.end_with_draw("Draw! The players have agreed by mutual consent.")
+
+        elif message["type"] == "reject_draw":
+            # Notify the opponent that the draw offer has been rejected
+            await self.send_to_opponent(websocket, game, {"type": "draw_rejected"})
+
+        elif message["type"] == "resign":
+
+            # Notify both players that the game has been resigned
+            accept_draw_message = {"type": "game_resigned"}
+            await self.send(websocket, accept_draw_message)
+            await self.send_to_opponent(websocket, game, accept_draw_message)
+
+            winner, loser = (
+                (game.player_2, game.player_1)
+                if websocket == game.player_1.websocket
+                else (game.player_1, game.player_2)
+            )
+            result_description = f"Game end! {loser.username} resigned!"
+            game.end_with_win(winner, result_description)
+
+        # If game is over send result description and winner username to players
+        if game.is_over:
+            self.store.record_end(game)
+            await self.cancel_premoves(game)
+            game_result = self.get_game_result(game)
+            await self.send(websocket, game_result)
+            await self.send_to_opponent(websocket, game, game_result)
+            return True
+        return False
 
     async def handler(self, websocket):
         """Function is responsible for handling the WebSocket connection for each
@@ -274,36 +542,86 @@ class ChessServer:
         Args:
             websocket (WebSocketServerProtocol): The client WebSocket connection object
         """
-        message = await websocket.recv()
-        data = json.loads(message)
-        game_id = data["gameId"]
-        username = data["username"]
-        user = {
-            "username": username,
-            "elo_rating": 0,
-            "elo_rating_changes": 0,
-            "websocket": websocket,
-        }
-
-        # Send a confirmation message back to the client acknowledging successful login
-        await websocket.send(json.dumps({"type": "login_success"}))
+        metrics.CONNECTED_SOCKETS.inc()
+        try:
+            # Reap connections which do not log in
+            try:
+                message = await asyncio.wait_for(websocket.recv(), config.LOGIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(reason="Login timeout")
+                return
+            data = DEFAULT_CODEC.loads(message)
+            self.codecs[websocket] = codec = negotiate_codec(data)
+            game_id = data["gameId"]
+            username = data["username"]
+            user = {
+                "username": username,
+                "elo_rating": 0,
+                "elo_rating_changes": 0,
+                "websocket": websocket,
+            }
 
-        # Create a new game environment with the logged-in user and start the game loop
-        game = await self.create_game(websocket, game_id, user)
-        await self.main(websocket, game)
+            # Send a confirmation message back to the client acknowledging
+            # successful login
+            await self.send(
+                websocket,
+                {"type": "login_success", "boardEncoding": codec.board_encoding},
+            )
+
+            # Create a new game environment with the logged-in user and start
+            # the game loop
+            # Let the computer play the other side if the user asked for it
+            if data.get("opponent") == config.BOT_OPPONENT:
+                self.start_bot(game_id)
+
+            game = await self.create_game(websocket, game_id, user)
+            if game is not None:
+                await self.main(websocket, game)
+        finally:
+            self.codecs.pop(websocket, None)
+            metrics.CONNECTED_SOCKETS.dec()
+
+    def restore_games(self):
+        """Restore the live games saved by the store before the restart.
+
+        Bots of the restored games join them again, while humans reconnect by
+        themselves.
+        """
+        for game in self.store.restore():
+            if not game.is_rated and (
+                config.BOT_USERNAME in game.expected_usernames.values()
+            ):
+                self.start_bot(game.id)
 
     async def start_server(self):
         """Start the WebSocket server.
 
         The server runs indefinitely and handles multiple connections simultaneously.
         """
+        metrics.ACTIVE_GAMES.set_function(
+            lambda: sum(1 for game in Game.instances if not game.is_over)
+        )
+        metrics.WAITING_PLAYERS.set_function(self.count_waiting_players)
+        profiling.add_signal_handlers(asyncio.get_running_loop())
+        if config.PROFILING_ENABLED:
+            profiling.PROFILER.enable()
+        metrics.start_metrics_server("0.0.0.0", config.PORT_METRICS)
+        self.start_background_task("watchdog", self.watchdog.run())
+        self.restore_games()
+        self.start_background_task("store", self.store.run())
+        self.start_background_task("flag_timer", self.flag_timer.run())
+
         print("Server started")
         async with websockets.serve(
-            self.handler, "0.0.0.0", config.PORT_WEBSOCKET, ping_interval=None
+            self.handler,
+            "0.0.0.0",
+            config.PORT_WEBSOCKET,
+            **transport.get_serve_options(),
         ):
             await asyncio.Future()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     server = ChessServer()
     asyncio.run(server.start_server())
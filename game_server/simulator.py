@@ -0,0 +1,240 @@
+"""Headless driver playing batches of games through `Game.handle_move`.
+
+Games are played without sockets and their results are not sent to the app
+server, so the throughput of the rules engine is measured end to end:
+
+    python simulator.py --games 2000 --workers 4
+    python simulator.py --script games.txt  # one game of UCI moves per line
+"""
+
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from chess import Color, Game, Player
+from metrics import get_sample_value
+
+PHASES = ("legality", "make_move", "terminal")
+
+
+class HeadlessGame(Game):
+    """Game between two local players.
+
+    It is not registered in `Game.instances` and its result is not reported to the
+    app server.
+    """
+
+    def __init__(self, id):
+        super().__init__(id)
+        Game.instances.remove(self)
+        self.player_1 = Player("white", "white", Color.WHITE)
+        self.player_2 = Player("black", "black", Color.BLACK)
+        self.is_rated = False
+
+    def play(self, start_field, end_field):
+        """Make the move as the player on turn."""
+        if self.current_turn_color == Color.WHITE:
+            websocket = self.player_1.websocket
+        else:
+            websocket = self.player_2.websocket
+        self.handle_move(start_field, end_field, websocket)
+
+
+def play_random_game(game_id, rng, max_plies=config.SIMULATOR_MAX_PLIES):
+    """Play a game of random legal moves.
+
+    Args:
+        game_id (str): The identifier of the game.
+        rng (random.Random): Source of the moves.
+        max_plies (int, optional): Number of plies after which the game is left
+            unfinished.
+
+    Returns:
+        HeadlessGame: The played game.
+    """
+    game = HeadlessGame(game_id)
+    plies = 0
+    while not game.is_over and plies < max_plies:
+        legal_moves = game.board.legal_moves(game.current_turn_color)
+        moves = [
+            (start_field, end_field)
+            for start_field, targets in legal_moves.items()
+            for end_field in targets
+        ]
+        game.play(*rng.choice(moves))
+        plies += 1
+    return game
+
+
+def play_scripted_game(game_id, uci_moves):
+    """Play a game of the given moves, stopping if it ends earlier.
+
+    Args:
+        game_id (str): The identifier of the game.
+        uci_moves (list): Moves in coordinate notation, e.g. ["e2e4", "e7e5"].
+            Pawns are always promoted to a queen.
+
+    Returns:
+        HeadlessGame: The played game.
+
+    Raises:
+        Exception: If a move is illegal.
+    """
+    game = HeadlessGame(game_id)
+    for move in uci_moves:
+        if game.is_over:
+            break
+        game.play(move[:2], move[2:4])
+    return game
+
+
+def get_phase_times():
+    """Get the total time and count of moves handled in each phase by this process."""
+    return {
+        phase: (
+            get_sample_value("chess_move_phase_seconds_sum", {"phase": phase}),
+            get_sample_value("chess_move_phase_seconds_count", {"phase": phase}),
+        )
+        for phase in PHASES
+    }
+
+
+def run_batch(batch):
+    """Play a batch of games and collect statistics (run in worker processes).
+
+    Args:
+        batch (tuple): The seed of the random games, their number, the maximum
+            number of plies and scripted games.
+
+    Returns:
+        dict: Numbers of games and plies, results and time spent in each phase.
+    """
+    seed, random_games, max_plies, scripts = batch
+    rng = random.Random(seed)
+    phase_times = get_phase_times()
+    results = Counter()
+    plies = 0
+    games = [
+        play_random_game(f"random-{seed}-{number}", rng, max_plies)
+        for number in range(random_games)
+    ]
+    games += [
+        play_scripted_game(f"scripted-{seed}-{number}", uci_moves)
+        for number, uci_moves in enumerate(scripts)
+    ]
+    for game in games:
+        plies += len(game.board.move_log)
+        results[game.result_description or "Unfinished"] += 1
+    return {
+        "games": len(games),
+        "plies": plies,
+        "results": results,
+        "phases": {
+            phase: (total - phase_times[phase][0], count - phase_times[phase][1])
+            for phase, (total, count) in get_phase_times().items()
+        },
+    }
+
+
+def simulate(games=0, scripts=(), workers=1, seed=0, max_plies=None):
+    """Play random and scripted games in parallel.
+
+    Games are split into batches of `config.SIMULATOR_BATCH_SIZE` seeded
+    independently of the number of workers, so the same games are played with
+    any number of workers.
+
+    Args:
+        games (int, optional): Number of random games.
+        scripts (list, optional): Scripted games as lists of UCI moves.
+        workers (int, optional): Number of worker processes, games are played in
+            this process if 1.
+        seed (int, optional): Seed of the random games.
+        max_plies (int, optional): Maximum length of the random games.
+
+    Returns:
+        dict: Statistics of the games and the elapsed time in seconds.
+    """
+    max_plies = max_plies or config.SIMULATOR_MAX_PLIES
+    size = config.SIMULATOR_BATCH_SIZE
+    batches = [
+        (f"{seed}-{index}", min(size, games - start), max_plies, [])
+        for index, start in enumerate(range(0, games, size))
+    ]
+    scripts = list(scripts)
+    while scripts:
+        batch_scripts, scripts = scripts[:size], scripts[size:]
+        batches.append((f"{seed}-script-{len(batches)}", 0, max_plies, batch_scripts))
+
+    start = time.perf_counter()
+    if workers == 1:
+        stats = list(map(run_batch, batches))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            stats = list(executor.map(run_batch, batches))
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "games": sum(batch["games"] for batch in stats),
+        "plies": sum(batch["plies"] for batch in stats),
+        "results": sum((batch["results"] for batch in stats), Counter()),
+        "phases": {
+            phase: tuple(
+                sum(batch["phases"][phase][i] for batch in stats) for i in range(2)
+            )
+            for phase in PHASES
+        },
+        "elapsed": elapsed,
+    }
+    return summary
+
+
+def format_summary(summary):
+    """Format the statistics returned by `simulate` as a report."""
+    elapsed = summary["elapsed"]
+    lines = [
+        f"{summary['games']} games, {summary['plies']} plies in {elapsed:.2f} s",
+        f"Games per second: {summary['games'] / elapsed:.1f}",
+        f"Plies per second: {summary['plies'] / elapsed:.1f}",
+        "Time per ply by phase:",
+    ]
+    for phase, (total, count) in summary["phases"].items():
+        lines.append(f"  {phase:<10}{total / max(count, 1) * 1e6:10.1f} us")
+    lines.append("Results:")
+    for description, count in summary["results"].most_common():
+        lines.append(f"  {count:>6}  {description}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000, help="random games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=config.SIMULATOR_MAX_PLIES)
+    parser.add_argument(
+        "--script",
+        help="file with a game of space separated UCI moves per line, played "
+        "instead of random games",
+    )
+    args = parser.parse_args()
+
+    scripts = []
+    if args.script:
+        with open(args.script) as file:
+            scripts = [line.split() for line in file if line.strip()]
+    summary = simulate(
+        args.games if not scripts else 0,
+        scripts,
+        args.workers,
+        args.seed,
+        args.max_plies,
+    )
+    print(format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
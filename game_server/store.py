@@ -0,0 +1,299 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import config
+from chess import Board, Color, Game, opposite_color
+
+logger = logging.getLogger(__name__)
+
+# Types of the journal entries, written after the generation of the snapshot:
+# S - game started: game id, white username, black username, 1 if rated else 0
+# M - move made: game id, move in coordinate notation (e.g. e2e4), seconds left to
+#     the player who moved
+# E - game over: game id
+ENTRY_START = "S"
+ENTRY_MOVE = "M"
+ENTRY_END = "E"
+
+
+class GameStore:
+    """Persistence of live games, so they survive a restart of the game server.
+
+    Every move is appended to a journal and all live games are periodically saved
+    as FEN snapshots, after which the journal is truncated. Writes are batched and
+    done in a worker thread (write-behind), so handling a move never waits for the
+    disk. After a restart games are rebuilt from the last snapshot and the moves
+    journaled after it.
+
+    Snapshots are numbered by generations and every journal entry carries the
+    generation of the last snapshot when it was made. Entries of older generations
+    are already in the snapshot, e.g. if the server stopped after saving the
+    snapshot but before truncating the journal, so they are not replayed.
+
+    Attributes:
+        journal_path (str): Path of the append-only journal of moves.
+        snapshot_path (str): Path of the last snapshot of live games.
+        flush_interval (float): Seconds between writes of the journal.
+        snapshot_interval (float): Seconds between snapshots.
+        pending (list): Journal entries which have not been written yet.
+        started (set): IDs of the games whose start has been journaled.
+        generation (int): Generation of the last snapshot.
+    """
+
+    def __init__(
+        self,
+        directory=config.STORE_DIRECTORY,
+        flush_interval=config.STORE_FLUSH_INTERVAL,
+        snapshot_interval=config.STORE_SNAPSHOT_INTERVAL,
+    ):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, "journal.log")
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.pending = []
+        self.started = set()
+        self.is_dirty = False
+        self.last_snapshot = time.monotonic()
+        self.generation = 0
+
+    def record_start(self, game):
+        """Journal the start of the game with the usernames of both players and
+        whether it is rated.
+
+        Args:
+            game (Game): The game with players placed.
+        """
+        if game.id in self.started:
+            return
+        self.started.add(game.id)
+        self.append(
+            ENTRY_START,
+            game.id,
+            game.player_1.username,
+            game.player_2.username,
+            int(game.is_rated),
+        )
+
+    def record_move(self, game, start_field, end_field):
+        """Journal a move made in the game with the time left to the player.
+
+        Args:
+            game (Game): The game in which the move has been made.
+            start_field (str): The starting position of the move.
+            end_field (str): The ending position of the move.
+        """
+        color = opposite_color(game.current_turn_color)
+        self.append(
+            ENTRY_MOVE,
+            game.id,
+            f"{start_field}{end_field}",
+            game.clock.remaining[color.value],
+        )
+
+    def record_end(self, game):
+        """Journal the end of the game, so it is not restored anymore.
+
+        Args:
+            game (Game): The game which is over.
+        """
+        if game.id in self.started:
+            self.started.discard(game.id)
+            self.append(ENTRY_END, game.id)
+
+    def append(self, *fields):
+        """Add an entry to the batch written with the next flush."""
+        fields = (self.generation, *fields)
+        self.pending.append("\t".join(str(field) for field in fields) + "\n")
+        self.is_dirty = True
+
+    def take_snapshot(self):
+        """Get the snapshot of all live games.
+
+        The record of moves and the position hashes are copied, so the snapshot
+        written in a thread is not changed by moves made in the meantime.
+
+        Returns:
+            dict: Mapping of game id to the position in FEN, the record of moves,
+                usernames of players, seconds left to them and whether the game is
+                rated.
+        """
+        return {
+            game.id: {
+                "fen": game.board.to_fen(game.current_turn_color),
+                "record_of_moves": {
+                    number: list(moves)
+                    for number, moves in game.board.record_of_moves.items()
+                },
+                "position_hashes": list(game.board.position_hashes),
+                "white": game.player_1.username,
+                "black": game.player_2.username,
+                "clock": {
+                    color.value: game.clock.get_remaining(color) for color in Color
+                },
+                "is_rated": game.is_rated,
+            }
+            for game in Game.instances
+            if game.id in self.started and not game.is_over
+        }
+
+    def write(self, entries, snapshot=None, generation=None):
+        """Write journal entries and optionally the snapshot (runs in a thread).
+
+        Args:
+            entries (list): Journal entries to append.
+            snapshot (dict, optional): Snapshot of all live games taken after the
+                entries. The journal is truncated once the snapshot is saved.
+            generation (int, optional): Generation of the snapshot.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if entries:
+            with open(self.journal_path, "a") as journal:
+                journal.writelines(entries)
+                journal.flush()
+                os.fsync(journal.fileno())
+        if snapshot is not None:
+            temporary_path = f"{self.snapshot_path}.tmp"
+            with open(temporary_path, "w") as file:
+                json.dump(
+                    {"generation": generation, "games": snapshot},
+                    file,
+                    separators=(",", ":"),
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, self.snapshot_path)
+            open(self.journal_path, "w").close()
+
+    async def flush(self, with_snapshot=False):
+        """Write the pending entries, and the snapshot if requested, in a thread.
+
+        Entries and the snapshot are taken at the same moment, so the snapshot
+        contains exactly the moves written before the journal is truncated. Entries
+        made from then on belong to the generation of the new snapshot.
+
+        Args:
+            with_snapshot (bool, optional): Whether to save a snapshot.
+        """
+        entries, self.pending = self.pending, []
+        snapshot = self.take_snapshot() if with_snapshot else None
+        if with_snapshot:
+            self.is_dirty = False
+            self.last_snapshot = time.monotonic()
+            self.generation += 1
+        if entries or snapshot is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.write, entries, snapshot, self.generation
+            )
+
+    async def run(self):
+        """Periodically write the journal and save snapshots of live games."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            snapshot_due = (
+                self.is_dirty
+                and time.monotonic() - self.last_snapshot >= self.snapshot_interval
+            )
+            try:
+                await self.flush(with_snapshot=snapshot_due)
+            except Exception:
+                logger.exception("Saving the state of games failed")
+
+    def restore_snapshot(self, games):
+        """Rebuild the games saved in the last snapshot.
+
+        Args:
+            games (dict): Mapping of game id to the restored game, filled in.
+
+        Returns:
+            int: The generation of the snapshot, 0 if there is none.
+        """
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path) as file:
+            snapshot = json.load(file)
+        for game_id, data in snapshot["games"].items():
+            game = Game(game_id)
+            games[game_id] = game
+            try:
+                game.board, game.current_turn_color = Board.from_fen(data["fen"])
+                # Keep the record of moves, so the full game is reported at the end
+                game.board.record_of_moves = {
+                    int(num_move): moves
+                    for num_move, moves in data["record_of_moves"].items()
+                }
+                game.board.position_hashes = data["position_hashes"]
+                game.expected_usernames = {
+                    Color.WHITE: data["white"],
+                    Color.BLACK: data["black"],
+                }
+                # The clock is started again once both players have reconnected
+                game.clock.remaining = data["clock"]
+                game.is_rated = data["is_rated"]
+            except Exception:
+                logger.exception("Restoring game %s from the snapshot failed", game_id)
+                Game.instances.remove(games.pop(game_id))
+        return snapshot["generation"]
+
+    def replay_entry(self, games, entry_type, game_id, fields):
+        """Apply an entry of the journal to the restored games.
+
+        Args:
+            games (dict): Mapping of game id to the restored game, updated.
+            entry_type (str): The type of the entry.
+            game_id (str): The ID of the game.
+            fields (list): The other fields of the entry.
+        """
+        if entry_type == ENTRY_START and game_id not in games:
+            game = Game(game_id)
+            game.expected_usernames = {
+                Color.WHITE: fields[0],
+                Color.BLACK: fields[1],
+            }
+            game.is_rated = fields[2] == "1"
+            games[game_id] = game
+        elif entry_type == ENTRY_MOVE and game_id in games:
+            game = games[game_id]
+            game.board.make_move(fields[0][:2], fields[0][2:])
+            game.clock.remaining[game.current_turn_color.value] = float(fields[1])
+            game.current_turn_color = opposite_color(game.current_turn_color)
+        elif entry_type == ENTRY_END and game_id in games:
+            Game.instances.remove(games.pop(game_id))
+
+    def restore(self):
+        """Rebuild live games from the last snapshot and the journal.
+
+        A game whose state cannot be rebuilt is dropped and logged, so the other
+        games are still restored.
+
+        Returns:
+            list: The restored games.
+        """
+        games = {}
+        self.generation = self.restore_snapshot(games)
+
+        failed = set()
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as journal:
+                for line in journal:
+                    generation, entry_type, game_id, *fields = line.rstrip("\n").split(
+                        "\t"
+                    )
+                    if int(generation) < self.generation or game_id in failed:
+                        continue
+                    try:
+                        self.replay_entry(games, entry_type, game_id, fields)
+                    except Exception:
+                        logger.exception(
+                            "Replaying the journal of game %s failed", game_id
+                        )
+                        failed.add(game_id)
+                        if game_id in games:
+                            Game.instances.remove(games.pop(game_id))
+
+        self.started.update(games)
+        logger.info("Restored %s live games", len(games))
+        return list(games.values())
@@ -0,0 +1,71 @@
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from bot import BotPlayer, TranspositionTable, find_move
+from chess import Color, Game
+
+
+@pytest.mark.parametrize(
+    ("fen", "move"),
+    [
+        # Mate on the back rank
+        ("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1", ("a1", "a8")),
+        # Capture of the undefended queen
+        ("4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1", ("d1", "d5")),
+        # Black escapes the mate threat by capturing the rook
+        ("6k1/5ppp/8/8/8/8/5PPP/r3R1K1 b - - 0 1", ("a1", "e1")),
+    ],
+)
+def test_find_move(fen, move):
+    """Test that the bot finds the obviously best move."""
+    assert find_move(fen, time_budget=2) == move
+
+
+def test_find_move_within_time_budget():
+    """Test that the search stops when the time budget is spent."""
+    fen = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    start = time.perf_counter()
+    move = find_move(fen, time_budget=0.05, max_depth=20)
+    assert time.perf_counter() - start < 0.5
+    assert move is not None
+
+
+def test_transposition_table_replacement():
+    """Test that deeper results of the search are kept and old ones replaced."""
+    table = TranspositionTable(size=1)
+    table.new_search()
+    table.put(1, 4, 10, 0, ("e2", "e4"))
+    table.put(2, 2, 20, 0, ("d2", "d4"))
+    assert table.get(1).move == ("e2", "e4")
+    assert table.get(2) is None
+
+    table.new_search()
+    table.put(2, 2, 20, 0, ("d2", "d4"))
+    assert table.get(1) is None
+    assert table.get(2).move == ("d2", "d4")
+
+
+@pytest.mark.asyncio
+async def test_bot_moves_on_its_turn():
+    """Test that the bot sends a legal move once the game is on its turn."""
+    bot = BotPlayer("bot_game", time_budget=0.1)
+    game = Game("bot_game")
+    game.place_players(
+        {"websocket": bot, "username": "bot"},
+        {"websocket": Mock(), "username": "player"},
+    )
+    try:
+        with patch("bot.get_executor", return_value=None):
+            await bot.send({"type": "game_state"})
+            message = json.loads(await bot.__anext__())
+        assert message["type"] == "move"
+        assert message["to"] in game.board.legal_moves(Color.WHITE)[message["from"]]
+
+        game.is_over = True
+        await bot.send({"type": "game_ended"})
+        with pytest.raises(StopAsyncIteration):
+            await bot.__anext__()
+    finally:
+        Game.instances.remove(game)
@@ -1,3 +1,4 @@
+import time
 from unittest.mock import patch
 
 import config
@@ -499,3 +500,141 @@ def test_en_passant(game_with_empty_board):
 
     assert game.board["b5"] == game.board.EMPTY
     assert num_of_black_pieces - 1 == len(game.board.all_pieces[Color.BLACK])
+
+
+def test_moves_reported_with_result(game):
+    """Test that the moves of the game in coordinate notation are sent to the app
+    server with the result."""
+    with patch("chess.send_result_to_app_server", return_value=None) as send_result:
+        for start_field, end_field, websocket in [
+            ("f2", "f3", "websocket_white"),
+            ("e7", "e5", "websocket_black"),
+            ("g2", "g4", "websocket_white"),
+            ("d8", "h4", "websocket_black"),
+        ]:
+            game.handle_move(start_field, end_field, websocket)
+    assert game.is_over
+    send_result.assert_called_once_with(
+        "black",
+        game.id,
+        ["f2f3", "e7e5", "g2g4", "d8h4"],
+        "white",
+        game.board.position_hashes,
+    )
+
+
+def test_record_of_moves(game):
+    """Test that the record of moves built from the move log keeps its form and is
+    updated with new moves only."""
+    game.handle_move("e2", "e4", "websocket_white")
+    record = game.board.record_of_moves
+    assert record == {
+        1: [{"from": "e2", "to": "e4", "piece": "P-w", "actions": []}],
+    }
+    assert game.board.record_of_moves is record
+
+    game.handle_move("d7", "d5", "websocket_black")
+    game.handle_move("e4", "d5", "websocket_white")
+    assert game.board.record_of_moves == {
+        1: [
+            {"from": "e2", "to": "e4", "piece": "P-w", "actions": []},
+            {"from": "d7", "to": "d5", "piece": "P-b", "actions": []},
+        ],
+        2: [{"from": "e4", "to": "d5", "piece": "P-w", "actions": ["capturing"]}],
+    }
+    assert game.board.move_number == 2
+    assert game.board.uci_moves() == ["e2e4", "d7d5", "e4d5"]
+
+    # Assigned records are continued
+    copied = Board()
+    copied.record_of_moves = game.board.record_of_moves
+    assert copied.record_of_moves == game.board.record_of_moves
+    assert copied.uci_moves() == ["e2e4", "d7d5", "e4d5"]
+    assert copied.move_number == 2
+
+
+def test_boards_are_independent():
+    """Test that boards created from the initial position and copied boards do not
+    share pieces."""
+    board = Board()
+    board.make_move("e2", "e4")
+    new_board = Board()
+    assert new_board.to_fen(Color.WHITE) == (
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    )
+    assert new_board.uci_moves() == []
+
+    copied = board.copy()
+    assert copied.to_fen(Color.BLACK) == board.to_fen(Color.BLACK)
+    assert copied.king[Color.WHITE] is copied["e1"]
+    copied.make_move("e7", "e5")
+    assert board["e7"].position_code == "e7"
+    assert board.uci_moves() == ["e2e4"]
+    assert copied.uci_moves() == ["e2e4", "e7e5"]
+    assert not board.all_pieces[Color.BLACK] & copied.all_pieces[Color.BLACK]
+
+
+def test_promotion(game_with_empty_board):
+    """Test that a pawn reaching the last rank is replaced by a queen."""
+    game = game_with_empty_board
+    put_piece_on_board(game.board, King, Color.WHITE, "a1")
+    put_piece_on_board(game.board, King, Color.BLACK, "h1")
+    put_piece_on_board(game.board, Pawn, Color.WHITE, "b7")
+
+    with patch("chess.send_result_to_app_server", return_value=None):
+        game.handle_move("b7", "b8", "websocket_white")
+
+    queen = game.board["b8"]
+    assert isinstance(queen, Queen) and queen.color == Color.WHITE
+    assert game.board.all_pieces[Color.WHITE] == {game.board["a1"], queen}
+    assert game.board.uci_moves() == ["b7b8q"]
+    # The queen attacks h2 on the diagonal
+    assert sorted(game.board.legal_moves(Color.BLACK)["h1"]) == ["g1", "g2"]
+
+
+def test_legal_moves_of_player_to_move(game):
+    """Test that only the player to move gets their legal moves."""
+    assert game.get_legal_moves("websocket_white")["g1"] == "h3f3"
+    assert game.get_legal_moves("websocket_white")["e2"] == "e3e4"
+    assert game.get_legal_moves("websocket_black") == {}
+
+    game.handle_move("e2", "e4", "websocket_white")
+    assert game.get_legal_moves("websocket_white") == {}
+    assert len(game.get_legal_moves("websocket_black")) == 10
+
+
+def test_premove(game):
+    """Test that a queued move is made right after the opponent's move if legal."""
+    assert not game.set_premove("e2", "e4", "websocket_white")
+    with pytest.raises(Exception, match=config.NOT_YOUR_PIECE):
+        game.set_premove("e2", "e3", "websocket_black")
+    assert game.set_premove("e7", "e5", "websocket_black")
+
+    game.handle_move("e2", "e4", "websocket_white")
+    assert game.play_premove() == ("e7", "e5", None)
+    assert game.board["e5"].color == Color.BLACK
+    assert game.current_turn_color == Color.WHITE
+    assert game.play_premove() is None
+
+    # The pawn on e5 is blocked by the pawn on e4
+    assert game.set_premove("e5", "e4", "websocket_black")
+    game.handle_move("d2", "d3", "websocket_white")
+    start_field, end_field, error = game.play_premove()
+    assert (start_field, end_field) == ("e5", "e4")
+    assert error is not None
+    assert game.current_turn_color == Color.BLACK
+
+
+@pytest.mark.asyncio
+async def test_result_reported_off_event_loop(game):
+    """Test that a slow app server does not block the game on the event loop."""
+
+    def slow_app_server(*args):
+        time.sleep(0.2)
+        return {"data": {}}
+
+    with patch("chess.send_result_to_app_server", side_effect=slow_app_server):
+        start = time.perf_counter()
+        future = game.end_with_draw("Draw! by the 3-fold repetition")
+        assert time.perf_counter() - start < 0.1
+        assert await future == {"data": {}}
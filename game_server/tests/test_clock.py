@@ -0,0 +1,96 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import config
+import pytest
+from chess import Board, Color, Game
+from clock import Clock, FlagTimer
+
+
+def create_game(game_id, base_time=60, increment=0, fen=None):
+    """Helper function creating a game of two players with the clock started."""
+    game = Game(game_id, base_time, increment)
+    if fen is not None:
+        game.board, game.current_turn_color = Board.from_fen(fen)
+    game.place_players(
+        {"websocket": "white_ws", "username": "white"},
+        {"websocket": "black_ws", "username": "black"},
+    )
+    Game.instances.remove(game)
+    return game
+
+
+def test_clock_charges_moves():
+    """Test that the player is charged for the move and gets the increment."""
+    clock = Clock(base_time=60, increment=2)
+    clock.start(Color.WHITE, now=100)
+    assert clock.get_remaining(Color.WHITE, now=110) == 50
+    assert clock.get_remaining(Color.BLACK, now=110) == 60
+
+    clock.press(Color.WHITE, now=110)
+    assert clock.get_remaining(Color.WHITE, now=130) == 52
+    assert clock.get_remaining(Color.BLACK, now=130) == 40
+    assert clock.get_deadline() == 170
+    assert not clock.is_flagged(Color.BLACK, now=169)
+    assert clock.is_flagged(Color.BLACK, now=170)
+    assert not clock.is_flagged(Color.WHITE, now=1000)
+
+
+def test_flag_fall_ends_game():
+    """Test that the opponent of the player out of time wins."""
+    game = create_game("flag_win")
+    game.clock.started_at -= 61
+    with patch("chess.send_result_to_app_server") as send_result:
+        assert game.check_flag()
+    assert game.is_over
+    assert game.winner is game.player_2
+    assert game.result_description == "Game end! white ran out of time!"
+    send_result.assert_called_once()
+
+
+def test_flag_fall_without_mating_material():
+    """Test that the game is drawn if the opponent cannot checkmate."""
+    game = create_game("flag_draw", fen="4k3/8/8/8/8/8/8/1N2K3 b - - 0 1")
+    game.clock.started_at -= 61
+    with patch("chess.send_result_to_app_server"):
+        assert game.check_flag()
+    assert game.winner is None
+    assert game.result_description.startswith("Draw! black ran out of time")
+
+
+def test_move_after_flag_fall():
+    """Test that the move received after the flag has fallen is not made."""
+    game = create_game("late_move")
+    game.clock.started_at -= 61
+    with patch("chess.send_result_to_app_server"):
+        with pytest.raises(Exception, match=config.OUT_OF_TIME):
+            game.handle_move("e2", "e4", "white_ws")
+    assert game.is_over
+    assert game.board["e2"].symbol == "P"
+
+
+@pytest.mark.asyncio
+async def test_flag_timer():
+    """Test that the single timer ends the games at the deadlines of their clocks."""
+    on_flag = AsyncMock()
+    timer = FlagTimer(on_flag)
+    slow_game = create_game("slow", base_time=0.05)
+    fast_game = create_game("fast", base_time=0.1)
+    task = asyncio.create_task(timer.run())
+    try:
+        with patch("chess.send_result_to_app_server", Mock()):
+            timer.schedule(fast_game)
+            timer.schedule(slow_game)
+            await asyncio.sleep(0.06)
+            fast_game.handle_move("e2", "e4", "white_ws")
+            timer.schedule(fast_game)
+
+            await asyncio.sleep(0.07)
+            on_flag.assert_awaited_once_with(slow_game)
+            assert not fast_game.is_over
+
+            await asyncio.sleep(0.1)
+            on_flag.assert_awaited_with(fast_game)
+            assert fast_game.winner is fast_game.player_1
+    finally:
+        task.cancel()
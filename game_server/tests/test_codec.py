@@ -0,0 +1,125 @@
+import json
+
+import config
+import pytest
+from chess import Color, Game, Player
+from codec import (
+    DEFAULT_CODEC,
+    OrjsonBackend,
+    StdlibJsonBackend,
+    get_json_backend,
+    negotiate_codec,
+    orjson,
+)
+
+BACKENDS = [StdlibJsonBackend] + ([OrjsonBackend] if orjson else [])
+
+
+@pytest.fixture
+def game():
+    """Fixture to initialize a test instance of the Game class with players."""
+    game = Game("test_codec_id")
+    game.player_1 = Player("websocket_white", "white", Color.WHITE)
+    game.player_2 = Player("websocket_black", "black", Color.BLACK)
+    return game
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_produce_the_same_json(backend):
+    """Test that every backend serializes messages like the standard library,
+    including integer keys of the record of moves."""
+    message = {
+        "type": "game_state",
+        "board": [["R-w", None]],
+        "record_of_moves": {1: [{"from": "e2", "to": "e4", "actions": []}]},
+    }
+    encoded = backend.dumps(message)
+    assert isinstance(encoded, str)
+    assert json.loads(encoded) == json.loads(json.dumps(message))
+    assert backend.loads(encoded)["record_of_moves"]["1"][0]["to"] == "e4"
+
+
+def test_get_json_backend():
+    """Test choosing the JSON backend by name."""
+    assert get_json_backend("json") is StdlibJsonBackend
+    assert get_json_backend("auto") is (OrjsonBackend if orjson else StdlibJsonBackend)
+
+
+@pytest.mark.parametrize(
+    ("login_data", "expected_encoding"),
+    [
+        ({}, config.BOARD_ENCODING_NESTED),
+        ({"boardEncoding": "flat"}, config.BOARD_ENCODING_FLAT),
+        ({"boardEncoding": "fen"}, config.BOARD_ENCODING_FEN),
+        ({"boardEncoding": "unknown"}, config.BOARD_ENCODING_NESTED),
+    ],
+)
+def test_negotiate_codec(login_data, expected_encoding):
+    """Test negotiating the board encoding with the login message."""
+    codec = negotiate_codec(login_data)
+    assert codec.board_encoding == expected_encoding
+    assert codec.json_backend is DEFAULT_CODEC.json_backend
+
+
+def test_flat_board_matches_nested_board(game):
+    """Test that the flat board lists the squares in the order of the nested one
+    for both players."""
+    game.handle_move("e2", "e4", "websocket_white")
+    for websocket in ["websocket_white", "websocket_black"]:
+        nested = game.get_chessboard(websocket)
+        flat = game.get_chessboard(websocket, config.BOARD_ENCODING_FLAT)
+        assert len(flat) == 64
+        for square, piece in zip(flat, [piece for row in nested for piece in row]):
+            if piece is None:
+                assert square == "."
+            else:
+                letter, color = piece.split("-")
+                assert square == (letter if color == "w" else letter.lower())
+
+
+def test_fen_board(game):
+    """Test the FEN piece placement of the board."""
+    assert (
+        game.get_chessboard("websocket_white", config.BOARD_ENCODING_FEN)
+        == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+    )
+    game.handle_move("e2", "e4", "websocket_white")
+    assert (
+        game.get_chessboard("websocket_black", config.BOARD_ENCODING_FEN)
+        == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR"
+    )
+
+
+def test_board_views_updated_with_moves(game):
+    """Test that the cached board views follow the gameboard through captures,
+    en passant and castling."""
+    game.get_chessboard("websocket_white")  # build the views
+    for start_field, end_field, websocket in [
+        ("e2", "e4", "websocket_white"),
+        ("d7", "d5", "websocket_black"),
+        ("e4", "e5", "websocket_white"),
+        ("f7", "f5", "websocket_black"),
+        ("e5", "f6", "websocket_white"),
+        ("g8", "f6", "websocket_black"),
+        ("g1", "f3", "websocket_white"),
+        ("c8", "g4", "websocket_black"),
+        ("f1", "e2", "websocket_white"),
+        ("g4", "f3", "websocket_black"),
+        ("e1", "g1", "websocket_white"),
+    ]:
+        game.handle_move(start_field, end_field, websocket)
+
+    rows = [
+        [str(piece) if piece else None for piece in row]
+        for row in game.board.gameboard
+    ]
+    assert game.get_chessboard("websocket_white") == rows[::-1]
+    assert game.get_chessboard("websocket_black") == [row[::-1] for row in rows]
+    for websocket in ["websocket_white", "websocket_black"]:
+        flat = "".join(
+            "." if piece is None else piece[0] if piece[2] == "w" else piece[0].lower()
+            for row in game.get_chessboard(websocket)
+            for piece in row
+        )
+        assert game.get_chessboard(websocket, config.BOARD_ENCODING_FLAT) == flat
+    assert game.get_chessboard("websocket_white")[7][5:7] == ["R-w", "K-w"]
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from chess import Color
+from fuzz import find_divergence, fuzz, minimize
+from movegen import generate_legal_moves
+
+
+def generate_with_lost_castling(board, color):
+    """Helper function generating castling of the white king without the right."""
+    moves = generate_legal_moves(board, color)
+    king = board.king[color]
+    if color == Color.WHITE and king.position_code == "e1":
+        if board.is_blank("f1") and board.is_blank("g1"):
+            targets = moves.setdefault("e1", [])
+            if "g1" not in targets:
+                targets.append("g1")
+    return moves
+
+
+def test_no_divergence_in_random_games():
+    """Test that the move generator agrees with the reference rules."""
+    fen = "r3k2r/p3p2p/8/3pP3/8/8/P6P/R3K2R w KQkq d6 0 1"
+    assert fuzz(3, seed=1, fen=fen, max_plies=30) is None
+
+
+def test_divergence_minimized():
+    """Test that a divergence is reduced to the position it appears in."""
+    fen = "4k3/p7/8/8/8/8/P7/4K2R w K - 0 1"
+    moves = ["e1e2", "e8e7", "e2e1", "e7e8"]
+    with patch("chess.generate_legal_moves", generate_with_lost_castling):
+        divergence = find_divergence(fen, moves)
+        assert divergence["ply"] == 4
+        assert "g1" in divergence["optimized"]["moves"]["e1"]
+        assert "g1" not in divergence["reference"]["moves"]["e1"]
+
+        minimized_fen, minimized_moves = minimize(fen, moves)
+        assert minimized_moves == []
+        assert minimized_fen.split()[0] == "4k3/8/8/8/8/8/8/4K3"
+        assert find_divergence(minimized_fen, minimized_moves) is not None
+    assert find_divergence(minimized_fen, minimized_moves) is None
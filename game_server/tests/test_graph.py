@@ -0,0 +1,44 @@
+import hashlib
+from unittest.mock import Mock, patch
+
+import config
+from graph import execute_graphql, get_challanges_from_app_server
+
+
+def make_response(data):
+    """Helper function creating a mocked response of the app server."""
+    response = Mock()
+    response.json.return_value = data
+    return response
+
+
+def test_persisted_query_sent_by_hash():
+    """Test that a known query is sent as the hash with variables only."""
+    with patch("graph.requests.post") as post:
+        post.return_value = make_response({"data": {"challange": None}})
+        assert get_challanges_from_app_server("game_id") == {
+            "data": {"challange": None}
+        }
+
+    post.assert_called_once()
+    payload = post.call_args.kwargs["json"]
+    assert "query" not in payload
+    assert payload["variables"] == {"gameId": "game_id"}
+    assert (
+        payload["extensions"]["persistedQuery"]["sha256Hash"]
+        == hashlib.sha256(config.QUERY_GET_CHALLANGE.encode()).hexdigest()
+    )
+
+
+def test_unknown_persisted_query_sent_with_text():
+    """Test that the query text is sent once the app server does not know it."""
+    with patch("graph.requests.post") as post:
+        post.side_effect = [
+            make_response({"errors": [{"message": "PersistedQueryNotFound"}]}),
+            make_response({"data": {"endGame": {"challange": {"id": "1"}}}}),
+        ]
+        response = execute_graphql(config.MUTATION_END_GAME, {"challangeId": "1"})
+
+    assert response["data"]["endGame"]["challange"]["id"] == "1"
+    assert post.call_count == 2
+    assert post.call_args.kwargs["json"]["query"] == config.MUTATION_END_GAME
@@ -0,0 +1,44 @@
+import urllib.request
+
+import metrics
+import pytest
+from metrics import get_sample_value
+
+
+def test_track_app_server_call_counts_errors():
+    """Test that failing app server calls are timed and counted as errors."""
+
+    @metrics.track_app_server_call("test_operation")
+    def failing_call():
+        raise ConnectionError("app server unavailable")
+
+    labels = {"operation": "test_operation"}
+    errors_before = get_sample_value("chess_app_server_call_errors_total", labels)
+    count_before = get_sample_value("chess_app_server_call_seconds_count", labels)
+
+    with pytest.raises(ConnectionError):
+        failing_call()
+    assert get_sample_value("chess_app_server_call_errors_total", labels) == (
+        errors_before + 1
+    )
+    assert get_sample_value("chess_app_server_call_seconds_count", labels) == (
+        count_before + 1
+    )
+
+
+def test_metrics_http_endpoint():
+    """Test that the metrics server renders the metrics of the game server."""
+    server, thread = metrics.start_metrics_server("127.0.0.1", 0)
+    port = server.server_address[1]
+    metrics.MOVE_PHASE_SECONDS.labels("legality").observe(0.001)
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            body = response.read().decode()
+        assert response.status == 200
+        assert 'chess_move_phase_seconds_count{phase="legality"}' in body
+        assert "chess_active_games" in body
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,100 @@
+import pytest
+from chess import Board, Color, opposite_color
+from fuzz import reference_legal_moves
+from movegen import in_check
+
+
+def perft(board, color, depth):
+    """Helper function counting the leaf positions of the tree of legal moves."""
+    moves = board.legal_moves(color)
+    if depth == 1:
+        return sum(len(targets) for targets in moves.values())
+    nodes = 0
+    for start_field, targets in moves.items():
+        for end_field in targets:
+            child = board.copy()
+            child.make_move(start_field, end_field)
+            nodes += perft(child, opposite_color(color), depth - 1)
+    return nodes
+
+
+@pytest.mark.parametrize(
+    ("fen", "depth", "nodes"),
+    [
+        ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 3, 8902),
+        # Castling, pins and en passant
+        (
+            "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+            2,
+            2039,
+        ),
+        # En passant exposing the king on the rank
+        ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 3, 2812),
+    ],
+)
+def test_perft(fen, depth, nodes):
+    """Test the numbers of move sequences against the known perft results."""
+    board, color = Board.from_fen(fen)
+    assert perft(board, color, depth) == nodes
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        # Positions of test_chess.py
+        "7k/7P/6n1/8/8/1Pp5/PPb5/KQ5r w - - 0 1",
+        "7k/8/8/8/8/8/8/K5Bq w - - 0 1",
+        "2k5/8/8/8/8/n7/PP6/KB1q4 w - - 0 1",
+        "2k5/8/8/8/8/8/PPn5/KB1q4 w - - 0 1",
+        "7k/8/8/8/8/q7/PP1R4/K7 w - - 0 1",
+        "7k/8/8/8/3p4/q7/PP1R4/K7 b - - 0 1",
+        "7k/8/6Q1/8/8/8/8/K7 b - - 0 1",
+        "7k/8/8/1pPp4/8/q7/P7/K7 w - b6 0 1",
+    ],
+)
+def test_legal_moves_match_simulated_moves(fen):
+    """Test that generated moves are the moves not leaving the king in check."""
+    board, color = Board.from_fen(fen)
+    for side in Color:
+        generated = {
+            start_field: sorted(targets)
+            for start_field, targets in board.legal_moves(side).items()
+        }
+        assert generated == reference_legal_moves(board, side)
+        assert in_check(board, side) == board.is_check(on_color=side)
+
+
+def test_castling_through_attacked_square():
+    """Test that the king does not castle out of, through or into check."""
+    board, color = Board.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    assert sorted(board.legal_moves(color)["e1"]) == [
+        "c1", "d1", "d2", "e2", "f1", "f2", "g1",
+    ]
+
+    board, color = Board.from_fen("r3k2r/8/8/8/8/8/5r2/R3K2R w KQkq - 0 1")
+    assert "g1" not in board.legal_moves(color)["e1"]  # the rook attacks f1
+    assert "c1" in board.legal_moves(color)["e1"]
+
+    board, color = Board.from_fen("r3k2r/8/8/8/8/8/8/R2rK2R w KQkq - 0 1")
+    assert sorted(board.legal_moves(color)["e1"]) == ["d1", "e2", "f2"]
+
+
+def test_en_passant_only_after_double_move():
+    """Test that en passant is available only right after the double pawn move."""
+    board, color = Board.from_fen("4k3/3p4/8/4P3/8/8/8/4K3 b - - 0 1")
+    board.make_move("d7", "d5")
+    assert board.legal_moves(Color.WHITE)["e5"] == ["e6", "d6"]
+
+    board, color = Board.from_fen("4k3/8/3p4/4P3/8/8/8/4K3 b - - 0 1")
+    board.make_move("d6", "d5")
+    assert board.legal_moves(Color.WHITE)["e5"] == ["e6"]
+
+
+def test_legal_moves_cached_until_position_changes():
+    """Test that moves are generated once per position."""
+    board = Board()
+    moves = board.legal_moves(Color.WHITE)
+    assert board.legal_moves(Color.WHITE) is moves
+    board.make_move("e2", "e4")
+    assert board.legal_moves(Color.WHITE) is not moves
+    assert "e4" in board.legal_moves(Color.WHITE)
@@ -0,0 +1,87 @@
+import config
+import profiling
+import pytest
+from chess import Board, Color, Game, Player, Queen
+from profiling import Profiler
+
+
+@pytest.fixture
+def profiler():
+    """Fixture providing a profiler which is disabled after the test."""
+    profiler = Profiler(sample_interval=0.001)
+    yield profiler
+    profiler.disable()
+
+
+def create_game(game_id):
+    """Helper function to create a game with two players."""
+    game = Game(game_id)
+    game.player_1 = Player("websocket_white", "white", Color.WHITE)
+    game.player_2 = Player("websocket_black", "black", Color.BLACK)
+    return game
+
+
+def test_profiling_single_game(profiler):
+    """Test that only calls made while handling moves of the profiled game are
+    recorded."""
+    profiled_game = create_game("profiled")
+    other_game = create_game("other")
+    profiler.enable("profiled")
+
+    other_game.handle_move("e2", "e4", "websocket_white")
+    assert not profiler.stats
+
+    profiled_game.handle_move("e2", "e4", "websocket_white")
+    for name in [
+        "Board.legal_moves",
+        "Board.is_check",
+        "Board.make_move",
+        "Board.save_gameboard",
+        "Pawn.available_moves",
+    ]:
+        assert profiler.stats[name].calls > 0
+        assert profiler.stats[name].cumulative_time > 0
+    assert "Board.legal_moves" in profiler.report()
+
+
+def test_disabling_restores_original_methods(profiler):
+    """Test that profiled methods are unwrapped once profiling is disabled."""
+    original_is_check = Board.is_check
+    original_queen_moves = Queen.available_moves
+
+    profiler.enable()
+    assert Board.is_check is not original_is_check
+    assert Queen.available_moves is not original_queen_moves
+
+    profiler.disable()
+    assert Board.is_check is original_is_check
+    assert Queen.available_moves is original_queen_moves
+
+
+def test_dump_stacks_in_folded_format(profiler, tmp_path):
+    """Test that sampled stacks are written in the flamegraph folded format."""
+    profiler.stacks["server.py:main;chess.py:handle_move"] += 3
+    profiler.stacks["server.py:main;chess.py:is_check"] += 1
+    path = tmp_path / "profile.folded"
+
+    assert profiler.dump_stacks(path) == 2
+    assert path.read_text().splitlines() == [
+        "server.py:main;chess.py:handle_move 3",
+        "server.py:main;chess.py:is_check 1",
+    ]
+
+
+def test_toggle_profiling_of_listed_games(monkeypatch, tmp_path):
+    """Test that the signal handler profiles the listed games and then stops."""
+    profiler = Profiler(sample_interval=0.001)
+    path = tmp_path / "profile.games"
+    path.write_text("first\n\nsecond\n")
+    monkeypatch.setattr(profiling, "PROFILER", profiler)
+    monkeypatch.setattr(config, "PROFILING_GAMES_PATH", str(path))
+
+    profiling.toggle_profiling()
+    assert profiler.games == {"first", "second"}
+    assert not profiler.all_games
+
+    profiling.toggle_profiling()
+    assert not profiler.is_enabled
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, Mock, call, patch
 
 import config
 import pytest
+from chess import Color, Game
 from server import ChessServer
 
 
@@ -27,6 +28,12 @@ def setup_main_test_environment(test_messages):
     game.end_with_draw = Mock()
     game.end_with_win = Mock()
     game.get_chessboard.return_value = ""
+    game.get_clock.return_value = {"white": 600, "black": 600}
+    game.get_legal_moves.return_value = {}
+    game.play_premove.return_value = None
+    game.cancel_premoves.return_value = {}
+    game.current_turn_color = Color.WHITE
+    game.clock.remaining = {"white": 600, "black": 600}
 
     # Setup the ChessServer instance with mocked players connected.
     server = ChessServer()
@@ -193,3 +200,150 @@ async def test_log_in_to_game_successful():
 @pytest.mark.asyncio
 async def test_handler():
     pass
+
+
+@pytest.mark.asyncio
+async def test_premove_applied_after_opponent_move():
+    """
+    Test that the premove is made in the handling of the opponent's move and both
+    players get the game state after it.
+    """
+    server = ChessServer()
+    white_websocket, black_websocket = AsyncMock(), AsyncMock()
+    users = [
+        {"username": "white", "websocket": white_websocket},
+        {"username": "black", "websocket": black_websocket},
+    ]
+    game = Game("premove_game_id")
+    game.place_players(*users)
+    server.connected_users[game.id] = users
+    try:
+        premove = {"type": "premove", "from": "e7", "to": "e5"}
+        assert not await server.handle_message(black_websocket, game, premove)
+        assert game.board["e5"] == game.board.EMPTY
+
+        move = {"type": "move", "from": "e2", "to": "e4"}
+        assert not await server.handle_message(white_websocket, game, move)
+    finally:
+        Game.instances.remove(game)
+
+    black_messages = [
+        json.loads(sent.args[0]) for sent in black_websocket.send.call_args_list
+    ]
+    assert black_messages[0] == {"type": "premove_applied", "from": "e7", "to": "e5"}
+    assert black_messages[-1]["type"] == "game_state"
+    white_state = json.loads(white_websocket.send.call_args.args[0])
+    assert white_state["legal_moves"]["g1"] == "h3f3e2"
+    assert game.current_turn_color == Color.WHITE
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("end_message", [{"type": "resign"}, None])
+async def test_premove_cancelled_when_game_ends(end_message):
+    """
+    Test that the premove queued when the game ends by resignation or on time is
+    cancelled and the player is notified before the result.
+    """
+    server = ChessServer()
+    white_websocket, black_websocket = AsyncMock(), AsyncMock()
+    users = [
+        {"username": "white", "websocket": white_websocket},
+        {"username": "black", "websocket": black_websocket},
+    ]
+    game = Game("premove_end_game_id")
+    game.is_rated = False
+    game.place_players(*users)
+    server.connected_users[game.id] = users
+    try:
+        premove = {"type": "premove", "from": "e7", "to": "e5"}
+        assert not await server.handle_message(black_websocket, game, premove)
+        if end_message:
+            assert await server.handle_message(white_websocket, game, end_message)
+        else:
+            game.end_with_win(game.player_2, "Game end! white ran out of time!")
+            await server.close_game(game)
+    finally:
+        Game.instances.remove(game)
+
+    black_messages = [
+        json.loads(sent.args[0]) for sent in black_websocket.send.call_args_list
+    ]
+    assert black_messages[-2] == {
+        "type": "premove_cancelled",
+        "from": "e7",
+        "to": "e5",
+        "content": config.PREMOVE_GAME_OVER,
+    }
+    assert black_messages[-1]["type"] == "game_ended"
+    assert game.premoves == {}
+
+
+@pytest.mark.asyncio
+async def test_background_task_is_kept_and_its_failure_logged(caplog):
+    """Test that background tasks are kept by the server and their end is logged."""
+
+    async def failing_service():
+        raise RuntimeError("store failed")
+
+    server = ChessServer()
+    server.start_background_task("store", failing_service())
+    task = server.background_tasks["store"]
+    await asyncio.wait([task])
+    await asyncio.sleep(0)  # let the done callback run
+    assert "Background task store failed" in caplog.text
+    assert "store failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_bots_of_restored_games_are_restarted():
+    """Test that the bot joins its restored game again, while rated games wait for
+    their players."""
+    bot_game, rated_game = Game("restored_bot_game"), Game("restored_rated_game")
+    bot_game.is_rated = False
+    bot_game.expected_usernames = {
+        Color.WHITE: "white",
+        Color.BLACK: config.BOT_USERNAME,
+    }
+    rated_game.expected_usernames = {Color.WHITE: "white", Color.BLACK: "black"}
+    server = ChessServer()
+    server.store.restore = Mock(return_value=[bot_game, rated_game])
+    server.play_bot = AsyncMock()
+    try:
+        server.restore_games()
+        server.start_bot(bot_game.id)  # the player asks for the bot again
+
+        assert list(server.bot_tasks) == [bot_game.id]
+        await server.bot_tasks[bot_game.id]
+        server.play_bot.assert_awaited_once()
+    finally:
+        Game.instances.remove(bot_game)
+        Game.instances.remove(rated_game)
+
+
+@pytest.mark.asyncio
+async def test_game_ended_when_bot_fails(caplog):
+    """Test that the failure of the bot is logged and the player waiting for it is
+    notified of the end of the game."""
+    server = ChessServer()
+    websocket = AsyncMock()
+    server.connected_users["failed_bot_game"] = [
+        {"username": "player", "websocket": websocket}
+    ]
+    server.create_game = AsyncMock(side_effect=RuntimeError("bot failed"))
+    server.start_bot("failed_bot_game")
+    game = Game.get("failed_bot_game")
+    try:
+        await server.bot_tasks["failed_bot_game"]
+    finally:
+        Game.instances.remove(game)
+
+    assert "Bot of game failed_bot_game failed" in caplog.text
+    assert game.is_over
+    assert json.loads(websocket.send.call_args.args[0]) == {
+        "type": "game_ended",
+        "description": config.BOT_FAILED,
+        "winner": None,
+    }
+    websocket.close.assert_awaited_once()
+    await asyncio.sleep(0)  # let the done callback run
+    assert server.bot_tasks == {}
@@ -0,0 +1,33 @@
+import random
+from unittest.mock import patch
+
+from chess import Game
+from simulator import play_random_game, play_scripted_game, simulate
+
+
+def test_random_game_is_deterministic():
+    """Test that games of the same seed are the same."""
+    first = play_random_game("first", random.Random(1), max_plies=60)
+    second = play_random_game("second", random.Random(1), max_plies=60)
+    assert first.board.move_log == second.board.move_log
+    assert first.is_over or len(first.board.move_log) == 60
+
+
+def test_scripted_game_not_reported():
+    """Test that a headless game ends without reporting the result."""
+    with patch("chess.send_result_to_app_server") as send_result:
+        game = play_scripted_game("fools_mate", ["f2f3", "e7e5", "g2g4", "d8h4"])
+    assert game.is_over
+    assert game.result_description == "Check-Mate! black won!"
+    send_result.assert_not_called()
+    assert game not in Game.instances
+
+
+def test_simulate_aggregates_batches():
+    """Test that statistics of games played in workers are summed up."""
+    summary = simulate(games=4, workers=2, max_plies=20)
+    assert summary["games"] == 4
+    assert 0 < summary["plies"] <= 80
+    assert simulate(games=4, workers=1, max_plies=20)["plies"] == summary["plies"]
+    assert sum(summary["results"].values()) == 4
+    assert summary["phases"]["legality"][1] == summary["plies"]
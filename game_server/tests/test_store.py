@@ -0,0 +1,191 @@
+import config
+import pytest
+from chess import Board, Color, Game, Player
+from store import GameStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture to initialize a store saving the state in a temporary directory."""
+    return GameStore(directory=str(tmp_path))
+
+
+def start_game(store, game_id):
+    """Helper function creating a game with players and journaling its start."""
+    game = Game(game_id)
+    game.player_1 = Player("websocket_white", "white", Color.WHITE)
+    game.player_2 = Player("websocket_black", "black", Color.BLACK)
+    store.record_start(game)
+    return game
+
+
+def play(store, game, moves):
+    """Helper function making moves in the game and journaling them."""
+    for start_field, end_field in moves:
+        websocket = game.player_1.websocket
+        if game.current_turn_color == Color.BLACK:
+            websocket = game.player_2.websocket
+        game.handle_move(start_field, end_field, websocket)
+        store.record_move(game, start_field, end_field)
+
+
+def restore(store, game_id):
+    """Helper function restoring the state with a new store and returning the
+    restored game of the given id."""
+    restored = {game.id: game for game in GameStore(store.directory).restore()}
+    return restored.get(game_id)
+
+
+def test_fen_round_trip():
+    """Test that a position survives the conversion to FEN and back."""
+    board = Board()
+    assert (
+        board.to_fen(Color.WHITE)
+        == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    )
+    for start_field, end_field in [("e2", "e4"), ("e7", "e5"), ("e1", "e2")]:
+        board.make_move(start_field, end_field)
+    fen = board.to_fen(Color.BLACK)
+    restored_board, turn_color = Board.from_fen(fen)
+    assert turn_color == Color.BLACK
+    assert restored_board.to_fen(turn_color) == fen
+    assert "KQ" not in fen.split()[2]
+
+
+@pytest.mark.asyncio
+async def test_restore_from_journal(store):
+    """Test that moves written to the journal are replayed after a restart."""
+    game = start_game(store, "test_store_journal")
+    play(store, game, [("e2", "e4"), ("e7", "e5"), ("g1", "f3")])
+    await store.flush()
+
+    restored = restore(store, game.id)
+    assert restored.current_turn_color == Color.BLACK
+    assert restored.board.to_fen(Color.BLACK) == game.board.to_fen(Color.BLACK)
+    assert restored.expected_usernames == {Color.WHITE: "white", Color.BLACK: "black"}
+
+
+@pytest.mark.asyncio
+async def test_restore_from_snapshot_and_journal(store):
+    """Test that a snapshot truncates the journal and moves made after it are
+    replayed on top of the snapshot."""
+    game = start_game(store, "test_store_snapshot")
+    play(store, game, [("d2", "d4"), ("d7", "d5")])
+    await store.flush(with_snapshot=True)
+    with open(store.journal_path) as journal:
+        assert journal.read() == ""
+
+    play(store, game, [("c2", "c4")])
+    await store.flush()
+
+    restored = restore(store, game.id)
+    assert restored.board.to_fen(Color.BLACK) == game.board.to_fen(Color.BLACK)
+    assert restored.board.uci_moves() == ["d2d4", "d7d5", "c2c4"]
+
+
+@pytest.mark.asyncio
+async def test_journal_of_saved_snapshot_not_replayed(store):
+    """Test that journaled moves are not replayed again if the server stopped after
+    saving the snapshot, before the journal was truncated."""
+    game = start_game(store, "test_store_crash_window")
+    play(store, game, [("e2", "e4"), ("e7", "e5")])
+    await store.flush()
+    with open(store.journal_path) as journal:
+        entries = journal.read()
+    await store.flush(with_snapshot=True)
+    with open(store.journal_path, "w") as journal:
+        journal.write(entries)
+
+    restored = restore(store, game.id)
+    assert restored.board.to_fen(Color.WHITE) == game.board.to_fen(Color.WHITE)
+    assert restored.board.uci_moves() == ["e2e4", "e7e5"]
+
+
+@pytest.mark.asyncio
+async def test_game_failing_to_restore_is_dropped(store):
+    """Test that a game whose journal cannot be replayed does not stop the other
+    games from being restored."""
+    broken = start_game(store, "test_store_broken")
+    game = start_game(store, "test_store_intact")
+    play(store, game, [("e2", "e4")])
+    store.record_move(broken, "e3", "e4")  # move from an empty field
+    await store.flush()
+
+    assert restore(store, broken.id) is None
+    assert restore(store, game.id).board.uci_moves() == ["e2e4"]
+
+
+@pytest.mark.asyncio
+async def test_restore_clock_and_unrated_game(store):
+    """Test that the time left to the players and the game not being rated are
+    restored from the journal and the snapshot."""
+    game = Game("test_store_clock")
+    game.is_rated = False
+    game.place_players(
+        {"websocket": "websocket_white", "username": "white"},
+        {"websocket": "websocket_bot", "username": "bot"},
+    )
+    store.record_start(game)
+    game.clock.remaining = {"white": 42.0, "black": 30.0}
+    game.clock.running = None  # no time is charged for thinking
+    play(store, game, [("e2", "e4")])
+    await store.flush()
+
+    restored = restore(store, game.id)
+    assert restored.clock.remaining == {
+        "white": 42.0 + game.clock.increment,
+        "black": config.CLOCK_BASE_TIME,
+    }
+    assert not restored.is_rated
+    Game.instances.remove(restored)  # not to be saved as the game of the same id
+
+    game.clock.running = None
+    play(store, game, [("e7", "e5")])
+    await store.flush(with_snapshot=True)
+
+    restored = restore(store, game.id)
+    # The time of white running since the move of black is charged
+    assert restored.clock.remaining == pytest.approx(
+        {
+            "white": 42.0 + game.clock.increment,
+            "black": 30.0 + game.clock.increment,
+        },
+        abs=1,
+    )
+    assert not restored.is_rated
+
+
+def test_snapshot_not_changed_by_later_moves(store):
+    """Test that moves made after the snapshot is taken are not included in it."""
+    game = start_game(store, "test_store_snapshot_copy")
+    play(store, game, [("e2", "e4"), ("e7", "e5")])
+    snapshot = store.take_snapshot()[game.id]
+    play(store, game, [("g1", "f3"), ("b8", "c6")])
+
+    assert sum(len(moves) for moves in snapshot["record_of_moves"].values()) == 2
+    assert len(snapshot["position_hashes"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_finished_games_are_not_restored(store):
+    """Test that games which ended are dropped from the state."""
+    game = start_game(store, "test_store_finished")
+    play(store, game, [("e2", "e4")])
+    game.is_over = True
+    store.record_end(game)
+    await store.flush(with_snapshot=True)
+
+    assert restore(store, game.id) is None
+
+
+def test_restored_game_keeps_colors_of_players():
+    """Test that players reconnecting in any order keep their colors."""
+    game = Game("test_store_colors")
+    game.expected_usernames = {Color.WHITE: "white", Color.BLACK: "black"}
+    game.place_players(
+        {"websocket": "websocket_black", "username": "black"},
+        {"websocket": "websocket_white", "username": "white"},
+    )
+    assert game.player_1.username == "white"
+    assert game.player_1.color == Color.WHITE
+    assert game.player_2.websocket == "websocket_black"
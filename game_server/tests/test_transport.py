@@ -0,0 +1,53 @@
+import config
+import pytest
+import transport
+import websockets
+
+
+async def echo(websocket):
+    """Helper handler sending back the negotiated extensions of the connection."""
+    await websocket.send(",".join(ext.name for ext in websocket.extensions))
+
+
+async def get_negotiated_extensions(path, compression="deflate"):
+    """Helper function connecting to a server with the transport settings and
+    returning extensions negotiated for the connection."""
+    async with websockets.serve(
+        echo, "127.0.0.1", 0, **transport.get_serve_options()
+    ) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}{path}", compression=compression
+        ) as websocket:
+            return await websocket.recv()
+
+
+def test_serve_options_bound_buffers_and_keepalive():
+    """Test that the server options come from the configuration."""
+    options = transport.get_serve_options()
+    assert options["max_size"] == config.WEBSOCKET_MAX_SIZE
+    assert options["max_queue"] == config.WEBSOCKET_MAX_QUEUE
+    assert options["read_limit"] == config.WEBSOCKET_READ_LIMIT
+    assert options["write_limit"] == config.WEBSOCKET_WRITE_LIMIT
+    assert options["ping_interval"] == config.WEBSOCKET_PING_INTERVAL
+    assert options["ping_timeout"] == config.WEBSOCKET_PING_TIMEOUT
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    """Test that no extension is offered if compression is disabled."""
+    monkeypatch.setattr(config, "WEBSOCKET_COMPRESSION", False)
+    assert transport.get_extensions() == []
+
+
+@pytest.mark.asyncio
+async def test_compression_negotiated_per_client():
+    """Test that compression is used unless the client opts out."""
+    assert await get_negotiated_extensions("/") == "permessage-deflate"
+    assert await get_negotiated_extensions("/?compression=off") == ""
+
+
+@pytest.mark.asyncio
+async def test_opt_out_without_offered_extensions():
+    """Test that a client offering no extension may opt out of compression."""
+    assert await get_negotiated_extensions("/?compression=off", None) == ""
+    assert await get_negotiated_extensions("/", None) == ""
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from metrics import get_sample_value
+from watchdog import LoopWatchdog
+
+
+def block_event_loop(seconds):
+    """Helper function simulating a slow synchronous operation."""
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_awaiting_in_handler_is_latency_not_slow_handler():
+    """Test that awaiting (e.g. a slow client) is recorded as latency of the message
+    but not counted as a slow handler, because the loop is not blocked."""
+    watchdog = LoopWatchdog(threshold=0.01, interval=0.005)
+    labels = {"message_type": "test_move"}
+    slow_before = get_sample_value("chess_slow_handlers_total", labels)
+    latency_before = get_sample_value("chess_message_latency_seconds_sum", labels)
+    heartbeat = asyncio.create_task(watchdog.run())
+
+    with watchdog.track("game_id", "test_move"):
+        assert watchdog.current_activity() == ("game_id", "test_move")
+        await asyncio.sleep(0.05)
+    heartbeat.cancel()
+
+    assert watchdog.current_activity() == (None, None)
+    assert get_sample_value("chess_slow_handlers_total", labels) == slow_before
+    assert (
+        get_sample_value("chess_message_latency_seconds_sum", labels)
+        >= latency_before + 0.05
+    )
+
+
+@pytest.mark.asyncio
+async def test_blocked_loop_is_reported_with_activity_and_stack(caplog):
+    """Test that a blocked event loop is logged with the game id, message type and
+    the stack of the blocking code."""
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+    lag_count_before = get_sample_value("chess_event_loop_lag_seconds_count")
+    slow_labels = {"message_type": "resign"}
+    slow_before = get_sample_value("chess_slow_handlers_total", slow_labels)
+    heartbeat = asyncio.create_task(watchdog.run())
+    await asyncio.sleep(0.05)
+
+    with caplog.at_level(logging.WARNING, logger="watchdog"):
+        with watchdog.track("blocked_game", "resign"):
+            block_event_loop(0.3)
+        await asyncio.sleep(0.05)
+    heartbeat.cancel()
+
+    stall_logs = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Event loop blocked")
+    ]
+    assert stall_logs
+    assert "'resign' message of game blocked_game" in stall_logs[0]
+    assert "block_event_loop" in stall_logs[0]
+    assert get_sample_value("chess_event_loop_lag_seconds_count") > lag_count_before
+    assert get_sample_value("chess_slow_handlers_total", slow_labels) == slow_before + 1
@@ -0,0 +1,55 @@
+import base64
+
+from chess import Board, Color
+from zobrist import compute_hash, pack_hashes
+
+
+def play(board, moves):
+    """Helper function making the moves on the board."""
+    for start_field, end_field in moves:
+        board.make_move(start_field, end_field)
+    return board
+
+
+def test_transpositions_have_equal_hashes():
+    """Test that the same position reached by different move orders has the same
+    hash, recorded after every move."""
+    board_1 = play(Board(), [("g1", "f3"), ("g8", "f6"), ("b1", "c3"), ("b8", "c6")])
+    board_2 = play(Board(), [("b1", "c3"), ("b8", "c6"), ("g1", "f3"), ("g8", "f6")])
+    assert len(board_1.position_hashes) == 5
+    assert board_1.position_hashes[-1] == board_2.position_hashes[-1]
+    assert board_1.position_hashes[1] != board_2.position_hashes[1]
+
+
+def test_hash_covers_side_to_move_castling_and_en_passant():
+    """Test that positions differing only in the state of the game have different
+    hashes."""
+    board = Board()
+    assert compute_hash(board, Color.WHITE) != compute_hash(board, Color.BLACK)
+
+    # Moving the king forth and back loses castling rights
+    moved_king = play(
+        Board(),
+        [("e2", "e4"), ("e7", "e5"), ("e1", "e2"), ("e8", "e7")]
+        + [("e2", "e1"), ("e7", "e8")],
+    )
+    same_placement = play(
+        Board(),
+        [("e2", "e4"), ("e7", "e5"), ("g1", "f3"), ("g8", "f6")]
+        + [("f3", "g1"), ("f6", "g8")],
+    )
+    assert moved_king.fen_placement() == same_placement.fen_placement()
+    assert moved_king.position_hashes[-1] != same_placement.position_hashes[-1]
+
+    # The en passant square is a part of the position
+    double_step = play(Board(), [("e2", "e4")])
+    board, turn_color = Board.from_fen(double_step.to_fen(Color.BLACK))
+    assert board.position_hashes == [double_step.position_hashes[-1]]
+    board.last_move_white = (None, None)
+    assert compute_hash(board, turn_color) != double_step.position_hashes[-1]
+
+
+def test_pack_hashes():
+    """Test that hashes are packed as big-endian 8-byte integers."""
+    packed = base64.b64decode(pack_hashes([1, 2**64 - 1]))
+    assert packed == (1).to_bytes(8, "big") + (2**64 - 1).to_bytes(8, "big")
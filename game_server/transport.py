@@ -0,0 +1,69 @@
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+
+def get_extensions():
+    """Get the WebSocket extensions offered to the clients.
+
+    Returns:
+        list: The permessage-deflate extension factory if compression is enabled,
+            otherwise an empty list.
+    """
+    if not config.WEBSOCKET_COMPRESSION:
+        return []
+    return [
+        ServerPerMessageDeflateFactory(
+            server_max_window_bits=config.WEBSOCKET_COMPRESSION_MAX_WINDOW_BITS,
+            client_max_window_bits=config.WEBSOCKET_COMPRESSION_MAX_WINDOW_BITS,
+            compress_settings={
+                "level": config.WEBSOCKET_COMPRESSION_LEVEL,
+                "memLevel": config.WEBSOCKET_COMPRESSION_MEM_LEVEL,
+            },
+        )
+    ]
+
+
+async def process_request(path, request_headers):
+    """Adjust the opening handshake of a client before extensions are negotiated.
+
+    Browsers offer permessage-deflate on every connection, so clients opt out of
+    compression with the `compression=off` query parameter (e.g. on fast local
+    networks, where compressing small frames costs more CPU than it saves).
+
+    Args:
+        path (str): The request path including the query string.
+        request_headers (websockets.datastructures.Headers): Request headers.
+
+    Returns:
+        None: The handshake always continues.
+    """
+    query = parse_qs(urlsplit(path).query)
+    if (
+        query.get("compression", [""])[-1] == "off"
+        and "Sec-WebSocket-Extensions" in request_headers
+    ):
+        del request_headers["Sec-WebSocket-Extensions"]
+    return None
+
+
+def get_serve_options():
+    """Get the keyword arguments of `websockets.serve` which control compression,
+    buffer sizes and keepalive of the connections.
+
+    Returns:
+        dict: Options of the WebSocket server.
+    """
+    return {
+        "compression": None,  # replaced by the tuned extension factory
+        "extensions": get_extensions(),
+        "process_request": process_request,
+        "max_size": config.WEBSOCKET_MAX_SIZE,
+        "max_queue": config.WEBSOCKET_MAX_QUEUE,
+        "read_limit": config.WEBSOCKET_READ_LIMIT,
+        "write_limit": config.WEBSOCKET_WRITE_LIMIT,
+        "ping_interval": config.WEBSOCKET_PING_INTERVAL,
+        "ping_timeout": config.WEBSOCKET_PING_TIMEOUT,
+        "close_timeout": config.WEBSOCKET_CLOSE_TIMEOUT,
+    }
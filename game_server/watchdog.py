@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+import config
+from metrics import EVENT_LOOP_LAG_SECONDS, MESSAGE_LATENCY_SECONDS, SLOW_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    """Watchdog detecting operations which block the event loop.
+
+    A heartbeat task running on the event loop measures how late it is woken up and
+    records the lag in the `chess_event_loop_lag_seconds` histogram. A separate thread
+    checks whether the heartbeat keeps up; if the loop has been blocked for longer than
+    the threshold, it logs the stack of the loop thread together with the game and the
+    message type being handled at that moment, and counts the message type as a slow
+    handler. Time spent awaiting slow clients does not block the loop, so it is only
+    part of the end-to-end latency of messages.
+
+    Attributes:
+        threshold (float): Lag in seconds above which the loop is considered blocked.
+        interval (float): Time between heartbeats in seconds.
+        activities (dict): Mapping of task to (game id, message type) it handles.
+        last_tick (float): Monotonic time of the last heartbeat.
+    """
+
+    def __init__(
+        self,
+        threshold=config.WATCHDOG_THRESHOLD,
+        interval=config.EVENT_LOOP_LAG_INTERVAL,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.activities = {}
+        self.last_tick = time.monotonic()
+        self._loop = None
+        self._loop_thread_id = None
+        self._reported_tick = None
+        self._stopped = threading.Event()
+
+    @contextmanager
+    def track(self, game_id, message_type):
+        """Context manager marking the message handled by the current task and
+        recording the end-to-end latency of handling it.
+
+        Args:
+            game_id (str): ID of the game the message belongs to.
+            message_type (str): Type of the handled message, e.g. "move".
+        """
+        task = asyncio.current_task()
+        self.activities[task] = (game_id, message_type)
+        try:
+            with MESSAGE_LATENCY_SECONDS.labels(message_type).time():
+                yield
+        finally:
+            del self.activities[task]
+
+    def current_activity(self):
+        """Get the (game id, message type) handled by the task running on the loop.
+
+        Returns:
+            tuple: Game id and message type, or (None, None) if the running task
+                does not handle any message.
+        """
+        task = asyncio.current_task(self._loop)
+        return self.activities.get(task, (None, None))
+
+    async def run(self):
+        """Run the heartbeat on the event loop and the watching thread until the task
+        is cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._stopped.clear()
+        threading.Thread(target=self._watch, daemon=True).start()
+
+        try:
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self.last_tick = time.monotonic()
+                lag = max(0.0, self.last_tick - start - self.interval)
+                EVENT_LOOP_LAG_SECONDS.observe(lag)
+                if lag > self.threshold:
+                    logger.warning("Event loop lagged by %.3fs", lag)
+        finally:
+            self._stopped.set()
+
+    def _watch(self):
+        """Check periodically whether the heartbeat is overdue (runs in a thread)."""
+        while not self._stopped.wait(self.threshold / 2):
+            last_tick = self.last_tick
+            blocked = time.monotonic() - last_tick - self.interval
+            if blocked > self.threshold and self._reported_tick != last_tick:
+                # Report every stall once, when it crosses the threshold
+                self._reported_tick = last_tick
+                self.report_stall(blocked)
+
+    def report_stall(self, blocked):
+        """Log the stack of the blocked event loop and the message being handled.
+
+        Args:
+            blocked (float): For how long the loop has been blocked in seconds.
+        """
+        game_id, message_type = self.current_activity()
+        if message_type is not None:
+            SLOW_HANDLERS.labels(message_type).inc()
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        logger.warning(
+            "Event loop blocked for %.3fs while handling %r message of game %s\n%s",
+            blocked,
+            message_type,
+            game_id,
+            stack,
+        )
@@ -0,0 +1,61 @@
+import base64
+import random
+import struct
+
+ZOBRIST_SEED = 2023  # keys must never change, hashes are stored by the app server
+
+_random = random.Random(ZOBRIST_SEED)
+PIECE_KEYS = {
+    (symbol, color): [_random.getrandbits(64) for _ in range(64)]
+    for symbol in "PNBRQK"
+    for color in ("white", "black")  # values of chess.Color
+}
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = {letter: _random.getrandbits(64) for letter in "KQkq"}
+EN_PASSANT_KEYS = {file: _random.getrandbits(64) for file in "abcdefgh"}
+
+HASH_STRUCT = struct.Struct(">Q")
+
+
+def compute_hash(board, turn_color):
+    """Compute the 64-bit Zobrist hash of the position.
+
+    The hash covers the same fields as FEN without the move counters: placement of
+    pieces, the side to move, castling rights and the en passant square, so equal
+    positions reached by different move orders have equal hashes.
+
+    Args:
+        board (Board): The chessboard.
+        turn_color (Color): The color of the player to move.
+
+    Returns:
+        int: The unsigned 64-bit hash of the position.
+    """
+    position_hash = 0
+    for y_idx, row in enumerate(board.gameboard):
+        for x_idx, piece in enumerate(row):
+            if piece:
+                position_hash ^= PIECE_KEYS[piece.symbol, piece.color.value][
+                    y_idx * 8 + x_idx
+                ]
+    if turn_color.value == "black":
+        position_hash ^= BLACK_TO_MOVE_KEY
+    for letter in board.castling_rights().strip("-"):
+        position_hash ^= CASTLING_KEYS[letter]
+    en_passant = board.en_passant_target(turn_color)
+    if en_passant != "-":
+        position_hash ^= EN_PASSANT_KEYS[en_passant[0]]
+    return position_hash
+
+
+def pack_hashes(hashes):
+    """Pack hashes of positions into a base64 string, 8 bytes per hash.
+
+    Args:
+        hashes (list): Unsigned 64-bit hashes.
+
+    Returns:
+        str: The packed hashes sent to the app server.
+    """
+    packed = b"".join(HASH_STRUCT.pack(position_hash) for position_hash in hashes)
+    return base64.b64encode(packed).decode()